@@ -33,6 +33,35 @@ else:
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
+# Internal nginx location aliasing MEDIA_ROOT. When set, the media view only checks access and lets nginx send the
+# file through X-Accel-Redirect; otherwise Django streams it
+MEDIA_ACCEL_REDIRECT = config.get('django', {}).get('media_accel_redirect')
+# Seconds a signed media URL (utils.media) stays valid. URLs are signed for periods of half of it, so a file keeps one
+# URL, cacheable by browsers, through a period and every URL handed out is good for at least half of it
+MEDIA_URL_MAX_AGE = 24 * 60 * 60
+
+# Resized copies of recipe images (utils.images), rendered for background jobs by a pool of IMAGE_WORKERS processes;
+# 0 renders in the job's thread
+IMAGE_VARIANT_SIZES = (128, 512, 1024)
+IMAGE_VARIANT_FORMATS = ('webp', 'jpeg')
+IMAGE_WORKERS = config.get('django', {}).get('image_workers', 2)
+# Limits checked on upload (utils.image_validation) before an image is stored or decoded
+IMAGE_MAX_UPLOAD_SIZE = 5 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+# Recipe images are stored once per content (recipe_app.storage); gc_image_blobs keeps unreferenced blobs touched
+# within this many seconds, an upload in flight may be about to reference them
+IMAGE_BLOB_GC_GRACE_SECONDS = 3600
+
+# Background jobs (utils.jobs) run by `manage.py run_workers` in JOB_WORKER_THREADS threads. A failed job is retried
+# after JOB_RETRY_BASE_SECONDS, doubling up to JOB_RETRY_MAX_SECONDS; one running longer than JOB_TIMEOUT_SECONDS is
+# considered abandoned and queued again
+JOB_WORKER_THREADS = config.get('django', {}).get('job_worker_threads', 4)
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 5
+JOB_RETRY_MAX_SECONDS = 3600
+JOB_TIMEOUT_SECONDS = 600
+# Jobs listed by GET /api/jobs/, newest first
+JOB_LIST_LIMIT = 50
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -125,6 +154,43 @@ if os.getenv('USE_MYSQL', 'false').lower() == 'true':
         },
     }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# The locmem default is per process. Deployments running several workers, or run_workers next to the
+# web server, must point this at a backend every process shares, e.g. FileBasedCache on a common
+# volume (see docker-compose.yml), so that a write in one process invalidates cached reads in all of them.
+
+CACHES = {
+    'default': config.get(
+        'cache',
+        {
+            'BACKEND': 'django_prometheus.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'recipe-app',
+        },
+    )
+}
+
+# Seconds a cached per-user read stays valid; writes invalidate it earlier
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Upserts plus deletes accepted by one POST /api/ingredients/bulk/
+INGREDIENT_BULK_MAX_ITEMS = 1000
+
+# Recipes validated and written per transaction by the importer (import_recipes, POST /api/recipes/import/)
+IMPORT_CHUNK_SIZE = 1000
+
+# Operations accepted by one POST /api/batch/
+BATCH_MAX_OPERATIONS = 50
+
+# Recipes accepted by one POST /api/shopping-list/
+SHOPPING_LIST_MAX_RECIPES = 500
+
+# Users whose ingredient autocomplete index is kept in memory, per process
+AUTOCOMPLETE_MAX_USERS = 1000
+
+# Serve the recipe and ingredient reads with async views (for uvicorn); set false when running under WSGI
+ASYNC_VIEWS = config.get('django', {}).get('async_views', True)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -166,17 +232,30 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'recipe_app.authentication.JWTAuthentication',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Keyset pagination for list endpoints
+PAGINATION_DEFAULT_LIMIT = 100
+PAGINATION_MAX_LIMIT = 500
+
+# Rows fetched and serialized at a time by streamed list responses (?stream=true)
+STREAMING_CHUNK_SIZE = 200
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=80),  # todo change to 5 minutes
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
 }
+# recipe_app.authentication.JWTAuthentication keeps up to JWT_TOKEN_CACHE_SIZE verified tokens until they expire and
+# the active status of up to JWT_USER_STATUS_CACHE_SIZE users for JWT_USER_STATUS_TTL seconds, per process, so an
+# authenticated request usually needs no query. Deactivating a user takes effect in other processes within the TTL
+JWT_TOKEN_CACHE_SIZE = 10000
+JWT_USER_STATUS_CACHE_SIZE = 10000
+JWT_USER_STATUS_TTL = 30
 
 LOGGING_LEVEL = config.get('django', {}).get('logging_level', 'INFO')
 LOGGING = {
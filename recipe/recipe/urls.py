@@ -16,31 +16,66 @@ Including another URLconf
 """
 
 from django.contrib import admin
-from django.conf.urls.static import static
 from django.conf import settings
-from django.urls import path
+from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView, TokenBlacklistView
 
 from recipe_app.views import (
+    BatchView,
+    CostAnalyticsView,
+    AsyncIngredientListCreateView,
+    AsyncRecipeDetailView,
+    AsyncRecipeListCreateView,
     CurrentUserView,
+    ExportView,
     IngredientListCreateView,
     RecipeListCreateView,
     RecipeDetailView,
     RecipeImageUploadView,
+    RecipeImportView,
+    ShoppingListView,
     UserRegistrationView,
-    IngredientDetailView
+    IngredientDetailView,
+    IngredientAutocompleteView,
+    IngredientBulkView,
+    IngredientPriceSimulationView,
+    JobDetailView,
+    JobListView,
+    MediaView,
 )
 
+if settings.ASYNC_VIEWS:
+    IngredientListCreateView = AsyncIngredientListCreateView
+    RecipeListCreateView = AsyncRecipeListCreateView
+    RecipeDetailView = AsyncRecipeDetailView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     # Ingredient endpoints
     path('api/ingredients/', IngredientListCreateView.as_view(), name='ingredient-list-create'),
+    path('api/ingredients/autocomplete/', IngredientAutocompleteView.as_view(), name='ingredient-autocomplete'),
+    path('api/ingredients/bulk/', IngredientBulkView.as_view(), name='ingredient-bulk'),
+    path(
+        'api/ingredients/price-simulation/',
+        IngredientPriceSimulationView.as_view(),
+        name='ingredient-price-simulation',
+    ),
     path('api/ingredients/<int:pk>/', IngredientDetailView.as_view(), name='ingredient-detail'),
     # Recipe endpoints
     path('api/recipes/', RecipeListCreateView.as_view(), name='recipe-list-create'),
+    path('api/recipes/import/', RecipeImportView.as_view(), name='recipe-import'),
     path('api/recipes/<int:pk>/', RecipeDetailView.as_view(), name='recipe-detail'),
     path('api/recipes/<int:pk>/upload-image/', RecipeImageUploadView.as_view(), name='recipe-upload-image'),
+    path('api/analytics/costs/', CostAnalyticsView.as_view(), name='cost-analytics'),
+    path('api/shopping-list/', ShoppingListView.as_view(), name='shopping-list'),
+    # Several writes in one request and transaction
+    path('api/batch/', BatchView.as_view(), name='batch'),
+    # Background jobs, e.g. image variants rendering
+    path('api/jobs/', JobListView.as_view(), name='job-list'),
+    path('api/jobs/<int:pk>/', JobDetailView.as_view(), name='job-detail'),
+    # Export
+    path('api/export/', ExportView.as_view(), name='export'),
     # User registration
     path('api/register/', UserRegistrationView.as_view(), name='user-registration'),
     # JWT Token endpoints
@@ -52,7 +87,8 @@ urlpatterns = [
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/currentUser/', CurrentUserView.as_view(), name='current-user'),
+    # Uploaded images, checked against the user's recipes (served by nginx with MEDIA_ACCEL_REDIRECT)
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:name>', MediaView.as_view(), name='media'),
+    # Prometheus scrape endpoint, see prometheus.yml
+    path('prometheus/', include('django_prometheus.urls')),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -2,12 +2,42 @@
 
 from django.contrib import admin
 from .models import Recipe, Ingredient, IngredientRecipe
+from .utils.blobs import acquire_blob, release_blob
+from .utils.recipe_totals import refresh_recipe_totals, shift_recipe_totals
+from .utils.response_cache import invalidate_user_cache
+
+
+def invalidate_recipe_owners(recipe_ids) -> None:
+    """Drop the cached reads of the users owning ``recipe_ids``, admin writes skip the API views that do it."""
+    for user_id in set(Recipe.objects.filter(id__in=recipe_ids).values_list('user_id', flat=True)):
+        invalidate_user_cache(user_id)
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'user')
+    list_display = ('id', 'name', 'user', 'total_price', 'ingredient_count')
     search_fields = ('name', 'user__username')
+    readonly_fields = ('total_price', 'ingredient_count')
+
+    def save_model(self, request, obj, form, change):
+        old_image = form.initial.get('image') if change else None
+        super().save_model(request, obj, form, change)
+        if 'image' in form.changed_data:
+            acquire_blob(obj.image.name if obj.image else '')
+            release_blob(old_image.name if old_image else '')
+        invalidate_user_cache(obj.user_id)
+        if change and 'user' in form.changed_data:
+            invalidate_user_cache(form.initial['user'])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_user_cache(obj.user_id)
+
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for user_id in user_ids:
+            invalidate_user_cache(user_id)
 
 
 @admin.register(Ingredient)
@@ -16,8 +46,47 @@ class IngredientAdmin(admin.ModelAdmin):
     list_filter = ('unit',)
     search_fields = ('name', 'user__username')
 
+    def save_model(self, request, obj, form, change):
+        old_cost = form.initial.get('cost') if change else None
+        super().save_model(request, obj, form, change)
+        if change:
+            # also bumps updated_at of the recipes showing this ingredient
+            shift_recipe_totals(obj, obj.cost - old_cost)
+        invalidate_user_cache(obj.user_id)
+
+    def delete_model(self, request, obj):
+        recipe_ids = list(obj.ingredient_recipes.values_list('recipe_id', flat=True))
+        super().delete_model(request, obj)
+        refresh_recipe_totals(recipe_ids)
+        invalidate_user_cache(obj.user_id)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(IngredientRecipe.objects.filter(ingredient__in=queryset).values_list('recipe_id', flat=True))
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_recipe_totals(recipe_ids)
+        for user_id in user_ids:
+            invalidate_user_cache(user_id)
+
 
 @admin.register(IngredientRecipe)
 class IngredientRecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'recipe', 'ingredient', 'ingredient_amount')
     search_fields = ('recipe__name', 'ingredient__name')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        recipe_ids = {obj.recipe_id, form.initial.get('recipe', obj.recipe_id)}
+        refresh_recipe_totals(recipe_ids)
+        invalidate_recipe_owners(recipe_ids)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_recipe_totals([obj.recipe_id])
+        invalidate_recipe_owners([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_recipe_totals(recipe_ids)
+        invalidate_recipe_owners(recipe_ids)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RecipeAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipe_app'
+
+    def ready(self):
+        from recipe_app import signals  # noqa: F401
+        from recipe_app.utils import images  # noqa: F401, registers its job handlers
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class ExpiringLRUCache:
+    """
+    Thread-safe mapping of at most ``maxsize`` entries, least recently used dropped first,
+    each entry also dropped at its own ``expires_at`` (a time.time() timestamp).
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class UserStatus(NamedTuple):
+    is_active: bool
+    # md5 of the password hash, only kept with simplejwt's CHECK_REVOKE_TOKEN
+    password_digest: str
+
+
+# per process; raw token to its validated token, user id to UserStatus
+validated_tokens = ExpiringLRUCache(settings.JWT_TOKEN_CACHE_SIZE)
+user_statuses = ExpiringLRUCache(settings.JWT_USER_STATUS_CACHE_SIZE)
+
+
+def forget_user_status(user) -> None:
+    """Drop the cached status of ``user``, e.g. when they are deactivated or deleted."""
+    user_statuses.pop(getattr(user, api_settings.USER_ID_FIELD))
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    simplejwt's JWTAuthentication without a user query per request. A token's signature
+    and claims are verified once and the result kept until it expires. The user is built
+    from the token's user id rather than loaded: a User with only ``id`` set, enough for
+    queries and foreign keys, whose other fields load from the database on first access.
+    Whether the user is active (and their password digest for CHECK_REVOKE_TOKEN) is
+    read once per JWT_USER_STATUS_TTL.
+
+    ``aauthenticate`` is used by async views (see AsyncPydanticAPIView) to read the
+    status with the async ORM instead of blocking.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = validated_tokens.get(raw_token)
+        if validated_token is None:
+            validated_token = super().get_validated_token(raw_token)
+            validated_tokens.set(raw_token, validated_token, validated_token.get('exp', 0))
+        return validated_token
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        status = user_statuses.get(user_id)
+        if status is None:
+            status = self.remember_status(user_id, self.status_query(user_id).first())
+        return self.build_user(validated_token, user_id, status)
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        status = user_statuses.get(user_id)
+        if status is None:
+            status = self.remember_status(user_id, await self.status_query(user_id).afirst())
+        return self.build_user(validated_token, user_id, status)
+
+    def get_user_id(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return self.user_model._meta.get_field(api_settings.USER_ID_FIELD).to_python(user_id)
+
+    def status_query(self, user_id):
+        users = self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+        return users.values_list('is_active', 'password')
+
+    @staticmethod
+    def remember_status(user_id, row) -> UserStatus:
+        if row is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        is_active, password = row
+        status = UserStatus(is_active, get_md5_hash_password(password) if api_settings.CHECK_REVOKE_TOKEN else '')
+        user_statuses.set(user_id, status, time.time() + settings.JWT_USER_STATUS_TTL)
+        return status
+
+    def build_user(self, validated_token, user_id, status: UserStatus):
+        if not status.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != status.password_digest:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        loaded = {api_settings.USER_ID_FIELD: user_id, 'is_active': True}
+        fields = [f.attname for f in self.user_model._meta.concrete_fields if f.attname in loaded]
+        return self.user_model.from_db(router.db_for_read(self.user_model), fields, [loaded[f] for f in fields])
+
+
+class JWTAuthenticationScheme(SimpleJWTScheme):
+    """Document JWTAuthentication in the OpenAPI schema like simplejwt's own class."""
+
+    target_class = JWTAuthentication
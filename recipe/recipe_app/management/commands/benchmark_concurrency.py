@@ -0,0 +1,154 @@
+import asyncio
+import statistics
+import threading
+import time
+import types
+
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import path
+from rest_framework_simplejwt.tokens import AccessToken
+
+from recipe_app.models import Ingredient, IngredientRecipe, Recipe
+from recipe_app.utils.recipe_totals import refresh_recipe_totals
+from recipe_app.views import (
+    AsyncIngredientListCreateView,
+    AsyncRecipeDetailView,
+    AsyncRecipeListCreateView,
+    IngredientListCreateView,
+    RecipeDetailView,
+    RecipeListCreateView,
+)
+
+MODES = {
+    'sync': (IngredientListCreateView, RecipeListCreateView, RecipeDetailView),
+    'async': (AsyncIngredientListCreateView, AsyncRecipeListCreateView, AsyncRecipeDetailView),
+}
+
+
+def mode_urlconf(mode: str):
+    ingredient_list, recipe_list, recipe_detail = MODES[mode]
+    urlconf = types.ModuleType(f'benchmark_{mode}_urls')
+    urlconf.urlpatterns = [
+        path('api/ingredients/', ingredient_list.as_view()),
+        path('api/recipes/', recipe_list.as_view()),
+        path('api/recipes/<int:pk>/', recipe_detail.as_view()),
+    ]
+    return urlconf
+
+
+async def asgi_get(application, url: str, token: str) -> int:
+    """Send one GET through ``application`` the way an ASGI server would and return the status code."""
+    url_path, _, query = url.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': url_path,
+        'raw_path': url_path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'authorization', f'Bearer {token}'.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    requested = False
+    never = asyncio.Event()
+    status = None
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # the client stays connected, the handler cancels this once the response is sent
+        await never.wait()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    return status
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync and async read views under concurrent load through Django's ASGI handler. "
+        "Runs against a temporary test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per mode.")
+        parser.add_argument('--concurrency', type=int, default=100, help="Requests in flight at a time.")
+        parser.add_argument('--recipes', type=int, default=500, help="Recipes created for the benchmark user.")
+        parser.add_argument('--url', default='/api/recipes/?limit=20', help="URL requested.")
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            token = self.populate(options['recipes'])
+            # no response cache and no ETags sent: every request builds its page
+            with override_settings(RESPONSE_CACHE_TIMEOUT=0, ALLOWED_HOSTS=['*']):
+                for mode in MODES:
+                    with override_settings(ROOT_URLCONF=mode_urlconf(mode)):
+                        result = asyncio.run(self.run_mode(token, options))
+                    self.report(mode, result)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def populate(self, recipes: int) -> str:
+        user = User.objects.create_user(username='benchmark', password='benchmark')
+        ingredients = Ingredient.objects.bulk_create(
+            [Ingredient(name=f"Ingredient {i}", cost=i + 1, user=user) for i in range(20)]
+        )
+        recipe_objs = Recipe.objects.bulk_create(
+            [Recipe(name=f"Recipe {i}", description="desc", user=user) for i in range(recipes)]
+        )
+        IngredientRecipe.objects.bulk_create(
+            [
+                IngredientRecipe(recipe=recipe, ingredient=ingredients[(i + j) % 20], ingredient_amount=j + 1)
+                for i, recipe in enumerate(recipe_objs)
+                for j in range(5)
+            ]
+        )
+        refresh_recipe_totals()
+        return str(AccessToken.for_user(user))
+
+    async def run_mode(self, token: str, options) -> dict:
+        application = ASGIHandler()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        latencies, statuses = [], []
+        peak_threads = threading.active_count()
+
+        async def one():
+            nonlocal peak_threads
+            async with semaphore:
+                started = time.perf_counter()
+                statuses.append(await asgi_get(application, options['url'], token))
+                latencies.append(time.perf_counter() - started)
+                peak_threads = max(peak_threads, threading.active_count())
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'throughput': len(latencies) / elapsed,
+            'p50': statistics.median(latencies),
+            'p99': latencies[int(len(latencies) * 0.99) - 1],
+            'errors': sum(1 for status in statuses if status != 200),
+            'threads': peak_threads,
+        }
+
+    def report(self, mode: str, result: dict):
+        self.stdout.write(
+            f"{mode:<6} {result['throughput']:8.1f} req/s  p50 {result['p50'] * 1000:7.1f} ms  "
+            f"p99 {result['p99'] * 1000:7.1f} ms  peak threads {result['threads']:4d}  errors {result['errors']}"
+        )
@@ -0,0 +1,70 @@
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from recipe_app.pydantic_base_view import PydanticResponse
+from recipe_app.schemas.responses import RecipeIngredientResponse, RecipeListResponse, RecipeResponse
+
+
+def sample_recipe_list(recipes: int, ingredients: int) -> RecipeListResponse:
+    data = []
+    for i in range(recipes):
+        lines = [
+            RecipeIngredientResponse(
+                id=j,
+                name=f"Ingredient {j}",
+                cost=Decimal('1.25') + j,
+                unit='g',
+                ingredient_amount=j + 1,
+                ingredient_price=(Decimal('1.25') + j) * (j + 1),
+            )
+            for j in range(ingredients)
+        ]
+        data.append(
+            RecipeResponse(
+                id=i,
+                name=f"Recipe {i}",
+                description="Mix everything and bake for 40 minutes.",
+                image=f"/media/recipes/{i}.jpg",
+                ingredients=lines,
+                total_price=sum(line.ingredient_price for line in lines),
+                ingredient_count=ingredients,
+            )
+        )
+    return RecipeListResponse(result="ok", data=data, next="bmV4dA", prev=None)
+
+
+class Command(BaseCommand):
+    help = "Compare rendering a recipe list via model_dump + DRF's JSONRenderer with PydanticResponse."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000, help="Recipes in the list.")
+        parser.add_argument('--ingredients', type=int, default=8, help="Ingredients per recipe.")
+        parser.add_argument('--repeat', type=int, default=20, help="Renders timed per path; the best run is reported.")
+
+    def handle(self, *args, **options):
+        model = sample_recipe_list(options['recipes'], options['ingredients'])
+        renderer = JSONRenderer()
+
+        def dict_path():
+            return renderer.render(model.model_dump(mode="json"), 'application/json', {})
+
+        def pydantic_path():
+            return PydanticResponse(model).json_bytes()
+
+        if dict_path() != pydantic_path():
+            raise CommandError("The two paths render different JSON.")
+
+        size = len(pydantic_path())
+        timings = {}
+        for name, render in (('model_dump + JSONRenderer', dict_path), ('PydanticResponse', pydantic_path)):
+            timings[name] = min(timeit.repeat(render, number=1, repeat=options['repeat']))
+            self.stdout.write(f"{name:<28} {timings[name] * 1000:8.2f} ms")
+        speedup = timings['model_dump + JSONRenderer'] / timings['PydanticResponse']
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{options['recipes']} recipes, {size} bytes: PydanticResponse is {speedup:.1f}x faster."
+            )
+        )
@@ -0,0 +1,44 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe_app.utils.export import CONTENT_TYPES, EXPORTS, export_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        "Export a user's recipes or ingredients as JSON lines or CSV to a file ('-' writes to stdout). Rows are "
+        "streamed, so memory use does not grow with the size of the account."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to write, or '-' for stdout. A .gz suffix implies --gzip.")
+        parser.add_argument('--user', required=True, help="Username whose data is exported.")
+        parser.add_argument('--kind', choices=sorted(EXPORTS), default='recipes', help="What to export.")
+        parser.add_argument('--format', choices=sorted(CONTENT_TYPES), default='jsonl', help="Output format.")
+        parser.add_argument('--gzip', action='store_true', help="Compress the output with gzip.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist.")
+        path = options['path']
+        compress = options['gzip'] or path.endswith('.gz')
+        chunks = export_chunks(user, options['kind'], options['format'], compress)
+
+        if path == '-':
+            self.write(chunks, sys.stdout.buffer)
+            return
+        with open(path, 'wb') as file:
+            written = self.write(chunks, file)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} bytes to {path}."))
+
+    @staticmethod
+    def write(chunks, file) -> int:
+        written = 0
+        for chunk in chunks:
+            file.write(chunk)
+            written += len(chunk)
+        return written
@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipe_app.models import ImageBlob
+from recipe_app.utils.blobs import delete_blob_files, recently_used, recount_blobs, untracked_blob_files
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete recipe image blobs no recipe references any more, with their variants, and blob files without a "
+        "database row. Blobs touched within the grace period are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-seconds',
+            type=int,
+            default=settings.IMAGE_BLOB_GC_GRACE_SECONDS,
+            help="Keep blobs written or referenced more recently than this.",
+        )
+        parser.add_argument(
+            '--recount', action='store_true', help="Recompute reference counts from the recipes before collecting."
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be deleted without deleting.")
+
+    def handle(self, *args, **options):
+        grace = options['grace_seconds']
+        dry_run = options['dry_run']
+        if options['recount']:
+            self.stdout.write(f"Corrected the reference count of {recount_blobs()} blobs.")
+
+        deleted = freed = 0
+        for blob in list(ImageBlob.objects.filter(ref_count__lte=0)):
+            if recently_used(blob.name, grace):
+                continue
+            if dry_run:
+                deleted += 1
+                freed += blob.size
+                continue
+            # conditional, an upload may have referenced the blob again since it was read
+            if ImageBlob.objects.filter(pk=blob.pk, ref_count__lte=0).delete()[0]:
+                deleted += 1
+                freed += delete_blob_files(blob.name)
+
+        cutoff = time.time() - grace
+        stray = [name for name, modified in untracked_blob_files() if modified < cutoff]
+        for name in stray:
+            if not dry_run:
+                freed += delete_blob_files(name)
+
+        action = "Would delete" if dry_run else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(f"{action} {deleted} unreferenced and {len(stray)} untracked blobs, {freed} bytes.")
+        )
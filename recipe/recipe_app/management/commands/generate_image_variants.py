@@ -0,0 +1,54 @@
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipe_app.models import Recipe
+from recipe_app.utils.image_variants import render_variants
+from recipe_app.utils.images import store_variants, variant_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the resized variants of recipe images that have none yet, e.g. uploaded before variants existed "
+        "or whose rendering failed. Uses IMAGE_WORKERS processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Render again for every recipe with an image.")
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            recipes = recipes.filter(image_variants={})
+        rows = list(recipes.values_list('id', 'user_id', 'image'))
+        # recipes sharing an image blob share its variants, each image is rendered once
+        by_image = defaultdict(list)
+        for recipe_id, user_id, image_name in rows:
+            by_image[image_name].append((recipe_id, user_id))
+        jobs = [variant_job(image_name) for image_name in by_image]
+
+        if settings.IMAGE_WORKERS:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(settings.IMAGE_WORKERS, mp_context=context) as pool:
+                futures = [pool.submit(render_variants, *job) for job in jobs]
+                stored = self.store(by_image, (future.result for future in futures))
+        else:
+            stored = self.store(by_image, (partial(render_variants, *job) for job in jobs))
+        self.stdout.write(self.style.SUCCESS(f"Rendered image variants for {stored} of {len(rows)} recipes."))
+
+    def store(self, by_image, renders) -> int:
+        stored = 0
+        for (image_name, recipes), render in zip(by_image.items(), renders):
+            try:
+                variants = render()
+            except Exception as e:
+                ids = ', '.join(str(recipe_id) for recipe_id, _ in recipes)
+                self.stderr.write(f"Recipes {ids}: cannot render {image_name}: {e}")
+                continue
+            for recipe_id, user_id in recipes:
+                stored += store_variants(recipe_id, user_id, image_name, variants)
+        return stored
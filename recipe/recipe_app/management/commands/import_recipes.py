@@ -0,0 +1,52 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe_app.utils.recipe_import import PARSERS, RecipeImporter, detect_format
+
+
+class Command(BaseCommand):
+    help = (
+        "Import recipes for a user from a JSONL or CSV file ('-' reads stdin). The file is read and written in "
+        "chunks, so memory use does not grow with its size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin.")
+        parser.add_argument('--user', required=True, help="Username that will own the recipes.")
+        parser.add_argument('--format', choices=sorted(PARSERS), help="File format, by default from the extension.")
+        parser.add_argument('--chunk-size', type=int, help="Recipes per transaction (IMPORT_CHUNK_SIZE).")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist.")
+        fmt = detect_format(options['path'], options['format'])
+        if fmt is None:
+            raise CommandError("Cannot tell the format from the file name, pass --format.")
+
+        importer = RecipeImporter(user, chunk_size=options['chunk_size'], progress=self.progress)
+        if options['path'] == '-':
+            report = importer.run(PARSERS[fmt](sys.stdin))
+        else:
+            with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+                report = importer.run(PARSERS[fmt](lines))
+
+        for error in report.errors:
+            self.stdout.write(f"Line {error.line}: {error.message}")
+        if report.failed > len(report.errors):
+            self.stdout.write(f"... and {report.failed - len(report.errors)} more errors.")
+        style = self.style.WARNING if report.failed else self.style.SUCCESS
+        self.stdout.write(
+            style(
+                f"Imported {report.imported} of {report.rows} recipes in {report.seconds:.1f} s, {report.failed} failed."
+            )
+        )
+
+    def progress(self, report):
+        self.stdout.write(
+            f"{report.rows} rows, {report.imported} imported, {report.failed} failed, "
+            f"{report.rows_per_second:.0f} rows/s"
+        )
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipe_app.models import Recipe
+from recipe_app.utils.common import round_decimal
+from recipe_app.utils.recipe_totals import recipe_count_subquery, recipe_total_subquery, refresh_recipe_totals
+from recipe_app.utils.response_cache import invalidate_user_cache
+
+
+class Command(BaseCommand):
+    help = "Rebuild the stored total_price and ingredient_count of every recipe, or verify them with --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Only report recipes whose stored totals differ from their ingredients; exit non-zero if any do.",
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            self.check_totals()
+            return
+        with transaction.atomic():
+            updated = refresh_recipe_totals()
+            # cached reads may show the totals just rebuilt
+            for user_id in Recipe.objects.values_list('user_id', flat=True).distinct():
+                invalidate_user_cache(user_id)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt totals for {updated} recipes."))
+
+    def check_totals(self):
+        queryset = Recipe.objects.annotate(
+            expected_total=recipe_total_subquery(), expected_count=recipe_count_subquery()
+        ).values_list('id', 'total_price', 'ingredient_count', 'expected_total', 'expected_count')
+
+        mismatches = 0
+        for recipe_id, total, count, expected_total, expected_count in queryset.iterator(chunk_size=2000):
+            if round_decimal(total) != round_decimal(expected_total) or count != expected_count:
+                mismatches += 1
+                self.stdout.write(
+                    f"Recipe {recipe_id}: stored total={total} count={count}, "
+                    f"expected total={expected_total} count={expected_count}"
+                )
+        if mismatches:
+            raise CommandError(f"{mismatches} recipes have stale totals, run without --check to rebuild them.")
+        self.stdout.write(self.style.SUCCESS("All recipe totals are up to date."))
@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from recipe_app.utils.jobs import claim_jobs, requeue_stale_jobs, run_job
+
+# how often abandoned jobs are looked for
+STALE_CHECK_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (utils.jobs) in a pool of threads until interrupted. The queue is a database "
+        "table, so any number of these can run against the same database without a broker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.JOB_WORKER_THREADS,
+            help="Jobs run at once. 0 runs them one by one in this thread.",
+        )
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between polls of an idle queue.")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due instead of waiting.")
+
+    def handle(self, *args, **options):
+        if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+            self.stderr.write(
+                "The default cache is local to this process: reads cached by the web server will not see job results "
+                "until they expire. Configure a cache shared with it."
+            )
+        self.burst = options['burst']
+        self.poll_interval = options['poll_interval']
+        self.completed = 0
+        try:
+            if options['threads']:
+                self.run_pool(options['threads'])
+            else:
+                self.run_inline()
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted, running jobs were finished.")
+        self.stdout.write(self.style.SUCCESS(f"Ran {self.completed} jobs."))
+
+    def run_inline(self):
+        last_stale_check = 0.0
+        while True:
+            last_stale_check = self.requeue_stale(last_stale_check)
+            jobs = claim_jobs(1)
+            if not jobs:
+                if self.burst:
+                    return
+                time.sleep(self.poll_interval)
+                continue
+            run_job(jobs[0])
+            self.completed += 1
+
+    def run_pool(self, threads: int):
+        last_stale_check = 0.0
+        running = set()
+        with ThreadPoolExecutor(threads, thread_name_prefix='job') as pool:
+            while True:
+                last_stale_check = self.requeue_stale(last_stale_check)
+                jobs = claim_jobs(threads - len(running)) if len(running) < threads else []
+                running.update(pool.submit(self.run_in_thread, job) for job in jobs)
+                if self.burst and not running:
+                    return
+                # wake up when a job finishes so its thread gets new work, or to poll again
+                done, running = wait(running, timeout=0 if jobs else self.poll_interval, return_when=FIRST_COMPLETED)
+                self.completed += len(done)
+                if not running and not jobs and not done:
+                    time.sleep(self.poll_interval)
+
+    @staticmethod
+    def run_in_thread(job):
+        try:
+            run_job(job)
+        finally:
+            # each pool thread has its own connection
+            connection.close()
+
+    def requeue_stale(self, last_check: float) -> float:
+        now = time.monotonic()
+        if now - last_check < STALE_CHECK_SECONDS:
+            return last_check
+        if not self.burst:
+            # a long-running process, drop connections past CONN_MAX_AGE or broken ones like a request would
+            close_old_connections()
+        requeue_stale_jobs()
+        return now
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.4 on 2026-10-18 05:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe_app', '0003_alter_ingredient_unique_together_ingredient_unit_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingredient',
+            name='unit',
+            field=models.CharField(
+                choices=[('l', 'liters'), ('g', 'grams'), ('pcs', 'pieces')], default='g', max_length=3
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'name', 'id'], name='ingredient_user_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'name', 'id'], name='recipe_user_name_id_idx'),
+        ),
+    ]
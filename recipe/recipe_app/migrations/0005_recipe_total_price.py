@@ -0,0 +1,49 @@
+# Generated by Django 5.0.4 on 2026-10-18 05:24
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_totals(apps, schema_editor):
+    Recipe = apps.get_model('recipe_app', 'Recipe')
+    IngredientRecipe = apps.get_model('recipe_app', 'IngredientRecipe')
+    price_field = DecimalField(max_digits=20, decimal_places=2)
+    rows = IngredientRecipe.objects.filter(recipe=OuterRef('pk')).values('recipe')
+    total = rows.annotate(total=Sum(F('ingredient_amount') * F('ingredient__cost'), output_field=price_field)).values(
+        'total'
+    )
+    count = rows.annotate(n=Count('id')).values('n')
+    Recipe.objects.update(
+        total_price=Coalesce(Subquery(total, output_field=price_field), Value(Decimal('0')), output_field=price_field),
+        ingredient_count=Coalesce(Subquery(count, output_field=IntegerField()), Value(0), output_field=IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe_app', '0004_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'total_price', 'id'], name='recipe_user_price_id_idx'),
+        ),
+        migrations.RunPython(populate_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,206 @@
+# Generated by Django 5.0.4 on 2026-10-18 05:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+RECIPE_INGREDIENT_NAMES = (
+    "(SELECT COALESCE(group_concat(i.name, ' '), '') FROM recipe_app_ingredientrecipe ir "
+    "JOIN recipe_app_ingredient i ON i.id = ir.ingredient_id WHERE ir.recipe_id = {recipe_id})"
+)
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE recipe_app_recipe_fts USING fts5("
+    "name, description, ingredients, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE recipe_app_ingredient_fts USING fts5("
+    "name, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    # recipes
+    "CREATE TRIGGER recipe_app_recipe_fts_ai AFTER INSERT ON recipe_app_recipe BEGIN "
+    "INSERT INTO recipe_app_recipe_fts(rowid, name, description, ingredients) "
+    "VALUES (new.id, new.name, new.description, ''); END",
+    "CREATE TRIGGER recipe_app_recipe_fts_au AFTER UPDATE OF name, description ON recipe_app_recipe BEGIN "
+    "UPDATE recipe_app_recipe_fts SET name = new.name, description = new.description WHERE rowid = new.id; END",
+    "CREATE TRIGGER recipe_app_recipe_fts_ad AFTER DELETE ON recipe_app_recipe BEGIN "
+    "DELETE FROM recipe_app_recipe_fts WHERE rowid = old.id; END",
+    # ingredient names shown in a recipe
+    "CREATE TRIGGER recipe_app_ingredientrecipe_fts_ai AFTER INSERT ON recipe_app_ingredientrecipe BEGIN "
+    "UPDATE recipe_app_recipe_fts SET ingredients = "
+    + RECIPE_INGREDIENT_NAMES.format(recipe_id='new.recipe_id')
+    + " WHERE rowid = new.recipe_id; END",
+    "CREATE TRIGGER recipe_app_ingredientrecipe_fts_ad AFTER DELETE ON recipe_app_ingredientrecipe BEGIN "
+    "UPDATE recipe_app_recipe_fts SET ingredients = "
+    + RECIPE_INGREDIENT_NAMES.format(recipe_id='old.recipe_id')
+    + " WHERE rowid = old.recipe_id; END",
+    "CREATE TRIGGER recipe_app_ingredientrecipe_fts_au AFTER UPDATE OF ingredient_id, recipe_id "
+    "ON recipe_app_ingredientrecipe BEGIN "
+    "UPDATE recipe_app_recipe_fts SET ingredients = "
+    + RECIPE_INGREDIENT_NAMES.format(recipe_id='recipe_app_recipe_fts.rowid')
+    + " WHERE rowid IN (old.recipe_id, new.recipe_id); END",
+    # ingredients
+    "CREATE TRIGGER recipe_app_ingredient_fts_ai AFTER INSERT ON recipe_app_ingredient BEGIN "
+    "INSERT INTO recipe_app_ingredient_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER recipe_app_ingredient_fts_au AFTER UPDATE OF name ON recipe_app_ingredient BEGIN "
+    "UPDATE recipe_app_ingredient_fts SET name = new.name WHERE rowid = new.id; "
+    "UPDATE recipe_app_recipe_fts SET ingredients = "
+    + RECIPE_INGREDIENT_NAMES.format(recipe_id='recipe_app_recipe_fts.rowid')
+    + " WHERE rowid IN (SELECT recipe_id FROM recipe_app_ingredientrecipe WHERE ingredient_id = new.id); END",
+    "CREATE TRIGGER recipe_app_ingredient_fts_ad AFTER DELETE ON recipe_app_ingredient BEGIN "
+    "DELETE FROM recipe_app_ingredient_fts WHERE rowid = old.id; END",
+    # existing rows
+    "INSERT INTO recipe_app_recipe_fts(rowid, name, description, ingredients) "
+    "SELECT r.id, r.name, r.description, " + RECIPE_INGREDIENT_NAMES.format(recipe_id='r.id') + " "
+    "FROM recipe_app_recipe r",
+    "INSERT INTO recipe_app_ingredient_fts(rowid, name) SELECT id, name FROM recipe_app_ingredient",
+]
+
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS recipe_app_recipe_fts_ai",
+    "DROP TRIGGER IF EXISTS recipe_app_recipe_fts_au",
+    "DROP TRIGGER IF EXISTS recipe_app_recipe_fts_ad",
+    "DROP TRIGGER IF EXISTS recipe_app_ingredientrecipe_fts_ai",
+    "DROP TRIGGER IF EXISTS recipe_app_ingredientrecipe_fts_ad",
+    "DROP TRIGGER IF EXISTS recipe_app_ingredientrecipe_fts_au",
+    "DROP TRIGGER IF EXISTS recipe_app_ingredient_fts_ai",
+    "DROP TRIGGER IF EXISTS recipe_app_ingredient_fts_au",
+    "DROP TRIGGER IF EXISTS recipe_app_ingredient_fts_ad",
+    "DROP TABLE IF EXISTS recipe_app_recipe_fts",
+    "DROP TABLE IF EXISTS recipe_app_ingredient_fts",
+]
+
+# InnoDB maintains FULLTEXT indexes itself, no triggers needed
+MYSQL_FTS = [
+    "ALTER TABLE recipe_app_recipe ADD FULLTEXT INDEX recipe_fulltext_idx (name, description)",
+    "ALTER TABLE recipe_app_ingredient ADD FULLTEXT INDEX ingredient_fulltext_idx (name)",
+]
+
+MYSQL_FTS_DROP = [
+    "ALTER TABLE recipe_app_recipe DROP INDEX recipe_fulltext_idx",
+    "ALTER TABLE recipe_app_ingredient DROP INDEX ingredient_fulltext_idx",
+]
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_fulltext(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite' and sqlite_has_fts5(connection):
+        statements = SQLITE_FTS
+    elif connection.vendor == 'mysql':
+        statements = MYSQL_FTS
+    else:
+        # Other databases use the trigram fallback only
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_fulltext(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_FTS_DROP, 'mysql': MYSQL_FTS_DROP}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def trigrams(name):
+    name = name.lower()
+    return {name[i : i + 3] for i in range(len(name) - 2)}
+
+
+def populate_trigrams(apps, schema_editor):
+    for model_name, trigram_model_name, fk in (
+        ('Recipe', 'RecipeTrigram', 'recipe_id'),
+        ('Ingredient', 'IngredientTrigram', 'ingredient_id'),
+    ):
+        Model = apps.get_model('recipe_app', model_name)
+        TrigramModel = apps.get_model('recipe_app', trigram_model_name)
+        rows = []
+        for obj_id, user_id, name in Model.objects.values_list('id', 'user_id', 'name').iterator():
+            rows.extend(TrigramModel(user_id=user_id, trigram=t, **{fk: obj_id}) for t in trigrams(name))
+        TrigramModel.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe_app', '0006_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientTrigram',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('trigram', models.CharField(max_length=3)),
+                (
+                    'ingredient',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='trigrams',
+                        to='recipe_app.ingredient',
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='+',
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'trigram'], name='ingredient_trigram_user_idx')],
+                'unique_together': {('ingredient', 'trigram')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeTrigram',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('trigram', models.CharField(max_length=3)),
+                (
+                    'recipe',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='trigrams',
+                        to='recipe_app.recipe',
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='+',
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'trigram'], name='recipe_trigram_user_idx')],
+                'unique_together': {('recipe', 'trigram')},
+            },
+        ),
+        migrations.RunPython(populate_trigrams, migrations.RunPython.noop),
+        migrations.RunPython(create_fulltext, drop_fulltext),
+    ]
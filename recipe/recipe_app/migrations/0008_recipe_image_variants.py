@@ -0,0 +1,38 @@
+# Generated by Django 5.0.4 on 2026-10-18 06:04
+
+import importlib
+
+from django.db import migrations, models
+
+search_indexes = importlib.import_module('recipe_app.migrations.0007_search_indexes')
+
+RECIPE_FTS_TRIGGERS = [sql for sql in search_indexes.SQLITE_FTS if ' ON recipe_app_recipe BEGIN ' in sql]
+
+
+def restore_recipe_fts_triggers(apps, schema_editor):
+    # SQLite adds the column by rebuilding recipe_app_recipe, which drops the full-text triggers on it
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipe_app_recipe_fts'")
+        if cursor.fetchone() is None:
+            return
+    for sql in RECIPE_FTS_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe_app', '0007_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(restore_recipe_fts_triggers, migrations.RunPython.noop),
+    ]
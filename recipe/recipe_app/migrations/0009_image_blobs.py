@@ -0,0 +1,51 @@
+# Generated by Django 5.0.4 on 2026-10-18 06:09
+
+import importlib
+
+import recipe_app.models
+import recipe_app.storage
+from django.db import migrations, models
+
+image_variants = importlib.import_module('recipe_app.migrations.0008_recipe_image_variants')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe_app', '0008_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=recipe_app.storage.recipe_image_storage,
+                upload_to='recipes/',
+                validators=[recipe_app.models.validate_image],
+            ),
+        ),
+        # the storage change rebuilds recipe_app_recipe on SQLite as well
+        migrations.RunPython(image_variants.restore_recipe_fts_triggers, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from rest_framework.exceptions import ValidationError
 
+from recipe_app.storage import recipe_image_storage
+
 
 class Ingredient(models.Model):
     class Unit(models.TextChoices):
@@ -13,34 +17,102 @@ class Ingredient(models.Model):
     cost = models.DecimalField(decimal_places=2, max_digits=20, default=0)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ingredients')
     unit = models.CharField(max_length=3, choices=Unit.choices, default=Unit.GRAM)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('name', 'unit', 'user')
+        indexes = [models.Index(fields=['user', 'name', 'id'], name='ingredient_user_name_id_idx')]
 
     def __str__(self):
         return self.name
 
 
 def validate_image(image):
-    max_size_mb = 5  # 5 MB
-    if image.size > max_size_mb * 1024 * 1024:
-        raise ValidationError(f"Image size exceeds the allowed limit: {max_size_mb} MB")
+    # the same limit as uploads through the API, see settings.IMAGE_MAX_UPLOAD_SIZE
+    if image.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+        limit = settings.IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)
+        raise ValidationError(f"Image size exceeds the allowed limit ({limit} MB).")
 
 
 class Recipe(models.Model):
     name = models.CharField(max_length=200)
-    image = models.ImageField(upload_to='recipes/', validators=[validate_image], null=True, blank=True)
+    image = models.ImageField(
+        upload_to='recipes/', storage=recipe_image_storage, validators=[validate_image], null=True, blank=True
+    )
+    # Storage names of the resized copies of image by size and format, filled in by utils.images once rendered
+    image_variants = models.JSONField(default=dict, blank=True)
     description = models.TextField()
     ingredients = models.ManyToManyField(Ingredient, through='IngredientRecipe')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recipes')
+    # Denormalized from ingredient_recipes, maintained by utils.recipe_totals on every write
+    total_price = models.DecimalField(decimal_places=2, max_digits=20, default=0)
+    ingredient_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('name', 'user')
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'], name='recipe_user_name_id_idx'),
+            models.Index(fields=['user', 'total_price', 'id'], name='recipe_user_price_id_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ImageBlob(models.Model):
+    """
+    An image file of ContentAddressedStorage and the number of recipes pointing at it,
+    kept by utils.blobs. Blobs nobody references are deleted by gc_image_blobs.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 
+class Job(models.Model):
+    """
+    A unit of background work, run by a handler registered for ``kind`` in utils.jobs when
+    the run_workers command claims it. Failed runs are retried with backoff.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'queued'
+        RUNNING = 'running', 'running'
+        SUCCEEDED = 'succeeded', 'succeeded'
+        FAILED = 'failed', 'failed'
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    # whose job it is, only they can poll it; None for system jobs
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    # set by the worker that claimed the job, a stale worker cannot record a result over a newer run
+    claim_token = models.CharField(max_length=32, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            models.Index(fields=['user', 'id'], name='job_user_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+
 class IngredientRecipe(models.Model):
     ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='ingredient_recipes')
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='ingredient_recipes')
@@ -51,3 +123,32 @@ class IngredientRecipe(models.Model):
 
     def __str__(self):
         return f"{self.recipe.name} - {self.ingredient.name}"
+
+
+class NameTrigram(models.Model):
+    """
+    One lowercase 3-character slice of an object's name. Lets substring filters find
+    candidate rows through an index instead of scanning with LIKE '%...%'.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        abstract = True
+
+
+class RecipeTrigram(NameTrigram):
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='trigrams')
+
+    class Meta:
+        unique_together = ('recipe', 'trigram')
+        indexes = [models.Index(fields=['user', 'trigram'], name='recipe_trigram_user_idx')]
+
+
+class IngredientTrigram(NameTrigram):
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='trigrams')
+
+    class Meta:
+        unique_together = ('ingredient', 'trigram')
+        indexes = [models.Index(fields=['user', 'trigram'], name='ingredient_trigram_user_idx')]
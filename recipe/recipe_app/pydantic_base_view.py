@@ -1,6 +1,75 @@
+import functools
+import json
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
 from rest_framework.views import APIView
-from rest_framework.exceptions import ValidationError as DRFValidationError
-from pydantic import ValidationError as PydanticValidationError
+from rest_framework.exceptions import APIException, ValidationError as DRFValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from pydantic import BaseModel, TypeAdapter, ValidationError as PydanticValidationError
+
+from recipe_app.utils.uploads import SizeLimitUploadHandler
+
+
+@functools.lru_cache(maxsize=None)
+def type_adapter(model_class) -> TypeAdapter:
+    return TypeAdapter(model_class)
+
+
+class PydanticResponse(Response):
+    """
+    Response for a pydantic model that the JSON renderer receives as bytes produced by
+    pydantic's serializer in one pass, instead of a dict re-encoded by the json module.
+
+    ``data`` is still available (e.g. for the browsable API and tests) and is built
+    lazily. A response can also wrap JSON that was serialized earlier, see ``from_json``.
+    """
+
+    def __init__(self, model: BaseModel = None, status=None, headers=None, include=None):
+        super().__init__(None, status=status, headers=headers)
+        self.model = model
+        self.include = include
+        self._json_content = None
+
+    @classmethod
+    def from_json(cls, content: bytes, status=None, headers=None) -> 'PydanticResponse':
+        response = cls(status=status, headers=headers)
+        response._json_content = content
+        return response
+
+    @property
+    def data(self):
+        if self._data is None and self.model is not None:
+            self._data = self.model.model_dump(mode="json", include=self.include)
+        elif self._data is None and self._json_content is not None:
+            self._data = json.loads(self._json_content)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    def json_bytes(self) -> bytes:
+        if self._json_content is None:
+            content = type_adapter(type(self.model)).dump_json(self.model, include=self.include)
+            # same escaping as DRF's JSONRenderer, keeps the output a strict JavaScript subset
+            self._json_content = content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return self._json_content
+
+    @property
+    def rendered_content(self):
+        renderer = getattr(self, 'accepted_renderer', None)
+        if (
+            type(renderer) is JSONRenderer
+            and not renderer.ensure_ascii
+            and renderer.get_indent(self.accepted_media_type, self.renderer_context) is None
+            and (self.model is not None or self._json_content is not None)
+        ):
+            self['Content-Type'] = self.content_type or renderer.media_type
+            return self.json_bytes()
+        return super().rendered_content
 
 
 class PydanticAPIView(APIView):
@@ -22,30 +91,98 @@ class PydanticAPIView(APIView):
         except PydanticValidationError as e:
             raise DRFValidationError(e.errors())
 
+    def parse_query_params(self, model):
+        try:
+            return model(**self.request.query_params.dict())
+        except PydanticValidationError as e:
+            raise DRFValidationError(e.errors(include_context=False))
+
+
+class AsyncPydanticAPIView(PydanticAPIView):
+    """
+    PydanticAPIView dispatched as a coroutine, so under ASGI a request does not hold a
+    thread while it waits. Authentication uses an authenticator's ``aauthenticate`` when
+    it has one. ``async def`` handlers are awaited; plain handlers (e.g. writes that need
+    ``transaction.atomic``) run in a worker thread through ``sync_to_async``.
+    """
+
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.aperform_authentication(request)
+            # the user is resolved now, so the sync checks do no I/O
+            self.initial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aperform_authentication(self, request):
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, 'aauthenticate'):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
 
 class FileUploadPydanticAPIView(PydanticAPIView):
     """
     Custom APIView for file upload endpoints.
-    Creates a mutable copy of request.data (without modifying the original)
-    and removes specified file fields before validation.
+    Validates the fields of request.data other than the specified file fields.
+
+    Views with ``max_upload_size`` spool uploaded files straight to disk and stop reading a
+    file at that size, see ``upload_too_large``.
     """
 
     file_fields: list[str] = []
+    max_upload_size: Optional[int] = None
 
     def initial(self, request, *args, **kwargs):
-        # Create a mutable copy of the incoming data without changing request.data
-        try:
-            mutable_data = request.data.copy()
-        except Exception:
-            mutable_data = dict(request.data)
-        for field in self.file_fields:
-            mutable_data.pop(field, None)
-        # Store the mutable data for later use in validation
-        self._validated_request_data = mutable_data
+        self.size_limit = None
+        if self.max_upload_size is not None:
+            # set before request.data parses the body
+            self.size_limit = SizeLimitUploadHandler(self.max_upload_size, request._request)
+            request._request.upload_handlers = [self.size_limit, TemporaryFileUploadHandler(request._request)]
         super().initial(request, *args, **kwargs)
 
+    @property
+    def upload_too_large(self) -> bool:
+        return self.size_limit is not None and self.size_limit.exceeded
+
     def validate_request_data(self):
-        data = getattr(self, '_validated_request_data', self.request.data)
+        # parsed here, after authentication, so uploads of anonymous requests are never read; the
+        # other fields are picked out rather than copying request.data, which would copy the files
+        data = {key: value for key, value in self.request.data.items() if key not in self.file_fields}
         try:
             validated_data = self.pydantic_model(**data)
             self.request.pydantic = validated_data
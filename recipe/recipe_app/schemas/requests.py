@@ -1,5 +1,12 @@
-from pydantic import BaseModel, Field, condecimal, constr, conint
-from typing import List, Literal
+from decimal import Decimal
+
+from pydantic import BaseModel, Field, condecimal, constr, conint, model_validator
+from typing import Any, Dict, List, Literal, Optional, Set, get_args
+
+from django.conf import settings
+
+from recipe_app.schemas.responses import RecipeResponse
+from recipe_app.utils.pagination import ORDERINGS, decode_cursor
 
 
 class IngredientInput(BaseModel):
@@ -8,6 +15,67 @@ class IngredientInput(BaseModel):
     unit: Literal['g', 'l', 'pcs'] = 'g'
 
 
+class IngredientBulkInput(BaseModel):
+    upsert: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description="Ingredients to create, or to update by name and unit. Items are validated one by one.",
+    )
+    delete: List[int] = Field(default_factory=list, description="Ids of ingredients to delete.")
+
+    @model_validator(mode='after')
+    def check_size(self):
+        if len(self.upsert) + len(self.delete) > settings.INGREDIENT_BULK_MAX_ITEMS:
+            raise ValueError(f'At most {settings.INGREDIENT_BULK_MAX_ITEMS} items per request.')
+        return self
+
+
+class BatchOperationInput(BaseModel):
+    method: Literal['POST', 'PUT', 'PATCH', 'DELETE']
+    path: constr(min_length=1, max_length=200) = Field(description="An ingredient or recipe URL, e.g. `/api/recipes/`.")
+    body: Optional[Dict[str, Any]] = None
+    ref: Optional[constr(pattern=r'^[A-Za-z_][A-Za-z0-9_]*$')] = Field(
+        None, description="Name under which later operations can use the created id, as `$name` in path or body."
+    )
+
+    @model_validator(mode='after')
+    def check_ref(self):
+        if self.ref and self.method == 'DELETE':
+            raise ValueError('A DELETE operation has no id to ref.')
+        return self
+
+
+class BatchInput(BaseModel):
+    operations: List[BatchOperationInput]
+
+    @model_validator(mode='after')
+    def check_operations(self):
+        if not 0 < len(self.operations) <= settings.BATCH_MAX_OPERATIONS:
+            raise ValueError(f'Give 1 to {settings.BATCH_MAX_OPERATIONS} operations.')
+        refs = [op.ref for op in self.operations if op.ref]
+        if len(refs) != len(set(refs)):
+            raise ValueError('Each ref can be used only once.')
+        return self
+
+
+class PriceChangeInput(BaseModel):
+    ingredient_id: int
+    new_cost: condecimal(ge=0, max_digits=20, decimal_places=2)
+
+
+class PriceSimulationInput(BaseModel):
+    changes: List[PriceChangeInput]
+    apply: bool = Field(False, description="Store the new costs and recipe totals instead of only reporting them.")
+
+    @model_validator(mode='after')
+    def check_changes(self):
+        if not 0 < len(self.changes) <= settings.INGREDIENT_BULK_MAX_ITEMS:
+            raise ValueError(f'Give 1 to {settings.INGREDIENT_BULK_MAX_ITEMS} changes.')
+        ids = [change.ingredient_id for change in self.changes]
+        if len(ids) != len(set(ids)):
+            raise ValueError('Each ingredient can be changed only once.')
+        return self
+
+
 class IngredientRecipeInput(BaseModel):
     ingredient_id: int
     ingredient_amount: conint(gt=0)
@@ -18,8 +86,139 @@ class RecipeInput(BaseModel):
     description: str
     ingredients: List[IngredientRecipeInput] = Field(default_factory=list)
 
+    @model_validator(mode='after')
+    def check_unique_ingredients(self):
+        ids = [item.ingredient_id for item in self.ingredients]
+        if len(ids) != len(set(ids)):
+            raise ValueError('Each ingredient can be listed only once.')
+        return self
+
+
+class IngredientImportInput(BaseModel):
+    """An ingredient line of an imported recipe, given by id or by name and unit of one of the user's ingredients."""
+
+    ingredient_id: Optional[int] = None
+    name: Optional[constr(min_length=1, max_length=100)] = None
+    unit: Literal['g', 'l', 'pcs'] = 'g'
+    ingredient_amount: conint(gt=0)
+
+    @model_validator(mode='after')
+    def check_reference(self):
+        if (self.ingredient_id is None) == (self.name is None):
+            raise ValueError('Give either ingredient_id or name.')
+        return self
+
+
+class RecipeImportInput(BaseModel):
+    name: constr(max_length=200)
+    description: str = ''
+    ingredients: List[IngredientImportInput] = Field(default_factory=list)
+
+
+class ShoppingListItemInput(BaseModel):
+    recipe_id: int
+    servings_multiplier: condecimal(gt=0, max_digits=10, decimal_places=3) = Decimal('1')
+
+
+class ShoppingListInput(BaseModel):
+    recipes: List[ShoppingListItemInput]
+
+    @model_validator(mode='after')
+    def check_size(self):
+        if not 0 < len(self.recipes) <= settings.SHOPPING_LIST_MAX_RECIPES:
+            raise ValueError(f'Give 1 to {settings.SHOPPING_LIST_MAX_RECIPES} recipes.')
+        return self
+
 
 class UserRegistrationInput(BaseModel):
     username: constr(min_length=1)
     email: constr(min_length=1)
     password: constr(min_length=1)
+
+
+class PageParams(BaseModel):
+    limit: Optional[conint(gt=0)] = Field(None, description="Page size, capped by the server.")
+    cursor: Optional[str] = Field(None, description="Opaque cursor taken from `next` or `prev` of a previous page.")
+    ordering: Literal['id', 'name'] = Field('id', description="Sort key, ignored when a cursor is given.")
+    q: Optional[constr(min_length=1, max_length=200)] = Field(
+        None, description="Full-text search; results are ranked by relevance and `ordering` is ignored."
+    )
+    stream: bool = Field(
+        False, description="Stream every matching row in one response instead of a page; `limit` is ignored."
+    )
+
+    @model_validator(mode='after')
+    def check_cursor(self):
+        if self.stream and (self.cursor or self.q):
+            raise ValueError('Streaming cannot be combined with cursor or q.')
+        if self.cursor:
+            ordering, _, _ = decode_cursor(self.cursor)
+            allowed = ('rank',) if self.q else get_args(type(self).model_fields['ordering'].annotation)
+            if ordering not in allowed:
+                raise ValueError('Invalid cursor.')
+        return self
+
+    def sort_columns(self) -> List[str]:
+        """Model columns the page will be sorted and sought on, besides the primary key."""
+        if self.q:
+            return []
+        ordering = decode_cursor(self.cursor)[0] if self.cursor else self.ordering
+        return list(ORDERINGS[ordering][:-1])
+
+
+class ExportParams(BaseModel):
+    kind: Literal['recipes', 'ingredients'] = Field('recipes', description="What to export.")
+    # not `format`, DRF reads that query parameter to pick a renderer
+    file_format: Literal['jsonl', 'ndjson', 'csv'] = Field('jsonl', description="One JSON object per line, or CSV.")
+    gzip: bool = Field(False, description="Compress the output with gzip while it is streamed.")
+
+
+class RecipeFieldsParams(BaseModel):
+    fields: Optional[str] = Field(
+        None, description="Comma-separated recipe fields to return, e.g. `id,name,total_price`. Defaults to all."
+    )
+    expand: Optional[Literal['ingredients']] = Field(
+        None, description="Embed ingredients in a response restricted by `fields`."
+    )
+
+    @model_validator(mode='after')
+    def check_fields(self):
+        unknown = set(self.field_list()) - set(RecipeResponse.model_fields)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+        return self
+
+    def field_list(self) -> List[str]:
+        return [f.strip() for f in (self.fields or '').split(',') if f.strip()]
+
+    def selected_fields(self) -> Optional[Set[str]]:
+        """Requested RecipeResponse fields, or None for the full representation."""
+        if not self.fields:
+            return None
+        selected = {'id', *self.field_list()}
+        if self.expand:
+            selected.add(self.expand)
+        return selected
+
+
+class RecipePageParams(RecipeFieldsParams, PageParams):
+    ordering: Literal['id', 'name', 'total_price'] = Field(
+        'id', description="Sort key, ignored when a cursor is given."
+    )
+    min_price: Optional[condecimal(max_digits=20, decimal_places=2)] = Field(None, description="Minimum total price.")
+    max_price: Optional[condecimal(max_digits=20, decimal_places=2)] = Field(None, description="Maximum total price.")
+
+
+class CostAnalyticsParams(BaseModel):
+    top: conint(gt=0, le=100) = Field(10, description="Number of ingredients in `top_ingredients`.")
+
+
+class JobListParams(BaseModel):
+    status: Optional[Literal['queued', 'running', 'succeeded', 'failed']] = Field(
+        None, description="Only jobs with this status."
+    )
+
+
+class AutocompleteParams(BaseModel):
+    q: constr(min_length=1, max_length=100) = Field(..., description="Prefix typed so far.")
+    limit: conint(gt=0, le=50) = Field(10, description="Maximum number of suggestions.")
@@ -1,5 +1,7 @@
-from typing import List, Optional, Any
-from pydantic import BaseModel, condecimal
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Any
+from pydantic import BaseModel, Field, condecimal
 
 
 class APIResponse(BaseModel):
@@ -8,6 +10,11 @@ class APIResponse(BaseModel):
     data: Any = None
 
 
+class PaginatedAPIResponse(APIResponse):
+    next: Optional[str] = None
+    prev: Optional[str] = None
+
+
 class IngredientResponse(BaseModel):
     id: int
     name: str
@@ -15,7 +22,11 @@ class IngredientResponse(BaseModel):
     unit: str
 
 
-class IngredientListResponse(APIResponse):
+class IngredientListResponse(PaginatedAPIResponse):
+    data: List[IngredientResponse]
+
+
+class IngredientAutocompleteResponse(APIResponse):
     data: List[IngredientResponse]
 
 
@@ -23,6 +34,50 @@ class IngredientCreateResponse(APIResponse):
     data: IngredientResponse
 
 
+class BulkItemError(BaseModel):
+    index: Optional[int] = None
+    id: Optional[int] = None
+    message: str
+
+
+class IngredientBulkResult(BaseModel):
+    upserted: List[IngredientResponse]
+    created: List[int]
+    deleted: List[int]
+    errors: List[BulkItemError]
+
+
+class IngredientBulkResponse(APIResponse):
+    data: IngredientBulkResult
+
+
+class IngredientPriceChange(BaseModel):
+    ingredient_id: int
+    name: str
+    unit: str
+    old_cost: condecimal(max_digits=20, decimal_places=2)
+    new_cost: condecimal(max_digits=20, decimal_places=2)
+
+
+class RecipePriceChange(BaseModel):
+    recipe_id: int
+    name: str
+    old_total: condecimal(max_digits=20, decimal_places=2)
+    new_total: condecimal(max_digits=20, decimal_places=2)
+    difference: condecimal(max_digits=20, decimal_places=2)
+
+
+class PriceSimulationResult(BaseModel):
+    applied: bool
+    ingredients: List[IngredientPriceChange]
+    recipes: List[RecipePriceChange]
+    total_difference: condecimal(max_digits=20, decimal_places=2)
+
+
+class PriceSimulationResponse(APIResponse):
+    data: PriceSimulationResult
+
+
 class RecipeIngredientResponse(BaseModel):
     id: int
     name: str
@@ -37,11 +92,17 @@ class RecipeResponse(BaseModel):
     name: str
     description: str
     image: Optional[str] = None
+    image_variants: Dict[str, Dict[str, str]] = Field(
+        default_factory=dict,
+        description="Resized image URLs by size and format, e.g. `image_variants['128']['webp']`. "
+        "They point at the original image until the variants have been rendered.",
+    )
     ingredients: List[RecipeIngredientResponse]
     total_price: condecimal(max_digits=20, decimal_places=2)
+    ingredient_count: int
 
 
-class RecipeListResponse(APIResponse):
+class RecipeListResponse(PaginatedAPIResponse):
     data: List[RecipeResponse]
 
 
@@ -64,6 +125,108 @@ class RecipePartialUpdateResponse(APIResponse):
 class RecipeImageUploadResponse(APIResponse):
     message: str
     data: RecipeResponse
+    # background job rendering the image variants, see /api/jobs/<id>/
+    job_id: Optional[int] = None
+
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    attempts: int
+    max_attempts: int
+    result: Any = None
+    error: str
+    created_at: datetime
+    updated_at: datetime
+
+
+class JobListResponse(APIResponse):
+    data: List[JobResponse]
+
+
+class JobDetailResponse(APIResponse):
+    data: JobResponse
+
+
+class ImportRowError(BaseModel):
+    line: int
+    message: str
+
+
+class RecipeImportReport(BaseModel):
+    rows: int
+    imported: int
+    failed: int
+    seconds: float
+    rows_per_second: float
+    errors: List[ImportRowError]
+
+
+class RecipeImportResponse(APIResponse):
+    data: RecipeImportReport
+
+
+class BatchOperationResult(BaseModel):
+    status: int
+    body: Any = None
+
+
+class BatchResponse(APIResponse):
+    data: List[BatchOperationResult]
+
+
+class ShoppingListItemResponse(BaseModel):
+    ingredient_id: int
+    name: str
+    unit: str
+    cost: condecimal(max_digits=20, decimal_places=2)
+    amount: Decimal
+    price: condecimal(max_digits=20, decimal_places=2)
+
+
+class ShoppingListResult(BaseModel):
+    items: List[ShoppingListItemResponse]
+    total_cost: condecimal(max_digits=20, decimal_places=2)
+
+
+class ShoppingListResponse(APIResponse):
+    data: ShoppingListResult
+
+
+class RecipeCostStats(BaseModel):
+    recipe_count: int
+    average: Optional[condecimal(max_digits=20, decimal_places=2)] = None
+    minimum: Optional[condecimal(max_digits=20, decimal_places=2)] = None
+    maximum: Optional[condecimal(max_digits=20, decimal_places=2)] = None
+    median: Optional[condecimal(max_digits=20, decimal_places=2)] = None
+    p90: Optional[condecimal(max_digits=20, decimal_places=2)] = None
+    p95: Optional[condecimal(max_digits=20, decimal_places=2)] = None
+
+
+class UnitCostResponse(BaseModel):
+    unit: str
+    total_cost: condecimal(max_digits=20, decimal_places=2)
+    line_count: int
+
+
+class IngredientSpendResponse(BaseModel):
+    ingredient_id: int
+    name: str
+    unit: str
+    cost: condecimal(max_digits=20, decimal_places=2)
+    total_cost: condecimal(max_digits=20, decimal_places=2)
+    recipe_count: int
+
+
+class CostAnalytics(BaseModel):
+    recipes: RecipeCostStats
+    by_unit: List[UnitCostResponse]
+    top_ingredients: List[IngredientSpendResponse]
+
+
+class CostAnalyticsResponse(APIResponse):
+    data: CostAnalytics
 
 
 class UserRegistrationResponse(APIResponse):
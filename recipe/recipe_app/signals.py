@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from recipe_app.authentication import forget_user_status
+from recipe_app.models import Ingredient, Recipe
+from recipe_app.utils.blobs import release_blob
+from recipe_app.utils.search import restore_sqlite_fts_triggers
+from recipe_app.utils.trigrams import index_name_trigrams
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Ingredient)
+def reindex_name_trigrams(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'name' not in update_fields:
+        return
+    index_name_trigrams([instance])
+
+
+@receiver(post_delete, sender=Recipe)
+def release_image_blob(sender, instance, **kwargs):
+    if instance.image:
+        release_blob(instance.image.name)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user_status(sender, instance, **kwargs):
+    # other processes notice within JWT_USER_STATUS_TTL
+    forget_user_status(instance)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    # a migration rebuilding a table on SQLite drops its full-text triggers
+    if sender.name == 'recipe_app':
+        restore_sqlite_fts_triggers(using)
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+BLOB_DIR = 'recipes/blobs'
+
+# spellings of one format share a name, so the same bytes uploaded as .jpeg and .jpg make one blob
+EXTENSION_ALIASES = {'.jpeg': '.jpg', '.jpe': '.jpg'}
+
+
+def blob_name(digest: str, extension: str) -> str:
+    extension = extension.lower()
+    return f'{BLOB_DIR}/{digest[:2]}/{digest}{EXTENSION_ALIASES.get(extension, extension)}'
+
+
+def is_blob_name(name: str) -> bool:
+    return bool(name) and name.startswith(f'{BLOB_DIR}/')
+
+
+def blob_digest(name: str) -> str:
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def content_digest(content) -> str:
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Media storage that files every upload under the SHA-256 of its content instead of its
+    name, so identical uploads are stored once. Saving a file that is already stored only
+    hashes it: nothing is written and the existing name is returned. Which recipes use a
+    blob is counted by ImageBlob (utils.blobs); files are only removed by gc_image_blobs.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # the content decides the name, an existing file is the same file
+        return name
+
+    def _save(self, name, content):
+        name = blob_name(content_digest(content), os.path.splitext(name)[1])
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            # mark the blob as in use, gc_image_blobs leaves recently touched files alone
+            os.utime(full_path)
+            return name
+
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # written next to its final path and renamed over it, so concurrent saves of the
+        # same content never expose a partial file and whichever rename lands last wins
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                # already on disk from the upload handler, moved rather than copied
+                os.close(fd)
+                file_move_safe(content.temporary_file_path(), temp_path, allow_overwrite=True)
+            else:
+                with os.fdopen(fd, 'wb') as temp:
+                    for chunk in content.chunks():
+                        temp.write(chunk)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+
+def recipe_image_storage():
+    return ContentAddressedStorage()
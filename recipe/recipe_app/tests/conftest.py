@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Test databases reuse primary keys between tests, so per-user cache entries must not leak across them
+    cache.clear()
+    yield
+    cache.clear()
@@ -0,0 +1,132 @@
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from recipe_app.models import Ingredient, IngredientRecipe, Recipe, RecipeTrigram
+from recipe_app.utils.search import (
+    MySQLFullTextBackend,
+    SQLiteFTSBackend,
+    TrigramBackend,
+    get_search_backend,
+    restore_sqlite_fts_triggers,
+)
+from recipe_app.utils.trigrams import filter_name_contains
+
+
+class SearchFixtureMixin:
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher', password='testpassword')
+        self.tomato = Ingredient.objects.create(name="Tomato", cost=1, user=self.user)
+        self.soup = Recipe.objects.create(name="Winter soup", description="Hearty and warm", user=self.user)
+        self.salad = Recipe.objects.create(name="Summer salad", description="Fresh soup alternative", user=self.user)
+        IngredientRecipe.objects.create(recipe=self.salad, ingredient=self.tomato, ingredient_amount=2)
+
+
+class SearchBackendTestCase(SearchFixtureMixin, TestCase):
+
+    def test_trigrams_follow_renames(self):
+        self.soup.name = "Autumn stew"
+        self.soup.save()
+        trigrams = set(RecipeTrigram.objects.filter(recipe=self.soup).values_list('trigram', flat=True))
+        self.assertIn('ste', trigrams)
+        self.assertNotIn('win', trigrams)
+
+    def test_filter_name_contains(self):
+        queryset = Recipe.objects.filter(user=self.user)
+        self.assertEqual(list(filter_name_contains(queryset, self.user.id, "ER S")), [self.soup, self.salad])
+        self.assertEqual(list(filter_name_contains(queryset, self.user.id, "salad")), [self.salad])
+        self.assertEqual(list(filter_name_contains(queryset, self.user.id, "ad")), [self.salad])
+        self.assertEqual(list(filter_name_contains(queryset, self.user.id, "stew")), [])
+
+    def test_trigram_backend_ranks_by_shared_trigrams(self):
+        hits = TrigramBackend().search(Recipe, self.user.id, "summer")
+        self.assertEqual([pk for pk, _ in hits], [self.salad.id])
+
+    def test_trigram_backend_within(self):
+        within = Recipe.objects.filter(user=self.user, name__startswith="Winter")
+        hits = TrigramBackend().search(Recipe, self.user.id, "soup", within=within)
+        self.assertEqual([pk for pk, _ in hits], [self.soup.id])
+
+    @skipUnless(connection.vendor == 'sqlite', "FTS5 tables exist on SQLite only")
+    def test_fts_backend_ranks_and_follows_writes(self):
+        backend = get_search_backend()
+        self.assertIsInstance(backend, SQLiteFTSBackend)
+
+        hits = backend.search(Recipe, self.user.id, "soup")
+        self.assertEqual([pk for pk, _ in hits], [self.soup.id, self.salad.id])
+        self.assertEqual([pk for pk, _ in backend.search(Recipe, self.user.id, "toma")], [self.salad.id])
+
+        self.tomato.name = "Cucumber"
+        self.tomato.save()
+        self.assertEqual(backend.search(Recipe, self.user.id, "tomato"), [])
+        self.assertEqual([pk for pk, _ in backend.search(Ingredient, self.user.id, "cucu")], [self.tomato.id])
+
+        self.soup.delete()
+        self.assertEqual([pk for pk, _ in backend.search(Recipe, self.user.id, "soup")], [self.salad.id])
+
+    @skipUnless(connection.vendor == 'sqlite', "FTS5 tables exist on SQLite only")
+    def test_fts_triggers_are_restored_after_migrate(self):
+        # every migration has run on the test database, the triggers must have survived its table rebuilds
+        self.assertEqual(restore_sqlite_fts_triggers(), [])
+
+        # as a migration rebuilding recipe_app_recipe leaves it
+        with connection.cursor() as cursor:
+            for trigger in ('recipe_app_recipe_fts_ai', 'recipe_app_recipe_fts_au', 'recipe_app_recipe_fts_ad'):
+                cursor.execute(f'DROP TRIGGER {trigger}')
+        call_command('migrate', 'recipe_app', verbosity=0)
+
+        self.soup.name = "Autumn stew"
+        self.soup.save()
+        pie = Recipe.objects.create(name="Apple pie", description="", user=self.user)
+        backend = get_search_backend()
+        self.assertEqual([pk for pk, _ in backend.search(Recipe, self.user.id, "stew")], [self.soup.id])
+        self.assertEqual([pk for pk, _ in backend.search(Recipe, self.user.id, "apple")], [pie.id])
+
+
+class DatabaseSearchTestCase(SearchFixtureMixin, TransactionTestCase):
+    """
+    The search backend of the test database. Transactional, because InnoDB FULLTEXT indexes
+    only see committed rows.
+    """
+
+    def test_backend_matches_database(self):
+        backend = get_search_backend()
+        if connection.vendor == 'mysql':
+            self.assertIsInstance(backend, MySQLFullTextBackend)
+        elif connection.vendor == 'sqlite':
+            self.assertIsInstance(backend, SQLiteFTSBackend)
+
+    def test_search_follows_writes(self):
+        backend = get_search_backend()
+        hits = backend.search(Recipe, self.user.id, "soup")
+        self.assertCountEqual([pk for pk, _ in hits], [self.soup.id, self.salad.id])
+        self.assertEqual([pk for pk, _ in backend.search(Recipe, self.user.id, "toma")], [self.salad.id])
+
+        self.tomato.name = "Cucumber"
+        self.tomato.save()
+        self.assertEqual(backend.search(Recipe, self.user.id, "tomato"), [])
+        self.assertEqual([pk for pk, _ in backend.search(Ingredient, self.user.id, "cucu")], [self.tomato.id])
+
+        self.soup.delete()
+        self.assertEqual([pk for pk, _ in backend.search(Recipe, self.user.id, "soup")], [self.salad.id])
+
+    def test_search_pages_and_within(self):
+        backend = get_search_backend()
+        (first_id, first_score), *_ = backend.search(Recipe, self.user.id, "soup", limit=1)
+        second = backend.search(Recipe, self.user.id, "soup", after=(first_score, first_id), limit=1)
+        self.assertCountEqual([first_id, second[0][0]], [self.soup.id, self.salad.id])
+
+        within = Recipe.objects.filter(user=self.user, name__startswith="Summer")
+        self.assertEqual([pk for pk, _ in backend.search(Recipe, self.user.id, "soup", within=within)], [self.salad.id])
+        within = Ingredient.objects.filter(user=self.user, cost__gt=1)
+        self.assertEqual(backend.search(Ingredient, self.user.id, "tomato", within=within), [])
+
+    def test_search_is_scoped_to_user(self):
+        other = User.objects.create_user(username='other', password='testpassword')
+        Recipe.objects.create(name="Other soup", description="", user=other)
+        hits = get_search_backend().search(Recipe, self.user.id, "soup")
+        self.assertEqual(len(hits), 2)
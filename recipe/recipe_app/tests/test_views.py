@@ -1,14 +1,31 @@
-from io import BytesIO
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 from PIL import Image
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
 from rest_framework import status
-from rest_framework.test import APITestCase
-from recipe_app.models import Ingredient, Recipe, IngredientRecipe
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from recipe_app.authentication import user_statuses, validated_tokens
+from recipe_app.models import ImageBlob, Ingredient, Job, Recipe, IngredientRecipe, validate_image
+from recipe_app.utils.pagination import decode_cursor, encode_cursor
+from recipe_app.utils.recipe_totals import refresh_recipe_totals
 
 
-def generate_image():
+def generate_image(color='white'):
     file = BytesIO()
-    image = Image.new('RGB', (100, 100), 'white')
+    image = Image.new('RGB', (100, 100), color)
     image.save(file, 'jpeg')
     file.name = 'test.jpg'
     file.seek(0)
@@ -83,6 +100,43 @@ class RecipeAPITestCase(APITestCase):
         recipe.refresh_from_db()
         self.assertTrue(bool(recipe.image))
 
+    def test_upload_image_validation(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        recipe = Recipe.objects.create(name="Test Recipe", description="Test description", user=self.user)
+        url = f'/api/recipes/{recipe.id}/upload-image/'
+
+        def upload(content, name='photo.jpg'):
+            file = BytesIO(content)
+            file.name = name
+            return self.client.post(url, {'image': file}, format='multipart')
+
+        png = BytesIO()
+        Image.new('RGB', (100, 100), 'blue').save(png, 'png')
+        with self.settings(MEDIA_ROOT=media_root, IMAGE_WORKERS=0):
+            response = upload(b'GIF89a is not enough')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data['message'], "Image file is damaged or incomplete.")
+            response = upload(b'%PDF-1.4 not an image')
+            self.assertEqual(response.data['message'], "Unsupported image format. Allowed: JPEG, PNG, GIF.")
+            with self.settings(IMAGE_MAX_PIXELS=9999):
+                response = upload(png.getvalue())
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("9999 pixels (100x100)", response.data['message'])
+
+            # the format and extension come from the content, not the client's name or type
+            response = upload(png.getvalue())
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            recipe.refresh_from_db()
+            self.assertTrue(recipe.image.name.endswith('.png'))
+
+        # the model validator, used by the admin, follows the same setting
+        image = mock.Mock(size=3 * 1024 * 1024)
+        validate_image(image)
+        with self.settings(IMAGE_MAX_UPLOAD_SIZE=2 * 1024 * 1024):
+            with self.assertRaisesMessage(ValidationError, "allowed limit (2 MB)"):
+                validate_image(image)
+
     def test_create_recipe_with_invalid_ingredient(self):
         url = '/api/recipes/'
         data = {
@@ -101,6 +155,7 @@ class RecipeAPITestCase(APITestCase):
 
         expected_error = 'Invalid pk "999" - object does not exist.'
         self.assertEqual(response.data.get("message"), expected_error)
+        self.assertFalse(Recipe.objects.exists())
 
     def test_recipes_filtered_by_user(self):
         user_recipe = Recipe.objects.create(name="User Recipe", description="User description", user=self.user)
@@ -111,3 +166,900 @@ class RecipeAPITestCase(APITestCase):
 
         self.assertEqual(len(response.data.get('data')), 1)
         self.assertEqual(response.data.get('data')[0]['name'], user_recipe.name)
+
+    def test_list_recipes_paginated_by_cursor(self):
+        for i in range(5):
+            Recipe.objects.create(name=f"Recipe {i}", description="desc", user=self.user)
+
+        first = self.client.get('/api/recipes/', {'limit': 2})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['name'] for r in first.data['data']], ["Recipe 0", "Recipe 1"])
+        self.assertIsNone(first.data['prev'])
+
+        second = self.client.get('/api/recipes/', {'limit': 2, 'cursor': first.data['next']})
+        self.assertEqual([r['name'] for r in second.data['data']], ["Recipe 2", "Recipe 3"])
+
+        third = self.client.get('/api/recipes/', {'limit': 2, 'cursor': second.data['next']})
+        self.assertEqual([r['name'] for r in third.data['data']], ["Recipe 4"])
+        self.assertIsNone(third.data['next'])
+
+        back = self.client.get('/api/recipes/', {'limit': 2, 'cursor': third.data['prev']})
+        self.assertEqual([r['name'] for r in back.data['data']], ["Recipe 2", "Recipe 3"])
+
+    def test_list_ingredients_paginated_by_name(self):
+        Ingredient.objects.create(name="Pepper", cost=2, user=self.user)
+
+        first = self.client.get('/api/ingredients/', {'limit': 2, 'ordering': 'name'})
+        self.assertEqual([i['name'] for i in first.data['data']], ["Pepper", "Salt"])
+
+        second = self.client.get('/api/ingredients/', {'limit': 2, 'cursor': first.data['next']})
+        self.assertEqual([i['name'] for i in second.data['data']], ["Sugar"])
+        self.assertIsNone(second.data['next'])
+
+    def test_list_recipes_invalid_cursor(self):
+        response = self.client.get('/api/recipes/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # well-formed cursors with a key value of the wrong type for its column
+        for ordering, values in [('name', [1, 1]), ('id', ['1']), ('total_price', ['abc', 1]), ('rank', ['x', 1])]:
+            with self.subTest(ordering=ordering):
+                self.assertRaises(ValueError, decode_cursor, encode_cursor(ordering, values, 'n'))
+        cursor = encode_cursor('name', [{'a': 1}, 1], 'n')
+        self.assertEqual(self.client.get('/api/recipes/', {'cursor': cursor}).status_code, 400)
+
+    def test_list_recipes_limit_is_capped(self):
+        with self.settings(PAGINATION_MAX_LIMIT=1):
+            Recipe.objects.create(name="A", description="desc", user=self.user)
+            Recipe.objects.create(name="B", description="desc", user=self.user)
+            response = self.client.get('/api/recipes/', {'limit': 100})
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_list_recipes_query_count_is_constant(self):
+        for i in range(10):
+            recipe = Recipe.objects.create(name=f"Recipe {i}", description="desc", user=self.user)
+            IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient1, ingredient_amount=1)
+            IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient2, ingredient_amount=2)
+
+        # ETag aggregate, the page of recipes and all of their ingredient rows
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(len(response.data['data']), 10)
+        self.assertEqual(len(response.data['data'][9]['ingredients']), 2)
+
+    def test_recipe_total_price_is_stored(self):
+        data = {
+            "name": "Test Recipe",
+            "description": "Test description",
+            "ingredients": [
+                {"ingredient_id": self.ingredient1.id, "ingredient_amount": 3},
+                {"ingredient_id": self.ingredient2.id, "ingredient_amount": 2},
+            ],
+        }
+        response = self.client.post('/api/recipes/', data, format='json')
+        self.assertEqual(response.data['data']['total_price'], '3.50')
+        self.assertEqual(response.data['data']['ingredient_count'], 2)
+
+        recipe = Recipe.objects.get()
+        self.assertEqual(recipe.total_price, Decimal('3.50'))
+        self.assertEqual(recipe.ingredient_count, 2)
+
+        data["ingredients"] = [{"ingredient_id": self.ingredient2.id, "ingredient_amount": 5}]
+        self.client.put(f'/api/recipes/{recipe.id}/', data, format='json')
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.total_price, Decimal('5.00'))
+        self.assertEqual(recipe.ingredient_count, 1)
+
+    def test_ingredient_cost_change_updates_recipe_totals(self):
+        first = Recipe.objects.create(name="First", description="desc", user=self.user)
+        second = Recipe.objects.create(name="Second", description="desc", user=self.user)
+        IngredientRecipe.objects.create(recipe=first, ingredient=self.ingredient1, ingredient_amount=2)
+        IngredientRecipe.objects.create(recipe=first, ingredient=self.ingredient2, ingredient_amount=1)
+        IngredientRecipe.objects.create(recipe=second, ingredient=self.ingredient1, ingredient_amount=10)
+        refresh_recipe_totals()
+
+        data = {"name": "Salt", "cost": "1.25", "unit": "g"}
+        response = self.client.put(f'/api/ingredients/{self.ingredient1.id}/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.total_price, Decimal('3.50'))
+        self.assertEqual(second.total_price, Decimal('12.50'))
+
+        self.client.delete(f'/api/ingredients/{self.ingredient1.id}/')
+        first.refresh_from_db()
+        self.assertEqual(first.total_price, Decimal('1.00'))
+        self.assertEqual(first.ingredient_count, 1)
+
+    def test_list_recipes_filtered_and_sorted_by_price(self):
+        for name, amount in (("Cheap", 1), ("Pricey", 20), ("Middle", 6)):
+            recipe = Recipe.objects.create(name=name, description="desc", user=self.user)
+            IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient2, ingredient_amount=amount)
+        refresh_recipe_totals()
+
+        response = self.client.get('/api/recipes/', {'ordering': 'total_price', 'min_price': '2'})
+        self.assertEqual([r['name'] for r in response.data['data']], ["Middle", "Pricey"])
+
+    def test_rebuild_recipe_totals_command(self):
+        recipe = Recipe.objects.create(name="Stale", description="desc", user=self.user)
+        IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient2, ingredient_amount=4)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_recipe_totals', '--check', stdout=StringIO())
+        call_command('rebuild_recipe_totals', stdout=StringIO())
+        call_command('rebuild_recipe_totals', '--check', stdout=StringIO())
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.total_price, Decimal('4.00'))
+
+    def test_recipe_reads_are_cached_until_write(self):
+        recipe = Recipe.objects.create(name="Cached", description="desc", user=self.user)
+        self.client.get('/api/recipes/')
+        self.client.get(f'/api/recipes/{recipe.id}/')
+
+        # only the ETag lookups hit the database
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/recipes/').data['data'][0]['name'], "Cached")
+            self.assertEqual(self.client.get(f'/api/recipes/{recipe.id}/').data['data']['name'], "Cached")
+
+        data = {"name": "Renamed", "description": "desc"}
+        self.client.patch(f'/api/recipes/{recipe.id}/', data, format='json')
+        self.assertEqual(self.client.get('/api/recipes/').data['data'][0]['name'], "Renamed")
+        self.assertEqual(self.client.get(f'/api/recipes/{recipe.id}/').data['data']['name'], "Renamed")
+
+    def test_cached_body_follows_etag_after_uninvalidated_write(self):
+        recipe = Recipe.objects.create(name="Cached", description="desc", user=self.user)
+        IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient1, ingredient_amount=2)
+        refresh_recipe_totals([recipe.id])
+        etag = self.client.get(f'/api/recipes/{recipe.id}/')['ETag']
+        self.client.get('/api/recipes/')
+
+        # as the admin or a management command would, without touching the response cache
+        Ingredient.objects.filter(pk=self.ingredient1.pk).update(cost=3)
+        refresh_recipe_totals([recipe.id])
+        response = self.client.get(f'/api/recipes/{recipe.id}/')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(Decimal(response.data['data']['total_price']), Decimal('6.00'))
+        self.assertEqual(Decimal(self.client.get('/api/recipes/').data['data'][0]['total_price']), Decimal('6.00'))
+
+    def test_ingredient_cache_is_per_user(self):
+        self.client.get('/api/ingredients/')
+        other = User.objects.create_user(username='other', password='testpassword')
+        Ingredient.objects.create(name="Pepper", cost=2, user=other)
+        self.client.force_authenticate(user=other)
+        response = self.client.get('/api/ingredients/')
+        self.assertEqual([i['name'] for i in response.data['data']], ["Pepper"])
+
+        self.client.post('/api/ingredients/', {"name": "Basil", "cost": "3.00"}, format='json')
+        response = self.client.get('/api/ingredients/')
+        self.assertEqual([i['name'] for i in response.data['data']], ["Pepper", "Basil"])
+
+    def test_recipe_list_conditional_get(self):
+        recipe = Recipe.objects.create(name="Tagged", description="desc", user=self.user)
+        response = self.client.get('/api/recipes/')
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get('/api/recipes/?limit=1', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.client.patch(f'/api/recipes/{recipe.id}/', {"name": "Retagged", "description": "desc"}, format='json')
+        response = self.client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_recipe_detail_conditional_get(self):
+        recipe = Recipe.objects.create(name="Tagged", description="desc", user=self.user)
+        IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient1, ingredient_amount=1)
+        etag = self.client.get(f'/api/recipes/{recipe.id}/')['ETag']
+        response = self.client.get(f'/api/recipes/{recipe.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        data = {"name": "Rock salt", "cost": "0.50", "unit": "g"}
+        self.client.put(f'/api/ingredients/{self.ingredient1.id}/', data, format='json')
+        response = self.client.get(f'/api/recipes/{recipe.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['ingredients'][0]['name'], "Rock salt")
+
+        self.assertEqual(self.client.get('/api/recipes/999/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_ingredient_autocomplete(self):
+        Ingredient.objects.create(name="Brown sugar", cost=2, user=self.user)
+        Ingredient.objects.create(name="Sugar syrup", cost=3, user=self.user)
+
+        response = self.client.get('/api/ingredients/autocomplete/', {'q': 'sug'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([i['name'] for i in response.data['data']], ["Sugar", "Sugar syrup", "Brown sugar"])
+
+        response = self.client.get('/api/ingredients/autocomplete/', {'q': 'sugra'})
+        self.assertIn("Sugar", [i['name'] for i in response.data['data']])
+
+        self.client.post('/api/ingredients/', {"name": "Sugarcane", "cost": "1.00"}, format='json')
+        response = self.client.get('/api/ingredients/autocomplete/', {'q': 'sugarc', 'limit': 1})
+        self.assertEqual([i['name'] for i in response.data['data']], ["Sugarcane"])
+
+        self.assertEqual(self.client.get('/api/ingredients/autocomplete/').status_code, 400)
+
+    def test_list_recipes_sparse_fields(self):
+        for i in range(3):
+            recipe = Recipe.objects.create(name=f"Recipe {i}", description="desc", user=self.user)
+            IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient1, ingredient_amount=1)
+
+        # ETag aggregate and the page, no ingredient query
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/recipes/', {'fields': 'name,total_price', 'ordering': 'name', 'limit': 2})
+        first = Recipe.objects.get(name="Recipe 0")
+        self.assertEqual(response.data['data'][0], {'id': first.id, 'name': "Recipe 0", 'total_price': '0.00'})
+        self.assertIsNotNone(response.data['next'])
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/recipes/', {'fields': 'name', 'cursor': response.data['next']})
+        self.assertEqual([r['name'] for r in response.data['data']], ["Recipe 2"])
+
+        response = self.client.get('/api/recipes/', {'fields': 'name', 'expand': 'ingredients'})
+        self.assertEqual(set(response.data['data'][0]), {'id', 'name', 'ingredients'})
+        self.assertEqual(response.data['data'][0]['ingredients'][0]['name'], "Salt")
+
+        response = self.client.get('/api/recipes/', {'fields': 'name,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recipe_detail_sparse_fields(self):
+        recipe = Recipe.objects.create(name="Sparse", description="desc", user=self.user)
+        response = self.client.get(f'/api/recipes/{recipe.id}/', {'fields': 'name,image'})
+        self.assertEqual(response.data['data'], {'id': recipe.id, 'name': "Sparse", 'image': None})
+        self.assertEqual(response.data['result'], "ok")
+
+    def test_list_recipes_streamed(self):
+        for i in range(5):
+            recipe = Recipe.objects.create(name=f"Recipe {i}", description="desc", user=self.user)
+            IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient1, ingredient_amount=i + 1)
+        paged = self.client.get('/api/recipes/', {'ordering': 'name'}).data
+
+        with self.settings(STREAMING_CHUNK_SIZE=2):
+            # ETag aggregate, then per chunk of two recipes one ingredient query on a single recipe cursor
+            with self.assertNumQueries(5):
+                response = self.client.get('/api/recipes/', {'ordering': 'name', 'stream': 'true', 'limit': 1})
+                content = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(content), paged)
+
+        response = self.client.get('/api/recipes/', {'stream': 'true', 'fields': 'name'})
+        self.assertEqual(
+            json.loads(b''.join(response.streaming_content))['data'][0],
+            {'id': paged['data'][0]['id'], 'name': "Recipe 0"},
+        )
+
+        self.assertEqual(self.client.get('/api/recipes/', {'stream': 'true', 'q': 'recipe'}).status_code, 400)
+
+    def test_list_ingredients_streamed(self):
+        response = self.client.get('/api/ingredients/', {'stream': 'true', 'ordering': 'name'})
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), self.client.get('/api/ingredients/').data)
+
+        Ingredient.objects.all().delete()
+        response = self.client.get('/api/ingredients/', {'stream': 'true'})
+        self.assertEqual(json.loads(b''.join(response.streaming_content))['data'], [])
+
+    def test_responses_rendered_by_pydantic(self):
+        recipe = Recipe.objects.create(name="Crème brûlée\u2028", description="desc", user=self.user)
+        IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient1, ingredient_amount=3)
+        refresh_recipe_totals()
+
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(json.loads(response.content), response.data)
+        self.assertIn('"Crème brûlée\\u2028"'.encode(), response.content)
+
+        cached = self.client.get('/api/recipes/')
+        self.assertEqual(cached.content, response.content)
+
+        sparse = self.client.get(f'/api/recipes/{recipe.id}/', {'fields': 'total_price'})
+        self.assertEqual(json.loads(sparse.content)['data'], {'id': recipe.id, 'total_price': '1.50'})
+
+    def test_benchmark_rendering_command(self):
+        out = StringIO()
+        call_command('benchmark_rendering', recipes=5, repeat=1, stdout=out)
+        self.assertIn("5 recipes", out.getvalue())
+
+    def test_jwt_authentication_from_claims(self):
+        user_statuses.clear()
+        self.client.force_authenticate(None)
+        token = str(AccessToken.for_user(self.user))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        # the user's active status, then the jobs
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/jobs/').status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/jobs/').status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(validated_tokens.get(token.encode()))
+        # the user built from the token works as a foreign key
+        response = self.client.post('/api/ingredients/', {"name": "Pepper", "cost": "2.00", "unit": "g"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Ingredient.objects.get(name="Pepper").user_id, self.user.id)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/jobs/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_async_reads_with_jwt(self):
+        recipe = await Recipe.objects.acreate(name="Async", description="desc", user=self.user)
+        await IngredientRecipe.objects.acreate(recipe=recipe, ingredient=self.ingredient2, ingredient_amount=2)
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+        response = await self.async_client.get('/api/recipes/', headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data'][0]['ingredients'][0]['name'], "Sugar")
+
+        response = await self.async_client.get(f'/api/recipes/{recipe.id}/', {'fields': 'name'}, headers=headers)
+        self.assertEqual(response.json()['data'], {'id': recipe.id, 'name': "Async"})
+        etag = response['ETag']
+        response = await self.async_client.get(
+            f'/api/recipes/{recipe.id}/', {'fields': 'name'}, headers={**headers, 'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = await self.async_client.get('/api/ingredients/', {'stream': 'true'}, headers=headers)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual([i['name'] for i in json.loads(content)['data']], ["Salt", "Sugar"])
+
+        response = await self.async_client.get('/api/recipes/', headers={'Authorization': 'Bearer invalid'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.get('/api/recipes/999/', headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_recipe_ingredient_writes_are_set_based(self):
+        ingredients = [Ingredient.objects.create(name=f"Spice {i}", cost=1, user=self.user) for i in range(20)]
+        data = {
+            "name": "Curry",
+            "description": "desc",
+            "ingredients": [{"ingredient_id": i.id, "ingredient_amount": 1} for i in ingredients],
+        }
+        # savepoint, ownership check, recipe and trigram writes, one link insert, totals update and reload,
+        # links for the response and release: independent of the number of ingredients
+        with self.assertNumQueries(10):
+            response = self.client.post('/api/recipes/', data, format='json')
+        recipe_id = response.data['data']['id']
+        self.assertEqual(response.data['data']['ingredient_count'], 20)
+
+        kept = IngredientRecipe.objects.get(recipe_id=recipe_id, ingredient=ingredients[1])
+        data["ingredients"] = [{"ingredient_id": i.id, "ingredient_amount": 1} for i in ingredients[1:]]
+        data["ingredients"][1]["ingredient_amount"] = 4
+        data["ingredients"].append({"ingredient_id": self.ingredient1.id, "ingredient_amount": 2})
+        response = self.client.put(f'/api/recipes/{recipe_id}/', data, format='json')
+        self.assertEqual(response.data['data']['ingredient_count'], 20)
+        self.assertEqual(response.data['data']['total_price'], '23.00')
+        self.assertTrue(IngredientRecipe.objects.filter(id=kept.id, ingredient_amount=1).exists())
+
+        data["ingredients"].append({"ingredient_id": 999, "ingredient_amount": 1})
+        response = self.client.put(f'/api/recipes/{recipe_id}/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(IngredientRecipe.objects.filter(recipe_id=recipe_id).count(), 20)
+
+        data["ingredients"][-1] = data["ingredients"][0]
+        response = self.client.put(f'/api/recipes/{recipe_id}/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_ingredients(self):
+        recipe = Recipe.objects.create(name="Brine", description="desc", user=self.user)
+        IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient1, ingredient_amount=4)
+        IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient2, ingredient_amount=1)
+        refresh_recipe_totals()
+
+        upsert = [{"name": f"Herb {i}", "cost": "1.00"} for i in range(50)]
+        upsert += [
+            {"name": "Salt", "cost": "0.75"},
+            {"name": "Bad", "cost": "abc"},
+            {"name": "Herb 0", "cost": "2.00"},
+        ]
+        data = {"upsert": upsert, "delete": [self.ingredient2.id, 999]}
+        # the same for any number of items: ownership, cascade delete and totals for the deletes, then
+        # existing rows, one upsert, read back, trigrams of the new rows and totals for the repriced ones
+        with self.assertNumQueries(15):
+            response = self.client.post('/api/ingredients/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.data['data']
+        self.assertEqual(len(result['upserted']), 51)
+        self.assertEqual(len(result['created']), 50)
+        self.assertEqual(result['deleted'], [self.ingredient2.id])
+        self.assertEqual([(e['index'], e['id']) for e in result['errors']], [(51, None), (52, None), (None, 999)])
+        self.assertEqual(response.data['message'], "3 items failed.")
+
+        self.ingredient1.refresh_from_db()
+        self.assertEqual(self.ingredient1.cost, Decimal('0.75'))
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.total_price, recipe.ingredient_count), (Decimal('3.00'), 1))
+        self.assertFalse(Ingredient.objects.filter(id=self.ingredient2.id).exists())
+        names = [i['name'] for i in self.client.get('/api/ingredients/', {'name': 'herb 4'}).data['data']]
+        self.assertEqual(len(names), 11)
+
+        with self.settings(INGREDIENT_BULK_MAX_ITEMS=2):
+            response = self.client.post('/api/ingredients/bulk/', {"delete": [1, 2, 3]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # MySQL's unique key ignores case, items differing only in case are one ingredient there
+        upsert = [{"name": "Dill", "cost": "1.00"}, {"name": "dill", "cost": "2.00"}]
+        with mock.patch.object(type(connections['default']), 'vendor', 'mysql'):
+            response = self.client.post('/api/ingredients/bulk/', {"upsert": upsert}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([i['name'] for i in response.data['data']['upserted']], ["Dill"])
+        self.assertEqual(response.data['data']['errors'][0]['index'], 1)
+
+    def test_import_recipes_upload(self):
+        rows = [
+            {"name": "Brine", "ingredients": [{"name": "Salt", "ingredient_amount": 4}]},
+            {"name": "Syrup", "ingredients": [{"ingredient_id": self.ingredient2.id, "ingredient_amount": 2}]},
+            {"name": "Mystery", "ingredients": [{"name": "Pepper", "ingredient_amount": 1}]},
+            {"name": "Twice", "ingredients": [{"name": "Salt", "ingredient_amount": 1}] * 2},
+        ]
+        lines = [json.dumps(row) for row in rows] + ['{not json']
+        file = BytesIO('\n'.join(lines).encode())
+        file.name = 'recipes.jsonl'
+        with self.settings(IMPORT_CHUNK_SIZE=2):
+            response = self.client.post('/api/recipes/import/', {'file': file}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.data['data']
+        self.assertEqual((report['rows'], report['imported'], report['failed']), (5, 2, 3))
+        self.assertEqual([e['line'] for e in report['errors']], [3, 4, 5])
+        self.assertIn('Unknown ingredient "Pepper"', report['errors'][0]['message'])
+
+        brine = Recipe.objects.get(name="Brine", user=self.user)
+        self.assertEqual((brine.total_price, brine.ingredient_count), (Decimal('2.00'), 1))
+        names = [r['name'] for r in self.client.get('/api/recipes/', {'q': 'syrup'}).data['data']]
+        self.assertEqual(names, ["Syrup"])
+
+        # names the user has, or that repeat within the file, are row errors rather than a failed insert
+        rows = [{"name": "Brine"}, {"name": "Fresh"}, {"name": "Fresh"}]
+        file = BytesIO('\n'.join(json.dumps(row) for row in rows).encode())
+        file.name = 'recipes.jsonl'
+        report = self.client.post('/api/recipes/import/', {'file': file}, format='multipart').data['data']
+        self.assertEqual((report['imported'], report['failed']), (1, 2))
+        self.assertEqual(
+            [e['message'] for e in report['errors']],
+            ['Recipe "Brine" already exists.', 'Recipe "Fresh" appears more than once in the file.'],
+        )
+
+        file = BytesIO(b'name\n')
+        file.name = 'recipes.txt'
+        response = self.client.post('/api/recipes/import/', {'file': file}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_recipes_command(self):
+        rows = "name,description,ingredient,unit,amount\nSweet brine,desc,Salt,g,2\nSweet brine,desc,Sugar,g,3\nPlain,,,,\n"
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write(rows)
+        self.addCleanup(os.remove, file.name)
+        out = StringIO()
+        call_command('import_recipes', file.name, '--user', self.user.username, stdout=out)
+        self.assertIn("Imported 2 of 2 recipes", out.getvalue())
+        recipe = Recipe.objects.get(name="Sweet brine", user=self.user)
+        self.assertEqual((recipe.total_price, recipe.ingredient_count), (Decimal('4.00'), 2))
+        self.assertTrue(Recipe.objects.filter(name="Plain", user=self.user).exists())
+
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', file.name, '--user', 'nobody', stdout=StringIO())
+
+    def test_export_recipes(self):
+        recipe = Recipe.objects.create(name="Brine", description="desc", user=self.user)
+        IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient1, ingredient_amount=4)
+        Recipe.objects.create(name="Empty", description="", user=self.user)
+        refresh_recipe_totals()
+
+        response = self.client.get('/api/export/')
+        self.assertEqual(response['Content-Type'], 'application/jsonl')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([line['name'] for line in lines], ["Brine", "Empty"])
+        self.assertEqual(lines[0]['total_price'], '2.00')
+        self.assertEqual(lines[0]['ingredients'][0]['ingredient_price'], '2.00')
+
+        response = self.client.get('/api/export/', {'kind': 'ingredients', 'file_format': 'csv', 'gzip': 'true'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="ingredients.csv.gz"')
+        rows = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(
+            rows, ['id,name,unit,cost', f'{self.ingredient1.id},Salt,g,0.50', f'{self.ingredient2.id},Sugar,g,1.00']
+        )
+
+        # a recipe export is importable again
+        path = os.path.join(tempfile.mkdtemp(), 'recipes.csv.gz')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        call_command('export_recipes', path, '--user', self.user.username, '--format', 'csv', stdout=StringIO())
+        Recipe.objects.filter(user=self.user).delete()
+        with gzip.open(path) as exported:
+            csv_file = BytesIO(exported.read())
+        csv_file.name = 'recipes.csv'
+        response = self.client.post('/api/recipes/import/', {'file': csv_file}, format='multipart')
+        self.assertEqual(response.data['data']['imported'], 2)
+        recipe = Recipe.objects.get(name="Brine", user=self.user)
+        self.assertEqual((recipe.total_price, recipe.ingredient_count), (Decimal('2.00'), 1))
+
+    def test_batch_operations(self):
+        operations = [
+            {
+                "method": "POST",
+                "path": "/api/ingredients/",
+                "body": {"name": "Pepper", "cost": "2.00"},
+                "ref": "pepper",
+            },
+            {
+                "method": "POST",
+                "path": "/api/recipes/",
+                "body": {
+                    "name": "Seasoning",
+                    "description": "desc",
+                    "ingredients": [
+                        {"ingredient_id": "$pepper", "ingredient_amount": 2},
+                        {"ingredient_id": self.ingredient1.id, "ingredient_amount": 2},
+                    ],
+                },
+                "ref": "seasoning",
+            },
+            {
+                "method": "PUT",
+                "path": "/api/recipes/$seasoning/",
+                "body": {
+                    "name": "Seasoning",
+                    "description": "updated",
+                    "ingredients": [{"ingredient_id": "$pepper", "ingredient_amount": 3}],
+                },
+            },
+        ]
+        response = self.client.post('/api/batch/', {"operations": operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.data['data']], [201, 201, 200])
+        recipe = Recipe.objects.get(name="Seasoning", user=self.user)
+        self.assertEqual((recipe.description, recipe.total_price), ("updated", Decimal('6.00')))
+
+        # a failing operation rolls back the ones before it
+        operations = [
+            {"method": "POST", "path": "/api/ingredients/", "body": {"name": "Paprika", "cost": "1.00"}},
+            {"method": "DELETE", "path": "/api/recipes/999/"},
+        ]
+        response = self.client.post('/api/batch/', {"operations": operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], "Operation 1 failed, no changes were applied.")
+        self.assertEqual([r['status'] for r in response.data['data']], [201, 404])
+        self.assertFalse(Ingredient.objects.filter(name="Paprika").exists())
+
+        operations = [{"method": "DELETE", "path": "/api/recipes/$missing/"}]
+        response = self.client.post('/api/batch/', {"operations": operations}, format='json')
+        self.assertEqual(response.data['data'][0]['body']['message'], 'Unknown reference "$missing".')
+        operations = [{"method": "POST", "path": "/api/register/", "body": {}}]
+        response = self.client.post('/api/batch/', {"operations": operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # constraint violations fail the operation, not the request
+        for body, path in [
+            ({"name": "Salt", "cost": "1.00"}, "/api/ingredients/"),
+            ({"name": "Seasoning", "description": "again"}, "/api/recipes/"),
+        ]:
+            operations = [
+                {"method": "POST", "path": "/api/ingredients/", "body": {"name": "Paprika", "cost": "1.00"}},
+                {"method": "POST", "path": path, "body": body},
+            ]
+            response = self.client.post('/api/batch/', {"operations": operations}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual([r['status'] for r in response.data['data']], [201, 400])
+            self.assertFalse(Ingredient.objects.filter(name="Paprika").exists())
+
+        operations = [{"method": "POST", "path": "/api/nowhere/", "body": {}}]
+        response = self.client.post('/api/batch/', {"operations": operations}, format='json')
+        self.assertEqual(response.data['data'][0]['body'], {"message": 'Unsupported path "/api/nowhere/".'})
+
+        # ref on an operation that creates no single object
+        operations = [{"method": "DELETE", "path": f"/api/ingredients/{self.ingredient2.id}/", "ref": "gone"}]
+        response = self.client.post('/api/batch/', {"operations": operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Ingredient.objects.filter(pk=self.ingredient2.pk).exists())
+        for method, path, body in [
+            ("PUT", f"/api/ingredients/{self.ingredient2.id}/", {"name": "Cane sugar", "cost": "1.00", "unit": "g"}),
+            ("POST", "/api/ingredients/bulk/", {"upsert": [{"name": "Thyme", "cost": "1.00"}]}),
+        ]:
+            operations = [{"method": method, "path": path, "body": body, "ref": "x"}]
+            response = self.client.post('/api/batch/', {"operations": operations}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data['data'][0]['status'], status.HTTP_400_BAD_REQUEST)
+            self.assertIn('cannot be used as ref "x"', response.data['data'][0]['body']['message'])
+        self.assertEqual(Ingredient.objects.get(pk=self.ingredient2.pk).name, "Sugar")
+        self.assertFalse(Ingredient.objects.filter(name="Thyme").exists())
+
+    def test_shopping_list(self):
+        pepper = Ingredient.objects.create(name="Pepper", cost="0.10", unit="pcs", user=self.user)
+        recipes = []
+        for i in range(30):
+            recipe = Recipe.objects.create(name=f"Menu {i}", description="desc", user=self.user)
+            IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient1, ingredient_amount=3)
+            IngredientRecipe.objects.create(recipe=recipe, ingredient=pepper, ingredient_amount=1)
+            recipes.append({"recipe_id": recipe.id, "servings_multiplier": "1.5" if i % 2 else "1"})
+        recipes.append({"recipe_id": recipes[0]["recipe_id"], "servings_multiplier": "0.333"})
+
+        # ownership check and one grouped aggregation, whatever the number of recipes
+        with self.assertNumQueries(2):
+            response = self.client.post('/api/shopping-list/', {"recipes": recipes}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        items = response.data['data']['items']
+        # 15 * 1 + 15 * 1.5 + 0.333 servings
+        self.assertEqual([(i['name'], i['amount']) for i in items], [("Pepper", '37.833'), ("Salt", '113.499')])
+        self.assertEqual(items[1]['price'], '56.75')
+        self.assertEqual(response.data['data']['total_cost'], '60.53')
+
+        other = User.objects.create_user(username='other', password='other')
+        foreign = Recipe.objects.create(name="Foreign", description="desc", user=other)
+        response = self.client.post('/api/shopping-list/', {"recipes": [{"recipe_id": foreign.id}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cost_analytics(self):
+        oil = Ingredient.objects.create(name="Oil", cost="3.00", unit="l", user=self.user)
+        for i, amount in enumerate([1, 2, 3, 4, 10]):
+            recipe = Recipe.objects.create(name=f"Dish {i}", description="desc", user=self.user)
+            IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient2, ingredient_amount=amount)
+            if i == 4:
+                IngredientRecipe.objects.create(recipe=recipe, ingredient=oil, ingredient_amount=1)
+        refresh_recipe_totals()
+
+        response = self.client.get('/api/analytics/costs/', {'top': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        # totals 1, 2, 3, 4, 13
+        self.assertEqual(
+            {k: data['recipes'][k] for k in ('recipe_count', 'average', 'median', 'p90', 'maximum')},
+            {'recipe_count': 5, 'average': '4.60', 'median': '3.00', 'p90': '9.40', 'maximum': '13.00'},
+        )
+        self.assertEqual([(u['unit'], u['total_cost']) for u in data['by_unit']], [('g', '20.00'), ('l', '3.00')])
+        self.assertEqual(
+            [(i['name'], i['total_cost'], i['recipe_count']) for i in data['top_ingredients']], [("Sugar", '20.00', 5)]
+        )
+
+        # cached until the next write
+        with self.assertNumQueries(0):
+            self.client.get('/api/analytics/costs/', {'top': 1})
+        self.client.post('/api/ingredients/', {"name": "Flour", "cost": "1.00"}, format='json')
+        with self.assertNumQueries(6):
+            self.client.get('/api/analytics/costs/', {'top': 1})
+
+    def test_ingredient_price_simulation(self):
+        recipes = []
+        for i in range(40):
+            recipe = Recipe.objects.create(name=f"Dish {i}", description="desc", user=self.user)
+            IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient1, ingredient_amount=i + 1)
+            if i % 2:
+                IngredientRecipe.objects.create(recipe=recipe, ingredient=self.ingredient2, ingredient_amount=1)
+            recipes.append(recipe)
+        refresh_recipe_totals()
+        changes = [
+            {"ingredient_id": self.ingredient1.id, "new_cost": "0.60"},
+            {"ingredient_id": self.ingredient2.id, "new_cost": "0.90"},
+        ]
+
+        # ingredients, then one grouped query for every affected recipe, in a savepoint
+        with self.assertNumQueries(4):
+            response = self.client.post('/api/ingredients/price-simulation/', {"changes": changes}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertFalse(data['applied'])
+        self.assertEqual(len(data['recipes']), 40)
+        # Dish 1: 2 * 0.5 + 1.0 -> 2 * 0.6 + 0.9
+        self.assertEqual(data['recipes'][1], {**data['recipes'][1], 'old_total': '2.00', 'new_total': '2.10'})
+        # 0.1 * (1 + ... + 40) - 0.1 * 20
+        self.assertEqual(data['total_difference'], '80.00')
+        self.ingredient1.refresh_from_db()
+        self.assertEqual(self.ingredient1.cost, Decimal('0.50'))
+
+        data = {"changes": changes, "apply": True}
+        response = self.client.post('/api/ingredients/price-simulation/', data, format='json')
+        self.assertTrue(response.data['data']['applied'])
+        self.ingredient2.refresh_from_db()
+        self.assertEqual(self.ingredient2.cost, Decimal('0.90'))
+        recipes[1].refresh_from_db()
+        self.assertEqual(recipes[1].total_price, Decimal('2.10'))
+
+        changes = [{"ingredient_id": 999, "new_cost": "1.00"}]
+        response = self.client.post('/api/ingredients/price-simulation/', {"changes": changes}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_image_variants(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        recipe = Recipe.objects.create(name="Pictured", description="desc", user=self.user)
+        url = f'/api/recipes/{recipe.id}/upload-image/'
+
+        with self.settings(MEDIA_ROOT=media_root, IMAGE_WORKERS=0):
+            response = self.client.post(url, {'image': generate_image()}, format='multipart')
+            # until the variants are rendered they point at the original
+            original = response.data['data']['image']
+            self.assertEqual(response.data['data']['image_variants']['128'], {'webp': original, 'jpeg': original})
+            job_url = f"/api/jobs/{response.data['job_id']}/"
+            self.assertEqual(self.client.get(job_url).data['data']['status'], 'queued')
+
+            out = StringIO()
+            call_command('run_workers', '--burst', '--threads', '0', stdout=out)
+            self.assertIn("Ran 1 jobs.", out.getvalue())
+            job = self.client.get(job_url).data['data']
+            self.assertEqual((job['status'], job['attempts'], job['result']), ('succeeded', 1, {'stored': True}))
+            variants = self.client.get(f'/api/recipes/{recipe.id}/').data['data']['image_variants']
+            self.assertEqual(sorted(variants, key=int), ['128', '512', '1024'])
+            self.assertTrue(variants['128']['webp'].partition('?')[0].endswith('_128.webp'))
+            recipe.refresh_from_db()
+            with Image.open(os.path.join(media_root, recipe.image_variants['128']['jpeg'])) as thumbnail:
+                self.assertEqual((thumbnail.format, thumbnail.size), ('JPEG', (100, 100)))
+
+            Recipe.objects.filter(id=recipe.id).update(image_variants={})
+            out = StringIO()
+            with self.settings(IMAGE_WORKERS=1):
+                call_command('generate_image_variants', stdout=out)
+            self.assertIn("for 1 of 1 recipes", out.getvalue())
+            recipe.refresh_from_db()
+            self.assertEqual(len(recipe.image_variants), 3)
+
+    def test_failed_job_is_retried(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        recipe = Recipe.objects.create(name="Pictured", description="desc", user=self.user)
+
+        with self.settings(MEDIA_ROOT=media_root, IMAGE_WORKERS=0, JOB_MAX_ATTEMPTS=2):
+            response = self.client.post(
+                f'/api/recipes/{recipe.id}/upload-image/', {'image': generate_image()}, format='multipart'
+            )
+            recipe.refresh_from_db()
+            os.remove(os.path.join(media_root, recipe.image.name))
+            call_command('run_workers', '--burst', '--threads', '0', stdout=StringIO())
+
+            job = Job.objects.get(pk=response.data['job_id'])
+            self.assertEqual((job.status, job.attempts), ('queued', 1))
+            self.assertIn("FileNotFoundError", job.error)
+            self.assertGreater(job.run_after, job.updated_at)
+            # not due yet
+            call_command('run_workers', '--burst', '--threads', '0', stdout=StringIO())
+            self.assertEqual(Job.objects.get(pk=job.pk).attempts, 1)
+
+            Job.objects.filter(pk=job.pk).update(run_after=job.updated_at)
+            call_command('run_workers', '--burst', '--threads', '0', stdout=StringIO())
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+        other = User.objects.create_user(username='other', password='other')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/api/jobs/{job.pk}/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/jobs/').data['data'], [])
+
+    def test_image_blobs_are_shared(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        first = Recipe.objects.create(name="First", description="desc", user=self.user)
+        second = Recipe.objects.create(name="Second", description="desc", user=self.user)
+
+        with self.settings(MEDIA_ROOT=media_root, IMAGE_WORKERS=0):
+            self.client.post(f'/api/recipes/{first.id}/upload-image/', {'image': generate_image()}, format='multipart')
+            call_command('run_workers', '--burst', '--threads', '0', stdout=StringIO())
+            self.client.post(f'/api/recipes/{second.id}/upload-image/', {'image': generate_image()}, format='multipart')
+            call_command('run_workers', '--burst', '--threads', '0', stdout=StringIO())
+            first.refresh_from_db()
+            second.refresh_from_db()
+            # one file and one set of variants for both recipes
+            self.assertEqual(first.image.name, second.image.name)
+            self.assertTrue(first.image.name.startswith('recipes/blobs/'))
+            self.assertEqual(second.image_variants, first.image_variants)
+            blob = ImageBlob.objects.get()
+            self.assertEqual(blob.ref_count, 2)
+
+            self.client.delete(f'/api/recipes/{first.id}/')
+            self.client.post(
+                f'/api/recipes/{second.id}/upload-image/', {'image': generate_image('red')}, format='multipart'
+            )
+            blob.refresh_from_db()
+            self.assertEqual(blob.ref_count, 0)
+
+            out = StringIO()
+            call_command('gc_image_blobs', '--grace-seconds', '0', stdout=out)
+            self.assertIn("Deleted 1 unreferenced and 0 untracked blobs", out.getvalue())
+            self.assertFalse(ImageBlob.objects.filter(pk=blob.pk).exists())
+            self.assertFalse(os.path.exists(os.path.join(media_root, blob.name)))
+            self.assertFalse(
+                any(os.path.exists(os.path.join(media_root, n)) for n in first.image_variants['128'].values())
+            )
+            second.refresh_from_db()
+            self.assertTrue(os.path.exists(os.path.join(media_root, second.image.name)))
+
+    def test_media_view(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        recipe = Recipe.objects.create(name="Pictured", description="desc", user=self.user)
+
+        with self.settings(MEDIA_ROOT=media_root, IMAGE_WORKERS=0, MEDIA_ACCEL_REDIRECT=None):
+            self.client.post(f'/api/recipes/{recipe.id}/upload-image/', {'image': generate_image()}, format='multipart')
+            url = self.client.get(f'/api/recipes/{recipe.id}/').data['data']['image']
+            recipe.refresh_from_db()
+            with open(os.path.join(media_root, recipe.image.name), 'rb') as file:
+                content = file.read()
+
+            # fetched like an <img> tag does, without credentials
+            self.client.force_authenticate(user=None)
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(b''.join(response.streaming_content), content)
+            self.assertEqual(response['Content-Type'], 'image/jpeg')
+            self.assertIn('immutable', response['Cache-Control'])
+
+            response = self.client.get(url, HTTP_RANGE='bytes=10-19')
+            self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+            self.assertEqual(b''.join(response.streaming_content), content[10:20])
+            self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(content)}')
+            response = self.client.get(url, HTTP_RANGE=f'bytes={len(content)}-')
+            self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            with self.settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+                response = self.client.get(url)
+            self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{recipe.image.name}')
+
+            # unsigned, signed for another user or expired
+            self.assertEqual(self.client.get(f'/media/{recipe.image.name}').status_code, status.HTTP_403_FORBIDDEN)
+            other = User.objects.create_user(username='other', password='other')
+            forged = url.replace(f'user={self.user.id}', f'user={other.id}')
+            self.assertEqual(self.client.get(forged).status_code, status.HTTP_403_FORBIDDEN)
+            with mock.patch('django.core.signing.time.time', return_value=time.time() + 2 * settings.MEDIA_URL_MAX_AGE):
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+            # no longer served once the recipe no longer uses the file
+            Recipe.objects.filter(id=recipe.id).update(image='')
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RecipeSearchAPITestCase(APITransactionTestCase):
+    """
+    Search through the API. Transactional, because InnoDB FULLTEXT indexes (the MySQL backend)
+    only see committed rows.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.ingredient1 = Ingredient.objects.create(name="Salt", cost=0.5, user=self.user)
+        self.ingredient2 = Ingredient.objects.create(name="Sugar", cost=1.0, user=self.user)
+
+    def test_search_recipes_ranked_and_paginated(self):
+        Recipe.objects.create(name="Sweet pie", description="Apple", user=self.user)
+        Recipe.objects.create(name="Apple pie", description="Sweet apple", user=self.user)
+        Recipe.objects.create(name="Bread", description="Plain", user=self.user)
+
+        first = self.client.get('/api/recipes/', {'q': 'apple', 'limit': 1})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['name'] for r in first.data['data']], ["Apple pie"])
+
+        second = self.client.get('/api/recipes/', {'q': 'apple', 'limit': 1, 'cursor': first.data['next']})
+        self.assertEqual([r['name'] for r in second.data['data']], ["Sweet pie"])
+        self.assertIsNone(second.data['next'])
+
+        back = self.client.get('/api/recipes/', {'q': 'apple', 'limit': 1, 'cursor': second.data['prev']})
+        self.assertEqual([r['name'] for r in back.data['data']], ["Apple pie"])
+
+        response = self.client.get('/api/recipes/', {'cursor': first.data['next']})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_applies_list_filters_before_limit(self):
+        for i in range(5):
+            Recipe.objects.create(name=f"Apple tart {i}", description="Apple", total_price=i, user=self.user)
+        Recipe.objects.create(name="Apple cake", description="Apple", total_price=10, user=self.user)
+        Recipe.objects.create(name="Cheap apple", description="desc", total_price=9, user=self.user)
+
+        # the best matches are all filtered out, the page still holds the ones that pass
+        first = self.client.get('/api/recipes/', {'q': 'apple', 'min_price': 9, 'limit': 1})
+        second = self.client.get(
+            '/api/recipes/', {'q': 'apple', 'min_price': 9, 'limit': 1, 'cursor': first.data['next']}
+        )
+        names = [r['name'] for r in first.data['data'] + second.data['data']]
+        self.assertCountEqual(names, ["Apple cake", "Cheap apple"])
+        self.assertIsNone(second.data['next'])
+
+        response = self.client.get('/api/recipes/', {'q': 'tart', 'max_price': 1, 'name': 'tart 1'})
+        self.assertEqual([r['name'] for r in response.data['data']], ["Apple tart 1"])
+        self.assertIsNone(response.data['next'])
+        response = self.client.get('/api/ingredients/', {'q': 'sugar', 'name': 'salt'})
+        self.assertEqual((response.data['data'], response.data['next']), ([], None))
+
+    def test_search_ingredients(self):
+        response = self.client.get('/api/ingredients/', {'q': 'sug'})
+        self.assertEqual([i['name'] for i in response.data['data']], ["Sugar"])
+        response = self.client.get('/api/ingredients/', {'name': 'ugA'})
+        self.assertEqual([i['name'] for i in response.data['data']], ["Sugar"])
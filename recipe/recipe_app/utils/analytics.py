@@ -0,0 +1,87 @@
+from decimal import Decimal
+from typing import List, Optional
+
+from django.db.models import Avg, Count, Max, Min, Sum
+
+from recipe_app.models import IngredientRecipe, Recipe
+from recipe_app.schemas.responses import (
+    CostAnalytics,
+    IngredientSpendResponse,
+    RecipeCostStats,
+    UnitCostResponse,
+)
+from recipe_app.utils.common import round_decimal
+from recipe_app.utils.recipe_totals import PRICE_FIELD, line_price_expression
+
+PERCENTILES = {'median': Decimal('0.5'), 'p90': Decimal('0.9'), 'p95': Decimal('0.95')}
+
+
+def percentile(queryset, count: int, fraction: Decimal) -> Optional[Decimal]:
+    """
+    Linearly interpolated percentile of the stored recipe totals in ``queryset``. The
+    database sorts on the (user, total_price) index and returns the two neighbouring rows.
+    """
+    if not count:
+        return None
+    position = (count - 1) * fraction
+    low = int(position)
+    values = list(queryset.order_by('total_price').values_list('total_price', flat=True)[low : low + 2])
+    if len(values) == 1:
+        return round_decimal(values[0])
+    return round_decimal(values[0] + (values[1] - values[0]) * (position - low))
+
+
+def recipe_cost_stats(user) -> RecipeCostStats:
+    recipes = Recipe.objects.filter(user=user)
+    stats = recipes.aggregate(
+        recipe_count=Count('id'), average=Avg('total_price'), minimum=Min('total_price'), maximum=Max('total_price')
+    )
+    for name in ('average', 'minimum', 'maximum'):
+        if stats[name] is not None:
+            stats[name] = round_decimal(stats[name])
+    for name, fraction in PERCENTILES.items():
+        stats[name] = percentile(recipes, stats['recipe_count'], fraction)
+    return RecipeCostStats(**stats)
+
+
+def cost_by_unit(user) -> List[UnitCostResponse]:
+    rows = (
+        IngredientRecipe.objects.filter(recipe__user=user)
+        .values('ingredient__unit')
+        .annotate(total_cost=Sum(line_price_expression(), output_field=PRICE_FIELD), line_count=Count('id'))
+        .order_by('ingredient__unit')
+    )
+    return [
+        UnitCostResponse(
+            unit=row['ingredient__unit'], total_cost=round_decimal(row['total_cost']), line_count=row['line_count']
+        )
+        for row in rows
+    ]
+
+
+def top_ingredients(user, limit: int) -> List[IngredientSpendResponse]:
+    """The user's ingredients with the highest cost summed over every recipe using them."""
+    rows = (
+        IngredientRecipe.objects.filter(recipe__user=user)
+        .values('ingredient_id', 'ingredient__name', 'ingredient__unit', 'ingredient__cost')
+        .annotate(total_cost=Sum(line_price_expression(), output_field=PRICE_FIELD), recipe_count=Count('recipe_id'))
+        .order_by('-total_cost', 'ingredient_id')[:limit]
+    )
+    return [
+        IngredientSpendResponse(
+            ingredient_id=row['ingredient_id'],
+            name=row['ingredient__name'],
+            unit=row['ingredient__unit'],
+            cost=row['ingredient__cost'],
+            total_cost=round_decimal(row['total_cost']),
+            recipe_count=row['recipe_count'],
+        )
+        for row in rows
+    ]
+
+
+def cost_analytics(user, top: int) -> CostAnalytics:
+    """Recipe cost statistics, cost per unit and top ingredients, each aggregated by the database."""
+    return CostAnalytics(
+        recipes=recipe_cost_stats(user), by_unit=cost_by_unit(user), top_ingredients=top_ingredients(user, top)
+    )
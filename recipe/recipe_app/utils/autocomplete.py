@@ -0,0 +1,109 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict
+from typing import Iterable, List, Tuple
+
+from django.conf import settings
+
+from recipe_app.models import Ingredient
+from recipe_app.utils.response_cache import get_user_cache_version
+from recipe_app.utils.trigrams import name_trigrams
+
+WORD_START_RE = re.compile(r'\b\w')
+
+# (id, name, cost, unit)
+IngredientRow = Tuple[int, str, object, str]
+
+
+class IngredientPrefixIndex:
+    """
+    Immutable in-memory index of one user's ingredient names.
+
+    Every word start of every name is stored in a sorted array, so a prefix lookup is a
+    binary search plus a scan of the matching range. Names that start with the prefix
+    rank before names that only contain a word starting with it, then shorter names first.
+    A trigram posting list provides fuzzy matches when there are too few prefix matches.
+    """
+
+    def __init__(self, rows: Iterable[IngredientRow]):
+        self.rows = {}
+        entries = []
+        self.postings = defaultdict(list)
+        for row in rows:
+            pk, name = row[0], row[1].lower()
+            self.rows[pk] = row
+            for match in WORD_START_RE.finditer(name):
+                entries.append((name[match.start() :], match.start() > 0, len(name), name, pk))
+            for trigram in name_trigrams(name):
+                self.postings[trigram].append(pk)
+        entries.sort()
+        self.entries = entries
+        self.keys = [entry[0] for entry in entries]
+
+    def complete(self, query: str, limit: int) -> List[IngredientRow]:
+        query = query.lower().strip()
+        if not query:
+            return []
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + '\U0010ffff', lo=start)
+        ranked = heapq.nsmallest(limit * 2, (entry[1:] for entry in self.entries[start:end]))
+
+        result, seen = [], set()
+        for _, _, _, pk in ranked:
+            if pk not in seen:
+                seen.add(pk)
+                result.append(self.rows[pk])
+            if len(result) == limit:
+                return result
+        return result + self.fuzzy(query, limit - len(result), seen)
+
+    def fuzzy(self, query: str, limit: int, exclude: set) -> List[IngredientRow]:
+        trigrams = name_trigrams(query)
+        if not trigrams:
+            return []
+        shared = Counter(pk for trigram in trigrams for pk in self.postings.get(trigram, ()) if pk not in exclude)
+        # typos break up to three trigrams each, so be lenient and let the ranking sort it out
+        needed = max(1, len(trigrams) // 3)
+        best = heapq.nsmallest(
+            limit, ((-count, len(self.rows[pk][1]), pk) for pk, count in shared.items() if count >= needed)
+        )
+        return [self.rows[pk] for _, _, pk in best]
+
+
+class IngredientIndexCache:
+    """
+    Per-process LRU of IngredientPrefixIndex by user. An index is built lazily on first
+    use and rebuilt when the user's cache version (bumped by every write, see
+    utils.response_cache) changes, so writes made by any worker invalidate it.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id) -> IngredientPrefixIndex:
+        version = get_user_cache_version(user_id)
+        with self._lock:
+            cached = self._indexes.get(user_id)
+            if cached is not None and cached[0] == version:
+                self._indexes.move_to_end(user_id)
+                return cached[1]
+
+        rows = Ingredient.objects.filter(user_id=user_id).values_list('id', 'name', 'cost', 'unit')
+        index = IngredientPrefixIndex(rows.iterator(chunk_size=2000))
+        with self._lock:
+            self._indexes[user_id] = (version, index)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+
+ingredient_indexes = IngredientIndexCache(settings.AUTOCOMPLETE_MAX_USERS)
@@ -0,0 +1,66 @@
+import json
+import re
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+from django.core.handlers.wsgi import WSGIRequest
+
+REF_PATTERN = re.compile(r'^\$([A-Za-z_][A-Za-z0-9_]*)$')
+
+# request metadata a sub-request inherits, so URLs built by the views match the batch request
+INHERITED_META = ('SERVER_NAME', 'SERVER_PORT', 'HTTP_HOST', 'REMOTE_ADDR', 'HTTP_X_FORWARDED_PROTO')
+
+
+class BatchReferenceError(ValueError):
+    pass
+
+
+def substitute_refs(value: Any, refs: Dict[str, int]) -> Any:
+    """Replace every ``"$name"`` string in ``value`` with the id created under ``name``."""
+    if isinstance(value, dict):
+        return {key: substitute_refs(item, refs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute_refs(item, refs) for item in value]
+    if isinstance(value, str) and (match := REF_PATTERN.match(value)):
+        name = match.group(1)
+        if name not in refs:
+            raise BatchReferenceError(f'Unknown reference "${name}".')
+        return refs[name]
+    return value
+
+
+def substitute_path(path: str, refs: Dict[str, int]) -> str:
+    return '/'.join(str(substitute_refs(segment, refs)) for segment in path.split('/'))
+
+
+def created_id(data: Any) -> Optional[int]:
+    """The id of the single object in an operation's response, None if it returned none (delete, bulk, list)."""
+    item = data.get('data') if isinstance(data, dict) else None
+    if isinstance(item, dict) and isinstance(item.get('id'), int):
+        return item['id']
+    return None
+
+
+def make_subrequest(request, method: str, path: str, body: Optional[dict]) -> WSGIRequest:
+    """
+    A request for one batch operation, authenticated as the batch request's user. DRF
+    takes ``_force_auth_user`` instead of running the authenticators again.
+    """
+    payload = json.dumps(body).encode() if body is not None else b''
+    environ = {key: request.META[key] for key in INHERITED_META if key in request.META}
+    environ.update(
+        {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': '',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+            'wsgi.input': BytesIO(payload),
+            'wsgi.url_scheme': request.scheme,
+        }
+    )
+    subrequest = WSGIRequest(environ)
+    subrequest._force_auth_user = request.user
+    subrequest._force_auth_token = request.auth
+    return subrequest
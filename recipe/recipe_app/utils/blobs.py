@@ -0,0 +1,80 @@
+import os
+import time
+from typing import Iterator, Tuple
+
+from django.core.files.storage import default_storage
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Now
+
+from recipe_app.models import ImageBlob, Recipe
+from recipe_app.storage import BLOB_DIR, blob_digest, is_blob_name
+from recipe_app.utils.image_variants import VARIANT_DIR
+
+
+def acquire_blob(name: str) -> None:
+    """Count one more recipe pointing at the blob ``name``; other image names are not counted."""
+    if not is_blob_name(name):
+        return
+    blob, created = ImageBlob.objects.get_or_create(
+        name=name,
+        defaults={'sha256': blob_digest(name), 'size': default_storage.size(name), 'ref_count': 1},
+    )
+    if not created:
+        ImageBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1, updated_at=Now())
+
+
+def release_blob(name: str) -> None:
+    """Count one recipe less pointing at the blob ``name``; at zero it is left for gc_image_blobs."""
+    if is_blob_name(name):
+        ImageBlob.objects.filter(name=name).update(ref_count=F('ref_count') - 1, updated_at=Now())
+
+
+def recount_blobs() -> int:
+    """Set every blob's ref_count to the recipes actually using it, returns how many were wrong."""
+    users = (
+        Recipe.objects.filter(image=OuterRef('name')).order_by().values('image').annotate(count=Count('id'))
+    ).values('count')
+    actual = Coalesce(Subquery(users), Value(0))
+    return ImageBlob.objects.exclude(ref_count=actual).update(ref_count=actual)
+
+
+def variant_files(name: str) -> Iterator[str]:
+    """Storage names of the rendered variants of the blob ``name``."""
+    prefix = f'{blob_digest(name)}_'
+    try:
+        _, files = default_storage.listdir(VARIANT_DIR)
+    except FileNotFoundError:
+        return
+    for file in files:
+        if file.startswith(prefix):
+            yield f'{VARIANT_DIR}/{file}'
+
+
+def delete_blob_files(name: str) -> int:
+    """Delete the blob ``name`` and its variants, returns the bytes freed."""
+    freed = 0
+    for file in [name, *variant_files(name)]:
+        if default_storage.exists(file):
+            freed += default_storage.size(file)
+            default_storage.delete(file)
+    return freed
+
+
+def untracked_blob_files() -> Iterator[Tuple[str, float]]:
+    """Names and modification times of files under BLOB_DIR without an ImageBlob, e.g. left by a failed upload."""
+    root = default_storage.path(BLOB_DIR)
+    for directory, _, files in os.walk(root):
+        prefix = '/'.join([BLOB_DIR, *os.path.relpath(directory, root).split(os.sep), ''])
+        prefix = prefix.replace('/./', '/')
+        known = set(ImageBlob.objects.filter(name__startswith=prefix).values_list('name', flat=True))
+        for file in files:
+            if prefix + file not in known:
+                yield prefix + file, os.path.getmtime(os.path.join(directory, file))
+
+
+def recently_used(name: str, grace_seconds: int) -> bool:
+    """Whether the blob file was written or saved again within ``grace_seconds``, an upload may be about to count it."""
+    try:
+        return time.time() - os.path.getmtime(default_storage.path(name)) < grace_seconds
+    except FileNotFoundError:
+        return False
@@ -1,5 +1,34 @@
+from collections import defaultdict
 from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
 
 
 def round_decimal(value, places=2):
-    return Decimal(value).quantize(Decimal(f'1.{"0"*places}'), rounding=ROUND_HALF_UP)
\ No newline at end of file
+    return Decimal(value).quantize(Decimal(f'1.{"0"*places}'), rounding=ROUND_HALF_UP)
+
+
+def name_key(name: str) -> str:
+    """``name`` as the unique constraints on names compare it: MySQL's default collation ignores case."""
+    return name.casefold() if connection.vendor == 'mysql' else name
+
+
+def format_validation_error(error) -> str:
+    """One-line summary of a pydantic ValidationError, e.g. ``cost: Input should be a valid decimal``."""
+    return '; '.join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" if e['loc'] else e['msg'] for e in error.errors()
+    )
+
+
+def grouped_case(field: str, values: Dict[int, int]):
+    """
+    Integer CASE giving ``values[row.field]``, 0 for other rows. Keys sharing a value
+    share one ``WHEN field IN (...)``, so the expression grows with the distinct values.
+    """
+    keys_by_value = defaultdict(list)
+    for key, value in values.items():
+        keys_by_value[value].append(key)
+    whens = [When(**{f'{field}__in': keys}, then=Value(value)) for value, keys in keys_by_value.items()]
+    return Case(*whens, default=Value(0), output_field=IntegerField())
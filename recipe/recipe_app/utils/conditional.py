@@ -0,0 +1,73 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+
+def make_etag(*parts) -> str:
+    return quote_etag(hashlib.sha1(':'.join(str(p) for p in parts).encode()).hexdigest())
+
+
+def conditional_response(method):
+    """
+    Answer a GET with ``304 Not Modified`` when the client's ETag or Last-Modified is still current.
+
+    The view provides ``get_conditional_state(request, **kwargs)`` returning ``(etag, last_modified)``
+    computed from a cheap query (e.g. count and max(updated_at)), so a matching request never builds
+    the response body. Returning ``None`` skips the check, e.g. to let the handler produce a 404.
+    Async handlers get their state from ``aget_conditional_state`` instead.
+
+    The ETag is left on ``request.conditional_etag``, where cached_response adds it to its key:
+    a body cached before a write that changed the state without invalidating the cache (admin,
+    management commands, job workers) is never served under the new ETag.
+    """
+
+    if iscoroutinefunction(method):
+
+        @wraps(method)
+        async def async_wrapper(self, request, *args, **kwargs):
+            state = await self.aget_conditional_state(request, **kwargs)
+            response, etag, timestamp = _check(request, state)
+            request.conditional_etag = etag
+            if response is None:
+                response = _annotate(await method(self, request, *args, **kwargs), etag, timestamp)
+            return _private(response)
+
+        return async_wrapper
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        state = self.get_conditional_state(request, **kwargs)
+        response, etag, timestamp = _check(request, state)
+        request.conditional_etag = etag
+        if response is None:
+            response = _annotate(method(self, request, *args, **kwargs), etag, timestamp)
+        return _private(response)
+
+    return wrapper
+
+
+def _check(request, state):
+    """``(304 response or None, etag, timestamp)`` for the conditional headers of ``request``."""
+    if state is None:
+        return None, None, None
+    etag, last_modified = state
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp), etag, timestamp
+
+
+def _annotate(response, etag, timestamp):
+    if etag is not None and response.status_code == status.HTTP_200_OK:
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+def _private(response):
+    # responses are per user: let browsers keep them but always revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
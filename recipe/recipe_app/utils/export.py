@@ -0,0 +1,103 @@
+import csv
+import io
+import zlib
+from typing import Callable, Iterable, Iterator, List
+
+from django.conf import settings
+
+from recipe_app.models import Ingredient, Recipe
+from recipe_app.schemas.responses import IngredientResponse, RecipeResponse
+from recipe_app.utils.response_builders import build_recipe_responses
+from recipe_app.utils.streaming import iter_batches
+
+CONTENT_TYPES = {'jsonl': 'application/jsonl', 'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# ingredient lines repeat the recipe columns, the layout import_recipes reads back
+RECIPE_CSV_COLUMNS = [
+    'id',
+    'name',
+    'description',
+    'total_price',
+    'ingredient_count',
+    'ingredient',
+    'unit',
+    'cost',
+    'amount',
+    'ingredient_price',
+]
+INGREDIENT_CSV_COLUMNS = ['id', 'name', 'unit', 'cost']
+
+
+def recipe_batches(user, size: int) -> Iterator[List[RecipeResponse]]:
+    for batch in iter_batches(Recipe.objects.filter(user=user).order_by('id'), size):
+        yield build_recipe_responses(batch, None)
+
+
+def ingredient_batches(user, size: int) -> Iterator[List[IngredientResponse]]:
+    for batch in iter_batches(Ingredient.objects.filter(user=user).order_by('id'), size):
+        yield [IngredientResponse(id=i.id, name=i.name, cost=i.cost, unit=i.unit) for i in batch]
+
+
+def recipe_csv_rows(recipe: RecipeResponse) -> Iterator[list]:
+    head = [recipe.id, recipe.name, recipe.description, recipe.total_price, recipe.ingredient_count]
+    if not recipe.ingredients:
+        yield head + [''] * 5
+    for i in recipe.ingredients:
+        yield head + [i.name, i.unit, i.cost, i.ingredient_amount, i.ingredient_price]
+
+
+def ingredient_csv_rows(ingredient: IngredientResponse) -> Iterator[list]:
+    yield [ingredient.id, ingredient.name, ingredient.unit, ingredient.cost]
+
+
+EXPORTS = {
+    'recipes': (recipe_batches, RECIPE_CSV_COLUMNS, recipe_csv_rows),
+    'ingredients': (ingredient_batches, INGREDIENT_CSV_COLUMNS, ingredient_csv_rows),
+}
+
+
+def render_jsonl(batches: Iterable[list]) -> Iterator[bytes]:
+    for batch in batches:
+        if batch:
+            yield b''.join(item.model_dump_json().encode() + b'\n' for item in batch)
+
+
+def render_csv(
+    batches: Iterable[list], columns: List[str], rows: Callable[[object], Iterable[list]]
+) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        for item in batch:
+            writer.writerows(rows(item))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress ``chunks`` into one gzip member as they arrive."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        if data := compressor.compress(chunk):
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(user, kind: str, file_format: str, gzip: bool = False) -> Iterator[bytes]:
+    """
+    Yield the user's recipes or ingredients rendered as JSON lines or CSV, read with
+    QuerySet.iterator() and built STREAMING_CHUNK_SIZE rows at a time, so memory use
+    does not depend on the size of the account. Recipes carry their total and
+    ingredient prices, in the shapes of the API responses.
+    """
+    batches, columns, rows = EXPORTS[kind]
+    batches = batches(user, settings.STREAMING_CHUNK_SIZE)
+    chunks = render_csv(batches, columns, rows) if file_format == 'csv' else render_jsonl(batches)
+    return gzip_chunks(chunks) if gzip else chunks
+
+
+def export_filename(kind: str, file_format: str, gzip: bool = False) -> str:
+    return f"{kind}.{file_format}{'.gz' if gzip else ''}"
@@ -0,0 +1,57 @@
+from typing import NamedTuple, Optional
+
+from PIL import Image, UnidentifiedImageError
+
+# leading bytes of the accepted formats, checked before Pillow sees the file
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif'}
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class ImageInfo(NamedTuple):
+    format: str
+    width: int
+    height: int
+
+
+def sniff_format(file) -> Optional[str]:
+    """Format of ``file`` by its magic bytes, None if it is none of SIGNATURES."""
+    file.seek(0)
+    header = file.read(8)
+    file.seek(0)
+    for signature, image_format in SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+def inspect_image(file, max_pixels: int) -> ImageInfo:
+    """
+    Format and dimensions of the uploaded image ``file``, read from its header only: Pillow
+    opens images lazily and nothing is decoded here. Raises InvalidImage for other formats,
+    unreadable headers and images of more than ``max_pixels`` pixels (decompression bombs).
+    """
+    image_format = sniff_format(file)
+    if image_format is None:
+        raise InvalidImage("Unsupported image format. Allowed: JPEG, PNG, GIF.")
+    try:
+        with Image.open(file, formats=[image_format]) as image:
+            width, height = image.size
+    except Image.DecompressionBombError:
+        # over twice Pillow's own limit, it refuses before we get the size
+        raise InvalidImage(f"Image exceeds the allowed size of {max_pixels} pixels.")
+    except (UnidentifiedImageError, SyntaxError, OSError):
+        raise InvalidImage("Image file is damaged or incomplete.")
+    finally:
+        file.seek(0)
+    if width * height > max_pixels:
+        raise InvalidImage(f"Image exceeds the allowed size of {max_pixels} pixels ({width}x{height}).")
+    return ImageInfo(image_format, width, height)
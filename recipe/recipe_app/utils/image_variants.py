@@ -0,0 +1,56 @@
+"""
+Resizing of recipe images. Runs in the worker processes of utils.images, so this module
+imports nothing from Django and its functions take plain paths and settings.
+"""
+
+import os
+from typing import Dict, Iterable
+
+from PIL import Image, ImageOps
+
+VARIANT_DIR = 'recipes/variants'
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def flatten(image: Image.Image) -> Image.Image:
+    """RGB copy of ``image`` for JPEG, transparent areas on white."""
+    if image.mode == 'RGB':
+        return image
+    if image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_variants(
+    source_path: str, media_root: str, stem: str, sizes: Iterable[int], formats: Iterable[str]
+) -> Dict[str, Dict[str, str]]:
+    """
+    Write a copy of the image at ``source_path`` fitting in each of ``sizes`` (never
+    upscaled) in each of ``formats``, under VARIANT_DIR of ``media_root``. Returns the
+    names relative to ``media_root`` by size and format.
+    """
+    sizes = sorted(sizes, reverse=True)
+    os.makedirs(os.path.join(media_root, VARIANT_DIR), exist_ok=True)
+    variants = {}
+    with Image.open(source_path) as source:
+        # JPEG decodes at a fraction of full size when that is enough for the largest variant
+        source.draft('RGB', (sizes[0], sizes[0]))
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+        # largest first, each size is scaled down from the previous one
+        for size in sizes:
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                name = f'{VARIANT_DIR}/{stem}_{size}.{EXTENSIONS[fmt]}'
+                output = flatten(image) if fmt == 'jpeg' else image
+                output.save(os.path.join(media_root, name), **SAVE_OPTIONS[fmt])
+                variants.setdefault(str(size), {})[fmt] = name
+    return variants
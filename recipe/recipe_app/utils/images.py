@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models.functions import Now
+
+from recipe_app.models import Job, Recipe
+from recipe_app.utils.image_variants import render_variants
+from recipe_app.utils.jobs import enqueue_job, job_handler
+from recipe_app.utils.media import media_url
+from recipe_app.utils.response_cache import invalidate_user_cache
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Process pool shared by the job threads of this process, started on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn, forking a process that runs other threads can copy held locks
+            _executor = ProcessPoolExecutor(settings.IMAGE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def variant_job(image_name: str) -> tuple:
+    # named after the image, for blobs its content hash: recipes sharing a blob share its variants
+    return (
+        default_storage.path(image_name),
+        str(settings.MEDIA_ROOT),
+        os.path.splitext(os.path.basename(image_name))[0],
+        settings.IMAGE_VARIANT_SIZES,
+        settings.IMAGE_VARIANT_FORMATS,
+    )
+
+
+def store_variants(recipe_id: int, user_id: int, image_name: str, variants: Dict[str, Dict[str, str]]) -> bool:
+    """
+    Record ``variants`` unless the recipe's image changed since they were requested. The
+    files stay either way, they belong to the image and go with it in gc_image_blobs.
+    """
+    updated = Recipe.objects.filter(pk=recipe_id, image=image_name).update(image_variants=variants, updated_at=Now())
+    if updated:
+        invalidate_user_cache(user_id)
+    return bool(updated)
+
+
+def shared_variants(image_name: str) -> Dict[str, Dict[str, str]]:
+    """Variants already rendered for another recipe with the same image, empty if there are none."""
+    rendered = Recipe.objects.filter(image=image_name).exclude(image_variants={})
+    return rendered.values_list('image_variants', flat=True).first() or {}
+
+
+@job_handler('image-variants')
+def generate_image_variants(recipe_id: int, user_id: int, image_name: str) -> dict:
+    """
+    Render the variants of ``image_name`` in the process pool, or with IMAGE_WORKERS = 0
+    in the calling thread, and record them. An image another recipe already has variants
+    of is not rendered again.
+    """
+    variants = shared_variants(image_name)
+    if not variants:
+        job = variant_job(image_name)
+        if settings.IMAGE_WORKERS:
+            variants = get_executor().submit(render_variants, *job).result()
+        else:
+            variants = render_variants(*job)
+    return {'stored': store_variants(recipe_id, user_id, image_name, variants)}
+
+
+def schedule_image_variants(recipe: Recipe) -> Job:
+    """Queue the rendering of the recipe's current image, picked up once the transaction that stored it commits."""
+    return enqueue_job(
+        'image-variants',
+        {'recipe_id': recipe.id, 'user_id': recipe.user_id, 'image_name': recipe.image.name},
+        user_id=recipe.user_id,
+    )
+
+
+def image_variant_urls(recipe: Recipe) -> Dict[str, Dict[str, str]]:
+    """URLs of the recipe's image variants; every variant is the original image until they are rendered."""
+    if not recipe.image:
+        return {}
+    if recipe.image_variants:
+        return {
+            size: {fmt: media_url(name, recipe.user_id) for fmt, name in by_format.items()}
+            for size, by_format in recipe.image_variants.items()
+        }
+    original = media_url(recipe.image.name, recipe.user_id)
+    return {
+        str(size): {fmt: original for fmt in settings.IMAGE_VARIANT_FORMATS} for size in settings.IMAGE_VARIANT_SIZES
+    }
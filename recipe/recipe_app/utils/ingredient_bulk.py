@@ -0,0 +1,67 @@
+from typing import Dict, List, Tuple
+
+from django.db import connection
+
+from recipe_app.models import Ingredient, IngredientRecipe
+from recipe_app.schemas.requests import IngredientInput
+from recipe_app.utils.common import name_key
+from recipe_app.utils.recipe_totals import refresh_recipe_totals
+from recipe_app.utils.trigrams import index_name_trigrams
+
+UPSERT_BATCH_SIZE = 500
+
+
+def bulk_upsert_ingredients(user, items: List[IngredientInput]) -> Tuple[Dict[Tuple[str, str], Ingredient], set]:
+    """
+    Insert ``items`` or update the cost of the user's ingredient with the same name and unit,
+    in a number of queries that does not depend on ``len(items)`` (beyond insert batching).
+    Returns the stored ingredients by (name_key(name), unit), the way the unique key matches
+    them, and the ids of those that were created. Totals of recipes using an ingredient whose
+    cost changed are recomputed.
+    """
+    if not items:
+        return {}, set()
+    names = {item.name for item in items}
+    existing = {
+        (name_key(name), unit): (pk, cost)
+        for pk, name, unit, cost in Ingredient.objects.filter(user=user, name__in=names).values_list(
+            'id', 'name', 'unit', 'cost'
+        )
+    }
+
+    # MySQL resolves the conflict through any unique key and takes no target
+    unique_fields = ['name', 'unit', 'user'] if connection.features.supports_update_conflicts_with_target else None
+    Ingredient.objects.bulk_create(
+        [Ingredient(user=user, name=item.name, cost=item.cost, unit=item.unit) for item in items],
+        batch_size=UPSERT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=['cost', 'updated_at'],
+    )
+
+    # not every backend returns primary keys from an upsert, read the rows back
+    stored = {(name_key(i.name), i.unit): i for i in Ingredient.objects.filter(user=user, name__in=names)}
+    requested = {(name_key(item.name), item.unit) for item in items}
+    stored = {key: ingredient for key, ingredient in stored.items() if key in requested}
+
+    created = [ingredient for key, ingredient in stored.items() if key not in existing]
+    repriced = [i.id for key, i in stored.items() if key in existing and existing[key][1] != i.cost]
+    if created:
+        index_name_trigrams(created)
+    if repriced:
+        refresh_recipe_totals(IngredientRecipe.objects.filter(ingredient_id__in=repriced).values('recipe_id'))
+    return stored, {ingredient.id for ingredient in created}
+
+
+def bulk_delete_ingredients(user, ids: List[int]) -> List[int]:
+    """Delete the user's ingredients among ``ids`` and refresh the totals of recipes that used them."""
+    owned = list(Ingredient.objects.filter(user=user, id__in=ids).values_list('id', flat=True))
+    if not owned:
+        return []
+    recipe_ids = list(
+        IngredientRecipe.objects.filter(ingredient_id__in=owned).values_list('recipe_id', flat=True).distinct()
+    )
+    Ingredient.objects.filter(id__in=owned).delete()
+    if recipe_ids:
+        refresh_recipe_totals(recipe_ids)
+    return owned
@@ -0,0 +1,92 @@
+import logging
+import uuid
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from recipe_app.models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS: Dict[str, Callable] = {}
+
+
+def job_handler(kind: str):
+    """Register the decorated function to run jobs of ``kind``, called with the job's payload as keywords."""
+
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue_job(kind: str, payload: dict, user_id: Optional[int] = None, max_attempts: Optional[int] = None) -> Job:
+    """
+    Queue a job of ``kind``. Created in the caller's transaction, so workers only see it
+    once the data it refers to is committed.
+    """
+    if kind not in JOB_HANDLERS:
+        raise LookupError(f"No handler for job kind {kind!r}.")
+    return Job.objects.create(
+        kind=kind, payload=payload, user_id=user_id, max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Wait before retrying after ``attempts`` failed runs: doubling from JOB_RETRY_BASE_SECONDS, capped."""
+    seconds = settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.JOB_RETRY_MAX_SECONDS))
+
+
+def claim_jobs(limit: int) -> List[Job]:
+    """
+    Mark up to ``limit`` due jobs as running and return them. The conditional update makes
+    the claim safe between workers without row locks, which SQLite does not have: a job
+    another worker claimed first is no longer queued and is not returned.
+    """
+    due = Job.objects.filter(status=Job.Status.QUEUED, run_after__lte=timezone.now()).order_by('run_after', 'id')
+    ids = list(due.values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    Job.objects.filter(id__in=ids, status=Job.Status.QUEUED).update(
+        status=Job.Status.RUNNING, claim_token=token, attempts=F('attempts') + 1, updated_at=Now()
+    )
+    return list(Job.objects.filter(id__in=ids, claim_token=token, status=Job.Status.RUNNING).order_by('id'))
+
+
+def run_job(job: Job) -> None:
+    """Run a claimed job and record its result, or queue it again after retry_delay until it runs out of attempts."""
+    changes = {}
+    try:
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            raise LookupError(f"No handler for job kind {job.kind!r}.")
+        result = handler(**job.payload)
+    except Exception as e:
+        logger.exception("Job %s failed on attempt %s of %s", job, job.attempts, job.max_attempts)
+        changes['error'] = f"{type(e).__name__}: {e}"
+        if job.attempts >= job.max_attempts:
+            changes['status'] = Job.Status.FAILED
+        else:
+            changes['status'] = Job.Status.QUEUED
+            changes['run_after'] = timezone.now() + retry_delay(job.attempts)
+    else:
+        changes.update(status=Job.Status.SUCCEEDED, result=result, error='')
+    Job.objects.filter(pk=job.pk, claim_token=job.claim_token).update(**changes, updated_at=Now())
+
+
+def requeue_stale_jobs() -> int:
+    """Queue again jobs running longer than JOB_TIMEOUT_SECONDS, their worker presumably died."""
+    stale = Job.objects.filter(
+        status=Job.Status.RUNNING, updated_at__lt=timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS)
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.Status.FAILED, error="Timed out.", updated_at=Now()
+    )
+    return failed + stale.update(status=Job.Status.QUEUED, claim_token='', updated_at=Now())
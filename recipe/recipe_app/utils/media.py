@@ -0,0 +1,182 @@
+import mimetypes
+import os
+import re
+import time
+from typing import Optional, Tuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.signing import BadSignature, TimestampSigner, b62_encode
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+from recipe_app.storage import BLOB_DIR
+from recipe_app.utils.image_variants import VARIANT_DIR
+
+# blob names are the SHA-256 of their content, variants of a blob add _<size>
+HASHED_STEM = re.compile(r'^(?P<digest>[0-9a-f]{64})(_\d+)?$')
+RANGE = re.compile(r'^bytes=(?P<start>\d*)-(?P<end>\d*)$')
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+BLOCK_SIZE = 64 * 1024
+
+
+def stem(name: str) -> str:
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def owner_filter(name: str) -> Q:
+    """Recipes that make the media file ``name`` visible: the ones with it as image, or as the image of a variant."""
+    if not name.startswith(f'{VARIANT_DIR}/'):
+        return Q(image=name)
+    image_stem = stem(name).rpartition('_')[0]
+    return Q(image__startswith=f'{BLOB_DIR}/{image_stem[:2]}/{image_stem}.') | Q(
+        image__startswith=f'recipes/{image_stem}.'
+    )
+
+
+def media_url_epoch() -> int:
+    """Start of the current signing period of media URLs."""
+    period = settings.MEDIA_URL_MAX_AGE // 2
+    return int(time.time()) // period * period
+
+
+class MediaURLSigner(TimestampSigner):
+    """Signs with the start of the signing period instead of the current second, so a file's URL stays the same."""
+
+    def timestamp(self):
+        return b62_encode(media_url_epoch())
+
+
+def media_signer() -> MediaURLSigner:
+    return MediaURLSigner(salt='recipe_app.media')
+
+
+def media_url(name: str, user_id: int) -> str:
+    """
+    URL of the media file ``name`` for ``user_id``, signed so that it can be fetched without
+    credentials, e.g. by an ``<img>`` tag, until MEDIA_URL_MAX_AGE after its signing period began.
+    """
+    value = f'{user_id}/{name}'
+    signature = media_signer().sign(value)[len(value) + 1 :]
+    return f'{default_storage.url(name)}?{urlencode({"user": user_id, "signature": signature})}'
+
+
+def signed_media_user(name: str, user: str, signature: str) -> Optional[int]:
+    """The user the URL of ``name`` was signed for, None when the signature is missing, forged or expired."""
+    try:
+        media_signer().unsign(f'{user}/{name}:{signature}', max_age=settings.MEDIA_URL_MAX_AGE)
+        return int(user)
+    except (BadSignature, ValueError):
+        return None
+
+
+def content_digest(name: str) -> Optional[str]:
+    """The content hash in ``name``, None for files named at upload that may be replaced."""
+    match = HASHED_STEM.match(stem(name))
+    return match['digest'] if match else None
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte of a single ``bytes=`` range of a ``size`` bytes file, None to send
+    the whole file (no, malformed or multi-part range). Raises ValueError if unsatisfiable.
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if not match or not (match['start'] or match['end']):
+        return None
+    if not match['start']:
+        # suffix range: the last N bytes
+        length = int(match['end'])
+        if not length:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    first = int(match['start'])
+    last = min(int(match['end']), size - 1) if match['end'] else size - 1
+    if first >= size or last < first:
+        raise ValueError(header)
+    return first, last
+
+
+class RangeFile:
+    """
+    ``length`` bytes of an open file from its current position. Keeps ``fileno`` so a WSGI
+    server's file wrapper can still sendfile it, bounded by the Content-Length.
+    """
+
+    def __init__(self, file, length: int):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def media_response(request, name: str) -> HttpResponse:
+    """
+    Serve the media file ``name``. With MEDIA_ACCEL_REDIRECT nginx sends the file from its
+    internal location; otherwise it is a FileResponse honouring a single Range. Files named
+    by content hash never change, so they are cached as immutable.
+    """
+    path = default_storage.path(name)
+    stat = os.stat(path)
+    digest = content_digest(name)
+    etag = quote_etag(digest or f'{int(stat.st_mtime)}-{stat.st_size}')
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = file_response(request, name, path, stat.st_size, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if digest:
+        patch_cache_control(response, private=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def file_response(request, name: str, path: str, size: int, etag: str) -> HttpResponse:
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if settings.MEDIA_ACCEL_REDIRECT:
+        # nginx handles ranges and sendfile for internal redirects itself
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT + name
+        return response
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if 'Range' in request.headers and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except ValueError:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        first, last = byte_range
+        file.seek(first)
+        response = FileResponse(
+            RangeFile(file, last - first + 1), content_type=content_type, status=status.HTTP_206_PARTIAL_CONTENT
+        )
+        response['Content-Length'] = last - first + 1
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+    response.block_size = BLOCK_SIZE
+    response['Accept-Ranges'] = 'bytes'
+    return response
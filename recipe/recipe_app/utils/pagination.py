@@ -0,0 +1,184 @@
+import base64
+import binascii
+import json
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q, QuerySet
+
+# Keyset orderings available to list endpoints. The last column is always the
+# primary key so that every ordering is total and a cursor points at exactly one row.
+ORDERINGS = {
+    'id': ('id',),
+    'name': ('name', 'id'),
+    'total_price': ('total_price', 'id'),
+    # search relevance, see paginate_ranked
+    'rank': ('rank', 'id'),
+}
+
+NEXT = 'n'
+PREV = 'p'
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_decimal(value: Any) -> bool:
+    try:
+        return isinstance(value, str) and Decimal(value).is_finite()
+    except InvalidOperation:
+        return False
+
+
+# what each ordering column's cursor value must be, as encode_cursor writes it
+KEY_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    'id': _is_int,
+    'name': lambda value: isinstance(value, str),
+    'total_price': _is_decimal,
+    'rank': lambda value: _is_int(value) or isinstance(value, float),
+}
+
+
+def encode_cursor(ordering: str, values: Tuple[Any, ...], direction: str) -> str:
+    # Decimal keys (total_price) are carried as strings and converted back by the field on lookup
+    payload = json.dumps({'o': ordering, 'v': list(values), 'd': direction}, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, Tuple[Any, ...], str]:
+    """
+    Decode an opaque cursor into (ordering, key values, direction).
+    Raises ValueError for anything that was not produced by encode_cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        ordering, values, direction = payload['o'], tuple(payload['v']), payload['d']
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise ValueError('Invalid cursor.')
+    if ordering not in ORDERINGS or direction not in (NEXT, PREV) or len(values) != len(ORDERINGS[ordering]):
+        raise ValueError('Invalid cursor.')
+    if not all(KEY_CHECKS[field](value) for field, value in zip(ORDERINGS[ordering], values)):
+        raise ValueError('Invalid cursor.')
+    return ordering, values, direction
+
+
+def _keyset_filter(fields: Tuple[str, ...], values: Tuple[Any, ...], lookup: str) -> Q:
+    # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+    condition = Q()
+    for i, field in enumerate(fields):
+        equal = {f: v for f, v in zip(fields[:i], values[:i])}
+        condition |= Q(**equal, **{f'{field}__{lookup}': values[i]})
+    return condition
+
+
+class KeysetPage:
+    def __init__(self, items: List[Any], next_cursor: Optional[str], prev_cursor: Optional[str]):
+        self.items = items
+        self.next = next_cursor
+        self.prev = prev_cursor
+
+
+def get_page_limit(limit: Optional[int]) -> int:
+    if not limit:
+        return settings.PAGINATION_DEFAULT_LIMIT
+    return min(limit, settings.PAGINATION_MAX_LIMIT)
+
+
+def paginate_keyset(
+    queryset: QuerySet, ordering: str = 'id', cursor: Optional[str] = None, limit: Optional[int] = None
+) -> KeysetPage:
+    """
+    Return one page of ``queryset`` using keyset (seek) pagination.
+
+    Rows are located with a ``WHERE (key) > (cursor key)`` condition instead of ``OFFSET``,
+    so the cost of a page does not depend on how deep into the result set it is.
+    """
+    rows, state = _seek(queryset, ordering, cursor, limit)
+    return _keyset_page(list(rows), *state)
+
+
+async def apaginate_keyset(
+    queryset: QuerySet, ordering: str = 'id', cursor: Optional[str] = None, limit: Optional[int] = None
+) -> KeysetPage:
+    """Async version of paginate_keyset."""
+    rows, state = _seek(queryset, ordering, cursor, limit)
+    return _keyset_page([row async for row in rows], *state)
+
+
+def _seek(queryset: QuerySet, ordering: str, cursor: Optional[str], limit: Optional[int]):
+    limit = get_page_limit(limit)
+    direction = NEXT
+    values = None
+    if cursor:
+        ordering, values, direction = decode_cursor(cursor)
+    fields = ORDERINGS[ordering]
+
+    if direction == NEXT:
+        queryset = queryset.order_by(*fields)
+        if values is not None:
+            queryset = queryset.filter(_keyset_filter(fields, values, 'gt'))
+    else:
+        queryset = queryset.order_by(*(f'-{f}' for f in fields)).filter(_keyset_filter(fields, values, 'lt'))
+    return queryset[: limit + 1], (ordering, values, direction, limit)
+
+
+def _keyset_page(items: List[Any], ordering: str, values, direction: str, limit: int) -> KeysetPage:
+    has_more = len(items) > limit
+    items = items[:limit]
+    if direction == PREV:
+        items.reverse()
+    keys = [tuple(getattr(item, f) for f in ORDERINGS[ordering]) for item in items[:1] + items[-1:]]
+    return _build_page(items, keys, ordering, values, direction, has_more)
+
+
+def paginate_ranked(queryset: QuerySet, search, cursor: Optional[str] = None, limit: Optional[int] = None):
+    """
+    Return one page of search results. ``search(after, direction, limit)`` returns
+    ``(id, score)`` pairs ranked by ascending score then id, seeking past ``after``;
+    the matching rows of ``queryset`` are returned in that order.
+    """
+    limit, values, direction = _ranked_state(cursor, limit)
+    hits = search(values, direction, limit + 1)
+    return _ranked_page(queryset.in_bulk([pk for pk, _ in hits[:limit]]), hits, values, direction, limit)
+
+
+async def apaginate_ranked(queryset: QuerySet, search, cursor: Optional[str] = None, limit: Optional[int] = None):
+    """Async version of paginate_ranked; ``search`` is synchronous and runs in a worker thread."""
+    limit, values, direction = _ranked_state(cursor, limit)
+    hits = await sync_to_async(search)(values, direction, limit + 1)
+    objects = await queryset.ain_bulk([pk for pk, _ in hits[:limit]])
+    return _ranked_page(objects, hits, values, direction, limit)
+
+
+def _ranked_state(cursor: Optional[str], limit: Optional[int]):
+    values, direction = None, NEXT
+    if cursor:
+        _, values, direction = decode_cursor(cursor)
+    return get_page_limit(limit), values, direction
+
+
+def _ranked_page(objects, hits, values, direction: str, limit: int) -> KeysetPage:
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    if direction == PREV:
+        hits.reverse()
+    items = [objects[pk] for pk, _ in hits if pk in objects]
+    keys = [(score, pk) for pk, score in hits[:1] + hits[-1:]]
+    return _build_page(items, keys, 'rank', values, direction, has_more)
+
+
+def _build_page(items, keys, ordering, values, direction, has_more) -> KeysetPage:
+    if not keys:
+        return KeysetPage(items, None, None)
+    first, last = keys[0], keys[-1]
+    if direction == NEXT:
+        next_cursor = encode_cursor(ordering, last, NEXT) if has_more else None
+        prev_cursor = encode_cursor(ordering, first, PREV) if values is not None else None
+    else:
+        next_cursor = encode_cursor(ordering, last, NEXT)
+        prev_cursor = encode_cursor(ordering, first, PREV) if has_more else None
+    return KeysetPage(items, next_cursor, prev_cursor)
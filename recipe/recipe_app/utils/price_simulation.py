@@ -0,0 +1,72 @@
+from decimal import Decimal
+from typing import Dict, List
+
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from recipe_app.models import Ingredient, IngredientRecipe
+from recipe_app.schemas.responses import IngredientPriceChange, PriceSimulationResult, RecipePriceChange
+from recipe_app.utils.common import grouped_case, round_decimal
+from recipe_app.utils.recipe_totals import refresh_recipe_totals
+
+# costs have 2 decimal places; deltas enter SQL as integer cents so the per-recipe sums stay exact
+CENTS = 100
+
+
+def recipe_price_changes(cost_deltas: Dict[int, int]) -> List[RecipePriceChange]:
+    """
+    Old and new totals of every recipe using an ingredient in ``cost_deltas`` (ingredient
+    id to cost change in cents), from one grouped query over the ingredient_id index of
+    IngredientRecipe.
+    """
+    if not cost_deltas:
+        return []
+    rows = (
+        IngredientRecipe.objects.filter(ingredient_id__in=list(cost_deltas))
+        .values('recipe_id', 'recipe__name', 'recipe__total_price')
+        .annotate(delta=Sum(F('ingredient_amount') * grouped_case('ingredient_id', cost_deltas)))
+        .order_by('recipe_id')
+    )
+    changes = []
+    for row in rows:
+        difference = round_decimal(Decimal(row['delta']) / CENTS)
+        changes.append(
+            RecipePriceChange(
+                recipe_id=row['recipe_id'],
+                name=row['recipe__name'],
+                old_total=row['recipe__total_price'],
+                new_total=row['recipe__total_price'] + difference,
+                difference=difference,
+            )
+        )
+    return changes
+
+
+def simulate_price_changes(ingredients: List[Ingredient], new_costs: Dict[int, Decimal], apply: bool = False):
+    """
+    Report how recipe totals move when ``ingredients`` get ``new_costs`` (by ingredient
+    id). With ``apply`` the costs are stored and the affected totals recomputed; the
+    caller provides the transaction and should have locked ``ingredients``.
+    """
+    cost_deltas = {i.id: int((new_costs[i.id] - i.cost) * CENTS) for i in ingredients if new_costs[i.id] != i.cost}
+    recipes = recipe_price_changes(cost_deltas)
+    result = PriceSimulationResult(
+        applied=apply,
+        ingredients=[
+            IngredientPriceChange(
+                ingredient_id=i.id, name=i.name, unit=i.unit, old_cost=i.cost, new_cost=new_costs[i.id]
+            )
+            for i in ingredients
+        ],
+        recipes=recipes,
+        total_difference=round_decimal(sum((r.difference for r in recipes), Decimal('0'))),
+    )
+    if apply and cost_deltas:
+        changed = [i for i in ingredients if i.id in cost_deltas]
+        now = timezone.now()
+        for ingredient in changed:
+            ingredient.cost = new_costs[ingredient.id]
+            ingredient.updated_at = now
+        Ingredient.objects.bulk_update(changed, ['cost', 'updated_at'])
+        refresh_recipe_totals(IngredientRecipe.objects.filter(ingredient_id__in=cost_deltas).values('recipe_id'))
+    return result
@@ -1,8 +1,21 @@
-from typing import List, Type
+from typing import List, Literal, Type, Union, get_args, get_origin
 from pydantic import BaseModel
 from drf_spectacular.utils import OpenApiParameter
 
 
+def _unwrap_annotation(annotation):
+    """Strip Optional[...] and map Literal[...] to its value type plus enum values."""
+    if get_origin(annotation) is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            annotation = args[0]
+    if get_origin(annotation) is Literal:
+        values = list(get_args(annotation))
+        return type(values[0]), values
+    # constrained types (conint, constr, ...) are Annotated[...] around a plain type
+    return getattr(annotation, '__origin__', annotation), None
+
+
 class PydanticModelParameters:
 
     def __init__(self, model: Type[BaseModel], location: str = "query"):
@@ -12,12 +25,14 @@ class PydanticModelParameters:
     def get_parameters(self) -> List[OpenApiParameter]:
         parameters = []
         for field_name, model_field in self.model.model_fields.items():
+            param_type, enum = _unwrap_annotation(model_field.annotation)
             param = OpenApiParameter(
                 name=field_name,
-                type=model_field.annotation,
+                type=param_type,
                 location=self.location,
-                required=model_field.is_required,
+                required=model_field.is_required(),
                 description=model_field.description or "",
+                enum=enum,
             )
             parameters.append(param)
         return parameters
@@ -0,0 +1,227 @@
+import csv
+import json
+import time
+from itertools import groupby, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from pydantic import ValidationError
+
+from recipe_app.models import Ingredient, IngredientRecipe, Recipe
+from recipe_app.schemas.requests import RecipeImportInput, RecipeInput
+from recipe_app.schemas.responses import ImportRowError, RecipeImportReport
+from recipe_app.utils.common import format_validation_error, name_key
+from recipe_app.utils.recipe_totals import refresh_recipe_totals
+from recipe_app.utils.response_cache import invalidate_user_cache
+from recipe_app.utils.trigrams import index_name_trigrams
+
+# (line number, parsed row or None, parse error or None)
+ImportRow = Tuple[int, Any, Optional[str]]
+
+FORMATS = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl', '.csv': 'csv'}
+
+
+def detect_format(filename: str, explicit: Optional[str] = None) -> Optional[str]:
+    if explicit:
+        return explicit
+    for suffix, fmt in FORMATS.items():
+        if filename.lower().endswith(suffix):
+            return fmt
+    return None
+
+
+def parse_jsonl(lines: Iterable[str]) -> Iterator[ImportRow]:
+    """One recipe object per line, e.g. ``{"name": ..., "ingredients": [{"name": "Salt", "ingredient_amount": 3}]}``."""
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line), None
+        except ValueError as e:
+            yield line_no, None, f'Invalid JSON: {e}'
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[ImportRow]:
+    """
+    One ingredient line per row with the columns ``name, description, ingredient,
+    ingredient_id, unit, amount``. Consecutive rows with the same recipe name form one
+    recipe; a row without ingredient and ingredient_id adds none.
+    """
+    reader = csv.DictReader(lines)
+    numbered = ((reader.line_num, row) for row in reader)
+    for name, group in groupby(numbered, key=lambda item: item[1].get('name')):
+        group = list(group)
+        first_line, first = group[0]
+        recipe = {'name': name, 'description': first.get('description') or '', 'ingredients': []}
+        for _, row in group:
+            if row.get('ingredient') or row.get('ingredient_id'):
+                recipe['ingredients'].append(
+                    {
+                        'name': row.get('ingredient') or None,
+                        'ingredient_id': row.get('ingredient_id') or None,
+                        'unit': row.get('unit') or 'g',
+                        'ingredient_amount': row.get('amount'),
+                    }
+                )
+        yield first_line, recipe, None
+
+
+PARSERS = {'jsonl': parse_jsonl, 'csv': parse_csv}
+
+
+def insert_recipes(user, recipes: List[Recipe]) -> List[Recipe]:
+    """bulk_create ``recipes`` and make sure their ids are set."""
+    if connection.features.can_return_rows_from_bulk_insert:
+        return Recipe.objects.bulk_create(recipes)
+    # MySQL returns no ids: read them back by (user, name), which is unique. Must run in the
+    # chunk's transaction.
+    Recipe.objects.bulk_create(recipes)
+    ids = dict(Recipe.objects.filter(user=user, name__in=[r.name for r in recipes]).values_list('name', 'id'))
+    ids = {name_key(name): pk for name, pk in ids.items()}
+    for recipe in recipes:
+        recipe.id = ids[name_key(recipe.name)]
+    return recipes
+
+
+class RecipeImporter:
+    """
+    Import a stream of parsed rows for one user in chunks of ``chunk_size`` recipes.
+
+    Rows of a chunk are validated, their ingredient references resolved against one
+    query for the whole chunk, and the valid ones written in a transaction with a
+    bulk insert for the recipes and one for their ingredient lines. Only one chunk and
+    the first ``max_errors`` errors are kept in memory. ``progress`` is called with the
+    running report after every chunk.
+    """
+
+    def __init__(
+        self,
+        user,
+        chunk_size: Optional[int] = None,
+        max_errors: int = 100,
+        progress: Optional[Callable[[RecipeImportReport], None]] = None,
+    ):
+        self.user = user
+        self.chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+        self.max_errors = max_errors
+        self.progress = progress
+        self.rows = self.imported = self.failed = 0
+        self.errors: List[ImportRowError] = []
+        self.started = time.monotonic()
+
+    def run(self, rows: Iterable[ImportRow]) -> RecipeImportReport:
+        self.started = time.monotonic()
+        rows = iter(rows)
+        try:
+            while chunk := list(islice(rows, self.chunk_size)):
+                self.import_chunk(chunk)
+                if self.progress:
+                    self.progress(self.report())
+        finally:
+            if self.imported:
+                invalidate_user_cache(self.user.id)
+        return self.report()
+
+    def report(self) -> RecipeImportReport:
+        seconds = time.monotonic() - self.started
+        return RecipeImportReport(
+            rows=self.rows,
+            imported=self.imported,
+            failed=self.failed,
+            seconds=round(seconds, 3),
+            rows_per_second=round(self.rows / seconds, 1) if seconds else 0.0,
+            errors=self.errors,
+        )
+
+    def fail(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(ImportRowError(line=line, message=message))
+
+    def import_chunk(self, chunk: List[ImportRow]) -> None:
+        self.rows += len(chunk)
+        parsed = []
+        for line, data, error in chunk:
+            if error:
+                self.fail(line, error)
+                continue
+            try:
+                parsed.append((line, RecipeImportInput.model_validate(data)))
+            except ValidationError as e:
+                self.fail(line, format_validation_error(e))
+
+        by_name, ids = self.ingredient_map([row for _, row in parsed])
+        # names of earlier chunks are in the database by now, so this also catches repeats within the file
+        existing = {name_key(name) for name in self.existing_names([row for _, row in parsed])}
+        taken = set()
+        recipes = []
+        for line, row in parsed:
+            key = name_key(row.name)
+            if key in existing:
+                self.fail(line, f'Recipe "{row.name}" already exists.')
+                continue
+            if key in taken:
+                self.fail(line, f'Recipe "{row.name}" appears more than once in the file.')
+                continue
+            try:
+                recipes.append(self.resolve(row, by_name, ids))
+                taken.add(key)
+            except ValidationError as e:
+                self.fail(line, format_validation_error(e))
+            except ValueError as e:
+                self.fail(line, str(e))
+
+        if recipes:
+            with transaction.atomic():
+                self.write(recipes)
+            self.imported += len(recipes)
+
+    def ingredient_map(self, rows: List[RecipeImportInput]) -> Tuple[Dict[Tuple[str, str], int], set]:
+        names = {i.name for row in rows for i in row.ingredients if i.name is not None}
+        ids = {i.ingredient_id for row in rows for i in row.ingredients if i.ingredient_id is not None}
+        if not names and not ids:
+            return {}, set()
+        found = Ingredient.objects.filter(user=self.user).filter(Q(name__in=names) | Q(id__in=ids))
+        by_name, owned = {}, set()
+        for pk, name, unit in found.values_list('id', 'name', 'unit'):
+            by_name[(name, unit)] = pk
+            owned.add(pk)
+        return by_name, owned
+
+    def existing_names(self, rows: List[RecipeImportInput]) -> List[str]:
+        names = {row.name for row in rows}
+        if not names:
+            return []
+        return list(Recipe.objects.filter(user=self.user, name__in=names).values_list('name', flat=True))
+
+    @staticmethod
+    def resolve(row: RecipeImportInput, by_name, ids) -> RecipeInput:
+        ingredients = []
+        for item in row.ingredients:
+            if item.ingredient_id is not None:
+                if item.ingredient_id not in ids:
+                    raise ValueError(f'Invalid pk "{item.ingredient_id}" - object does not exist.')
+                pk = item.ingredient_id
+            else:
+                pk = by_name.get((item.name, item.unit))
+                if pk is None:
+                    raise ValueError(f'Unknown ingredient "{item.name}" ({item.unit}).')
+            ingredients.append({'ingredient_id': pk, 'ingredient_amount': item.ingredient_amount})
+        return RecipeInput(name=row.name, description=row.description, ingredients=ingredients)
+
+    def write(self, recipes: List[RecipeInput]) -> None:
+        objs = insert_recipes(
+            self.user, [Recipe(user=self.user, name=r.name, description=r.description) for r in recipes]
+        )
+        IngredientRecipe.objects.bulk_create(
+            [
+                IngredientRecipe(recipe_id=obj.id, ingredient_id=i.ingredient_id, ingredient_amount=i.ingredient_amount)
+                for obj, recipe in zip(objs, recipes)
+                for i in recipe.ingredients
+            ],
+            batch_size=self.chunk_size,
+        )
+        refresh_recipe_totals([obj.id for obj in objs])
+        index_name_trigrams(objs)
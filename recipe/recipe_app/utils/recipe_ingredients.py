@@ -0,0 +1,51 @@
+from typing import List
+
+from recipe_app.models import Ingredient, IngredientRecipe, Recipe
+from recipe_app.schemas.requests import IngredientRecipeInput
+
+
+def missing_ingredient_ids(user, items: List[IngredientRecipeInput]) -> List[int]:
+    """Ids in ``items`` that are not ingredients of ``user``, in input order, checked with one IN query."""
+    wanted = [item.ingredient_id for item in items]
+    if not wanted:
+        return []
+    owned = set(Ingredient.objects.filter(user=user, id__in=wanted).values_list('id', flat=True))
+    return [pk for pk in wanted if pk not in owned]
+
+
+def add_recipe_ingredients(recipe: Recipe, items: List[IngredientRecipeInput]) -> None:
+    IngredientRecipe.objects.bulk_create(
+        [
+            IngredientRecipe(recipe=recipe, ingredient_id=item.ingredient_id, ingredient_amount=item.ingredient_amount)
+            for item in items
+        ]
+    )
+
+
+def sync_recipe_ingredients(recipe: Recipe, items: List[IngredientRecipeInput]) -> bool:
+    """
+    Make the ingredient links of ``recipe`` match ``items`` with at most one DELETE, one
+    INSERT and one UPDATE: links that are gone are removed, new ones added and only
+    changed amounts rewritten. Returns whether anything changed.
+    """
+    current = {
+        ir.ingredient_id: ir for ir in recipe.ingredient_recipes.only('id', 'ingredient_id', 'ingredient_amount')
+    }
+    wanted = {item.ingredient_id: item for item in items}
+
+    removed = [ir.id for pk, ir in current.items() if pk not in wanted]
+    added = [item for pk, item in wanted.items() if pk not in current]
+    changed = []
+    for pk, item in wanted.items():
+        ir = current.get(pk)
+        if ir is not None and ir.ingredient_amount != item.ingredient_amount:
+            ir.ingredient_amount = item.ingredient_amount
+            changed.append(ir)
+
+    if removed:
+        IngredientRecipe.objects.filter(id__in=removed).delete()
+    if added:
+        add_recipe_ingredients(recipe, added)
+    if changed:
+        IngredientRecipe.objects.bulk_update(changed, ['ingredient_amount'])
+    return bool(removed or added or changed)
@@ -0,0 +1,64 @@
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Now
+
+from recipe_app.models import Ingredient, IngredientRecipe, Recipe
+
+PRICE_FIELD = DecimalField(max_digits=20, decimal_places=2)
+
+
+def line_price_expression(prefix: str = ''):
+    """``ingredient_amount * ingredient.cost`` for an IngredientRecipe row, optionally reached through ``prefix``."""
+    return F(f'{prefix}ingredient_amount') * F(f'{prefix}ingredient__cost')
+
+
+def recipe_total_subquery():
+    rows = (
+        IngredientRecipe.objects.filter(recipe=OuterRef('pk'))
+        .values('recipe')
+        .annotate(total=Sum(line_price_expression(), output_field=PRICE_FIELD))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=PRICE_FIELD), Value(Decimal('0')), output_field=PRICE_FIELD)
+
+
+def recipe_count_subquery():
+    rows = IngredientRecipe.objects.filter(recipe=OuterRef('pk')).values('recipe').annotate(n=Count('id')).values('n')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0), output_field=IntegerField())
+
+
+def refresh_recipe_totals(recipe_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute the stored total_price and ingredient_count from the ingredient rows
+    with one set-based UPDATE. Rebuilds every recipe when ``recipe_ids`` is None.
+    ``recipe_ids`` may also be a values() queryset, which is used as a subquery.
+    """
+    queryset = Recipe.objects.all()
+    if isinstance(recipe_ids, QuerySet):
+        queryset = queryset.filter(id__in=recipe_ids)
+    elif recipe_ids is not None:
+        queryset = queryset.filter(id__in=list(recipe_ids))
+    return queryset.update(
+        total_price=recipe_total_subquery(), ingredient_count=recipe_count_subquery(), updated_at=Now()
+    )
+
+
+def refresh_recipe_total(recipe: Recipe) -> None:
+    refresh_recipe_totals([recipe.id])
+    recipe.refresh_from_db(fields=['total_price', 'ingredient_count'])
+
+
+def shift_recipe_totals(ingredient: Ingredient, cost_delta: Decimal, count_delta: int = 0) -> int:
+    """
+    Apply a change of one ingredient to every recipe that uses it in a single UPDATE:
+    ``total_price += cost_delta * ingredient_amount`` and ``ingredient_count += count_delta``.
+    """
+    links = IngredientRecipe.objects.filter(ingredient=ingredient)
+    amount = Subquery(links.filter(recipe=OuterRef('pk')).values('ingredient_amount')[:1])
+    return Recipe.objects.filter(id__in=links.values('recipe_id')).update(
+        total_price=F('total_price') + Value(cost_delta, output_field=PRICE_FIELD) * amount,
+        ingredient_count=F('ingredient_count') + count_delta,
+        updated_at=Now(),
+    )
@@ -1,35 +1,148 @@
-from typing import List
-from recipe_app.models import IngredientRecipe, Recipe
-from recipe_app.schemas.responses import RecipeResponse, RecipeIngredientResponse
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+from recipe_app.models import IngredientRecipe, Job, Recipe
+from recipe_app.schemas.responses import JobResponse, RecipeResponse, RecipeIngredientResponse
 from recipe_app.utils.common import round_decimal
+from recipe_app.utils.images import image_variant_urls
+from recipe_app.utils.media import media_url
 
 
-def build_recipe_response(recipe: Recipe, request) -> RecipeResponse:
+def build_recipe_ingredient_response(ir: IngredientRecipe) -> RecipeIngredientResponse:
+    amount = ir.ingredient_amount
+    price = ir.ingredient.cost * amount
+    return RecipeIngredientResponse(
+        id=ir.ingredient.id,
+        name=ir.ingredient.name,
+        cost=ir.ingredient.cost,
+        unit=ir.ingredient.unit,
+        ingredient_amount=amount,
+        ingredient_price=round_decimal(price),
+    )
+
+
+def recipe_columns(fields: Optional[Set[str]]) -> Optional[List[str]]:
+    """Recipe columns needed to build ``fields`` of RecipeResponse; None when every field is requested."""
+    if fields is None:
+        return None
+    columns = [f for f in fields if f != 'ingredients']
+    if 'image_variants' in fields and 'image' not in fields:
+        # variants fall back to the original image
+        columns.append('image')
+    if 'image' in columns:
+        # media URLs are signed for the owner
+        columns.append('user')
+    return columns
+
+
+def sparse_include(fields: Optional[Set[str]], many: bool):
+    """``include`` argument for model_dump that keeps the envelope and only ``fields`` of each recipe."""
+    if fields is None:
+        return None
+    data = {'__all__': fields} if many else fields
+    return {'result': True, 'message': True, 'next': True, 'prev': True, 'data': data}
+
+
+def recipe_ingredient_rows(recipes: List[Recipe]):
+    return (
+        IngredientRecipe.objects.filter(recipe_id__in=[recipe.id for recipe in recipes])
+        .select_related('ingredient')
+        .order_by('id')
+    )
+
+
+def load_recipe_ingredients(recipes: List[Recipe]) -> Dict[int, List[RecipeIngredientResponse]]:
+    ingredients_by_recipe: Dict[int, List[RecipeIngredientResponse]] = defaultdict(list)
+    if recipes:
+        for ir in recipe_ingredient_rows(recipes):
+            ingredients_by_recipe[ir.recipe_id].append(build_recipe_ingredient_response(ir))
+    return ingredients_by_recipe
+
 
-    qs: List[IngredientRecipe] = recipe.ingredient_recipes.select_related('ingredient').all()
+async def aload_recipe_ingredients(recipes: List[Recipe]) -> Dict[int, List[RecipeIngredientResponse]]:
+    ingredients_by_recipe: Dict[int, List[RecipeIngredientResponse]] = defaultdict(list)
+    if recipes:
+        async for ir in recipe_ingredient_rows(recipes):
+            ingredients_by_recipe[ir.recipe_id].append(build_recipe_ingredient_response(ir))
+    return ingredients_by_recipe
 
-    ingredients_data = []
-    for ir in qs:
-        cost = float(ir.ingredient.cost)
-        amount = ir.ingredient_amount
-        price = cost * amount
-        ingredients_data.append(
-            RecipeIngredientResponse(
-                id=ir.ingredient.id,
-                name=ir.ingredient.name,
-                cost=ir.ingredient.cost,
-                unit=ir.ingredient.unit,
-                ingredient_amount=amount,
-                ingredient_price=round_decimal(price),
+
+def build_recipe_responses(
+    recipes: Iterable[Recipe], request, fields: Optional[Set[str]] = None, ingredients_by_recipe=None
+) -> List[RecipeResponse]:
+    """
+    Build responses for a batch of recipes.
+
+    All ingredient rows for the batch are loaded with a single query and grouped
+    by recipe in memory, so the number of queries does not grow with the batch size.
+    With ``fields``, only those attributes are set (dump with ``sparse_include``) and
+    ingredients are loaded only if requested. ``ingredients_by_recipe`` skips the query
+    when the ingredients were loaded already, see abuild_recipe_responses.
+    """
+    recipes = list(recipes)
+    if fields is not None:
+        return build_sparse_recipe_responses(recipes, fields, ingredients_by_recipe)
+
+    if ingredients_by_recipe is None:
+        ingredients_by_recipe = load_recipe_ingredients(recipes)
+    output = []
+    for recipe in recipes:
+        output.append(
+            RecipeResponse(
+                id=recipe.id,
+                name=recipe.name,
+                description=recipe.description,
+                image=media_url(recipe.image.name, recipe.user_id) if recipe.image else None,
+                image_variants=image_variant_urls(recipe),
+                ingredients=ingredients_by_recipe[recipe.id],
+                total_price=recipe.total_price,
+                ingredient_count=recipe.ingredient_count,
             )
         )
+    return output
+
+
+def build_sparse_recipe_responses(
+    recipes: List[Recipe], fields: Set[str], ingredients_by_recipe=None
+) -> List[RecipeResponse]:
+    if ingredients_by_recipe is None:
+        ingredients_by_recipe = load_recipe_ingredients(recipes) if 'ingredients' in fields else {}
+    output = []
+    for recipe in recipes:
+        values = {f: getattr(recipe, f) for f in recipe_columns(fields) if f in fields or f == 'image'}
+        if 'image' in values:
+            values['image'] = media_url(recipe.image.name, recipe.user_id) if recipe.image else None
+        if 'image_variants' in values:
+            values['image_variants'] = image_variant_urls(recipe)
+        if 'ingredients' in fields:
+            values['ingredients'] = ingredients_by_recipe[recipe.id]
+        # values come straight from the model, unset fields are never dumped
+        output.append(RecipeResponse.model_construct(**values))
+    return output
+
+
+def build_recipe_response(recipe: Recipe, request, fields: Optional[Set[str]] = None) -> RecipeResponse:
+    return build_recipe_responses([recipe], request, fields)[0]
+
+
+async def abuild_recipe_responses(
+    recipes: List[Recipe], request, fields: Optional[Set[str]] = None
+) -> List[RecipeResponse]:
+    """Async version of build_recipe_responses."""
+    ingredients_by_recipe = {}
+    if fields is None or 'ingredients' in fields:
+        ingredients_by_recipe = await aload_recipe_ingredients(recipes)
+    return build_recipe_responses(recipes, request, fields, ingredients_by_recipe)
+
 
-    total = sum(i.ingredient_price for i in ingredients_data)
-    return RecipeResponse(
-        id=recipe.id,
-        name=recipe.name,
-        description=recipe.description,
-        image=recipe.image.url if recipe.image else None,
-        ingredients=ingredients_data,
-        total_price=total,
+def build_job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        result=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
     )
@@ -0,0 +1,148 @@
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Counter
+from rest_framework import status
+
+from recipe_app.pydantic_base_view import PydanticResponse
+
+response_cache_hits_total = Counter(
+    'recipe_response_cache_hits_total',
+    'Reads served from the per-user response cache',
+    ['view'],
+    namespace=NAMESPACE,
+)
+response_cache_misses_total = Counter(
+    'recipe_response_cache_misses_total',
+    'Reads that missed the per-user response cache',
+    ['view'],
+    namespace=NAMESPACE,
+)
+response_cache_evictions_total = Counter(
+    'recipe_response_cache_evictions_total',
+    'Per-user cache generations dropped because the user wrote data',
+    namespace=NAMESPACE,
+)
+
+
+def _version_key(user_id) -> str:
+    return f'recipe_app:cache_version:{user_id}'
+
+
+def get_user_cache_version(user_id) -> int:
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed with a clock value rather than 1: if the version key is ever evicted,
+        # entries written under an older generation must not become visible again.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_user_cache_version(user_id) -> int:
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_user_cache_version(user_id) -> None:
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+    response_cache_evictions_total.inc()
+
+
+def invalidate_user_cache(user_id) -> None:
+    """
+    Drop every cached read of ``user_id``. The version is bumped right away so the
+    writing request sees its own change, and again on commit so a read that ran
+    concurrently with the transaction cannot keep pre-commit data under the new version.
+    """
+    bump_user_cache_version(user_id)
+    transaction.on_commit(lambda: bump_user_cache_version(user_id))
+
+
+def response_cache_key(request, view_name: str, version: int, **kwargs) -> str:
+    params = sorted((k, v) for k in request.query_params for v in request.query_params.getlist(k))
+    path = ':'.join(f'{k}={v}' for k, v in sorted(kwargs.items()))
+    # set under conditional_response, so the body always matches the ETag it is sent with
+    validator = getattr(request, 'conditional_etag', None)
+    digest = hashlib.md5(repr((params, validator)).encode()).hexdigest()
+    return f'recipe_app:response:{request.user.id}:{version}:{view_name}:{path}:{digest}'
+
+
+def cached_response(view_name: str):
+    """
+    Serve a GET handler's 200 PydanticResponses from the cache, keyed by user, cache
+    version, URL kwargs, query and the ETag of conditional_response when stacked under
+    it. Works on sync and async handlers.
+    """
+
+    def hit(content):
+        response_cache_hits_total.labels(view=view_name).inc()
+        return PydanticResponse.from_json(content)
+
+    def cacheable(response) -> bool:
+        # the serialized body is kept, so a hit is served without serializing again;
+        # streamed responses are never cached
+        return response.status_code == status.HTTP_200_OK and isinstance(response, PydanticResponse)
+
+    def decorator(method):
+        if iscoroutinefunction(method):
+
+            @wraps(method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                version = await aget_user_cache_version(request.user.id)
+                key = response_cache_key(request, view_name, version, **kwargs)
+                content = await cache.aget(key)
+                if content is not None:
+                    return hit(content)
+                response_cache_misses_total.labels(view=view_name).inc()
+                response = await method(self, request, *args, **kwargs)
+                if cacheable(response):
+                    await cache.aset(key, response.json_bytes(), settings.RESPONSE_CACHE_TIMEOUT)
+                return response
+
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            version = get_user_cache_version(request.user.id)
+            key = response_cache_key(request, view_name, version, **kwargs)
+            content = cache.get(key)
+            if content is not None:
+                return hit(content)
+            response_cache_misses_total.labels(view=view_name).inc()
+            response = method(self, request, *args, **kwargs)
+            if cacheable(response):
+                cache.set(key, response.json_bytes(), settings.RESPONSE_CACHE_TIMEOUT)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def invalidates_response_cache(method):
+    """Invalidate the requesting user's cached reads after a write handler runs."""
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        try:
+            return method(self, request, *args, **kwargs)
+        finally:
+            invalidate_user_cache(request.user.id)
+
+    return wrapper
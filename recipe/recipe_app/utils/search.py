@@ -0,0 +1,187 @@
+import functools
+import importlib
+import re
+from typing import Any, List, Optional, Tuple
+
+from django.db import connection, connections
+from django.db.models import Count, Q, QuerySet, Value
+
+from recipe_app.models import Ingredient, Recipe
+from recipe_app.utils.pagination import NEXT
+from recipe_app.utils.trigrams import TRIGRAM_MODELS, name_trigrams, trigram_candidates
+
+# (object id, score) pairs; every backend ranks by ascending score, then id
+SearchHits = List[Tuple[int, float]]
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def keyset_sql(score: str, pk: str, after: Optional[Tuple[Any, ...]], direction: str) -> Tuple[str, list, str]:
+    """SQL condition, its params and ORDER BY for seeking past ``after`` = (score, id) in ``direction``."""
+    op, order = ('>', 'ASC') if direction == NEXT else ('<', 'DESC')
+    order_by = f'{score} {order}, {pk} {order}'
+    if after is None:
+        return '1 = 1', [], order_by
+    return f'({score} {op} %s OR ({score} = %s AND {pk} {op} %s))', [after[0], after[0], after[1]], order_by
+
+
+def within_sql(within: Optional[QuerySet], pk: str) -> Tuple[str, list]:
+    """SQL condition and its params keeping ``pk`` to the rows of ``within``, e.g. a view's list filters."""
+    if within is None:
+        return '1 = 1', []
+    sql, params = within.order_by().values('pk').query.sql_with_params()
+    return f'{pk} IN ({sql})', list(params)
+
+
+class SearchBackend:
+    """
+    Ranked search over one user's recipes (name, description, ingredient names) or ingredients (name).
+    With ``within`` only hits among its rows are returned, so filters apply before the limit.
+    """
+
+    def search(
+        self,
+        model,
+        user_id,
+        query: str,
+        after: Optional[Tuple[Any, ...]] = None,
+        direction: str = NEXT,
+        limit=100,
+        within: Optional[QuerySet] = None,
+    ) -> SearchHits:
+        raise NotImplementedError
+
+    @staticmethod
+    def tokens(query: str) -> List[str]:
+        return TOKEN_RE.findall(query.lower())
+
+    @staticmethod
+    def fetch(sql: str, params: list) -> SearchHits:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [(row[0], float(row[1])) for row in cursor.fetchall()]
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    FTS5 virtual tables kept in sync by triggers, see migration 0007 and restore_sqlite_fts_triggers.
+    Ranked by bm25.
+    """
+
+    TABLES = {
+        # name matches weigh more than ingredient names, which weigh more than the description
+        Recipe: ('recipe_app_recipe_fts', 'bm25(recipe_app_recipe_fts, 10.0, 1.0, 3.0)'),
+        Ingredient: ('recipe_app_ingredient_fts', 'bm25(recipe_app_ingredient_fts)'),
+    }
+
+    def search(self, model, user_id, query, after=None, direction=NEXT, limit=100, within=None):
+        tokens = self.tokens(query)
+        if not tokens:
+            return []
+        # every token as a quoted prefix query, implicitly AND-ed
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        fts_table, rank = self.TABLES[model]
+        restrict, restrict_params = within_sql(within, 'obj.id')
+        keyset, keyset_params, order_by = keyset_sql(rank, f'{fts_table}.rowid', after, direction)
+        sql = (
+            f'SELECT {fts_table}.rowid, {rank} FROM {fts_table} '
+            f'JOIN {model._meta.db_table} obj ON obj.id = {fts_table}.rowid '
+            f'WHERE {fts_table} MATCH %s AND obj.user_id = %s AND {restrict} AND {keyset} '
+            f'ORDER BY {order_by} LIMIT %s'
+        )
+        return self.fetch(sql, [match, user_id, *restrict_params, *keyset_params, limit])
+
+
+class MySQLFullTextBackend(SearchBackend):
+    """InnoDB FULLTEXT indexes in boolean mode, see migration 0007. Ranked by relevance."""
+
+    RECIPE_SQL = (
+        'SELECT id, -SUM(weight) AS score FROM ('
+        'SELECT r.id AS id, 3 * MATCH(r.name, r.description) AGAINST (%s IN BOOLEAN MODE) AS weight '
+        'FROM recipe_app_recipe r '
+        'WHERE r.user_id = %s AND MATCH(r.name, r.description) AGAINST (%s IN BOOLEAN MODE) '
+        'UNION ALL '
+        'SELECT ir.recipe_id, MATCH(i.name) AGAINST (%s IN BOOLEAN MODE) '
+        'FROM recipe_app_ingredient i JOIN recipe_app_ingredientrecipe ir ON ir.ingredient_id = i.id '
+        'WHERE i.user_id = %s AND MATCH(i.name) AGAINST (%s IN BOOLEAN MODE)'
+        ') matches WHERE {restrict} GROUP BY id HAVING {keyset} ORDER BY {order_by} LIMIT %s'
+    )
+    INGREDIENT_SQL = (
+        'SELECT id, -MATCH(name) AGAINST (%s IN BOOLEAN MODE) AS score FROM recipe_app_ingredient '
+        'WHERE user_id = %s AND MATCH(name) AGAINST (%s IN BOOLEAN MODE) AND {restrict} '
+        'HAVING {keyset} ORDER BY {order_by} LIMIT %s'
+    )
+
+    def search(self, model, user_id, query, after=None, direction=NEXT, limit=100, within=None):
+        tokens = self.tokens(query)
+        if not tokens:
+            return []
+        # operators are stripped by the tokenizer, so every token is an optional prefix term
+        against = ' '.join(f'{token}*' for token in tokens)
+        restrict, restrict_params = within_sql(within, 'id')
+        keyset, keyset_params, order_by = keyset_sql('score', 'id', after, direction)
+        if model is Recipe:
+            sql = self.RECIPE_SQL.format(restrict=restrict, keyset=keyset, order_by=order_by)
+            params = [against, user_id, against, against, user_id, against]
+        else:
+            sql = self.INGREDIENT_SQL.format(restrict=restrict, keyset=keyset, order_by=order_by)
+            params = [against, user_id, against]
+        return self.fetch(sql, [*params, *restrict_params, *keyset_params, limit])
+
+
+class TrigramBackend(SearchBackend):
+    """Portable fallback: ranks names by the number of trigrams shared with the query."""
+
+    def search(self, model, user_id, query, after=None, direction=NEXT, limit=100, within=None):
+        _, fk = TRIGRAM_MODELS[model]
+        trigrams = name_trigrams(query)
+        if trigrams:
+            # at least half of the query's trigrams must be present
+            rows = trigram_candidates(model, user_id, trigrams, (len(trigrams) + 1) // 2)
+            rows = rows.annotate(score=-Count('trigram'))
+        else:
+            fk = 'id'
+            rows = model.objects.filter(user_id=user_id, name__icontains=query.strip()).values(fk)
+            rows = rows.annotate(score=Value(0))
+        if within is not None:
+            rows = rows.filter(**{f'{fk}__in': within.order_by().values('pk')})
+        lookup, order = ('gt', '') if direction == NEXT else ('lt', '-')
+        if after is not None:
+            rows = rows.filter(Q(**{f'score__{lookup}': after[0]}) | Q(score=after[0], **{f'{fk}__{lookup}': after[1]}))
+        rows = rows.order_by(f'{order}score', f'{order}{fk}')[:limit]
+        return [(row[fk], float(row['score'])) for row in rows]
+
+
+def restore_sqlite_fts_triggers(using: str = 'default') -> List[str]:
+    """
+    Create the FTS5 sync triggers of migration 0007 that are missing, returns their names. SQLite
+    drops a table's triggers whenever a migration rebuilds it (most column changes do), so this
+    runs after every migrate, see signals.restore_search_triggers.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite' or SQLiteFTSBackend.TABLES[Recipe][0] not in db.introspection.table_names():
+        return []
+    search_indexes = importlib.import_module('recipe_app.migrations.0007_search_indexes')
+    with db.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {row[0] for row in cursor.fetchall()}
+        restored = []
+        for sql in search_indexes.SQLITE_FTS:
+            # CREATE TRIGGER <name> ...
+            if sql.startswith('CREATE TRIGGER ') and sql.split()[2] not in existing:
+                cursor.execute(sql)
+                restored.append(sql.split()[2])
+    return restored
+
+
+@functools.lru_cache(maxsize=None)
+def _backend_for(vendor: str, database: str) -> SearchBackend:
+    if vendor == 'mysql':
+        return MySQLFullTextBackend()
+    if vendor == 'sqlite' and SQLiteFTSBackend.TABLES[Recipe][0] in connection.introspection.table_names():
+        return SQLiteFTSBackend()
+    return TrigramBackend()
+
+
+def get_search_backend() -> SearchBackend:
+    return _backend_for(connection.vendor, str(connection.settings_dict['NAME']))
@@ -0,0 +1,47 @@
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from django.db.models import F, Sum
+
+from recipe_app.models import IngredientRecipe
+from recipe_app.schemas.responses import ShoppingListItemResponse
+from recipe_app.utils.common import grouped_case, round_decimal
+
+# servings multipliers have 3 decimal places; they enter SQL as integer thousandths so the sum stays exact
+MULTIPLIER_SCALE = 1000
+
+
+def scaled_multipliers(multipliers: Dict[int, Decimal]) -> Dict[int, int]:
+    return {recipe_id: int(multiplier * MULTIPLIER_SCALE) for recipe_id, multiplier in multipliers.items()}
+
+
+def aggregate_shopping_list(user, multipliers: Dict[int, Decimal]) -> Tuple[List[ShoppingListItemResponse], Decimal]:
+    """
+    Sum the ingredient amounts of the user's recipes in ``multipliers`` (recipe id to
+    servings multiplier) per ingredient with one grouped query, and price them. Returns
+    the items ordered by name and unit, and the total cost.
+    """
+    scaled = scaled_multipliers(multipliers)
+    rows = (
+        IngredientRecipe.objects.filter(recipe_id__in=list(scaled), recipe__user=user)
+        .values('ingredient_id', 'ingredient__name', 'ingredient__unit', 'ingredient__cost')
+        .annotate(scaled_amount=Sum(F('ingredient_amount') * grouped_case('recipe_id', scaled)))
+        .order_by('ingredient__name', 'ingredient__unit')
+    )
+    items = []
+    total = Decimal('0')
+    for row in rows:
+        amount = Decimal(row['scaled_amount']) / MULTIPLIER_SCALE
+        price = amount * row['ingredient__cost']
+        total += price
+        items.append(
+            ShoppingListItemResponse(
+                ingredient_id=row['ingredient_id'],
+                name=row['ingredient__name'],
+                unit=row['ingredient__unit'],
+                cost=row['ingredient__cost'],
+                amount=amount,
+                price=round_decimal(price),
+            )
+        )
+    return items, round_decimal(total)
@@ -0,0 +1,63 @@
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Type
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+
+from recipe_app.schemas.responses import PaginatedAPIResponse
+
+_DATA_PLACEHOLDER = '"data":[]'
+
+
+def envelope_parts(response_model: Type[PaginatedAPIResponse]) -> List[bytes]:
+    """Split an empty ``response_model`` envelope around its data array, so streamed output matches it exactly."""
+    empty = response_model(result="ok", data=[]).model_dump_json()
+    head, tail = empty.split(_DATA_PLACEHOLDER)
+    return [f'{head}"data":['.encode(), f']{tail}'.encode()]
+
+
+def iter_batches(queryset: QuerySet, size: int) -> Iterator[list]:
+    rows = queryset.iterator(chunk_size=size)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def stream_json_list(
+    queryset: QuerySet, render_batch: Callable[[list], Iterable[bytes]], response_model, size: int
+) -> Iterator[bytes]:
+    """
+    Yield the ``response_model`` envelope with the rows of ``queryset`` rendered batch by
+    batch into its data array. Only one batch of rows is held in memory at a time.
+    """
+    head, tail = envelope_parts(response_model)
+    yield head
+    separator = b''
+    for batch in iter_batches(queryset, size):
+        items = list(render_batch(batch))
+        if items:
+            yield separator + b','.join(items)
+            separator = b','
+    yield tail
+
+
+async def _async_iter(iterator: Iterator[bytes]):
+    sentinel = object()
+    while (chunk := await sync_to_async(next)(iterator, sentinel)) is not sentinel:
+        yield chunk
+
+
+def streaming_response(request, content: Iterator[bytes], content_type: str) -> StreamingHttpResponse:
+    if isinstance(request._request, ASGIRequest):
+        # Django buffers a synchronous iterator completely under ASGI; hand it over one chunk at a time instead
+        content = _async_iter(content)
+    return StreamingHttpResponse(content, content_type=content_type)
+
+
+def streaming_json_response(
+    request, queryset: QuerySet, render_batch: Callable[[list], Iterable[bytes]], response_model
+) -> StreamingHttpResponse:
+    content = stream_json_list(queryset, render_batch, response_model, settings.STREAMING_CHUNK_SIZE)
+    return streaming_response(request, content, 'application/json')
@@ -0,0 +1,60 @@
+from collections import defaultdict
+from typing import Iterable, Set
+
+from django.db.models import Count, Model, QuerySet
+
+from recipe_app.models import Ingredient, IngredientTrigram, Recipe, RecipeTrigram
+
+# model -> (trigram model, name of its foreign key to the model)
+TRIGRAM_MODELS = {
+    Recipe: (RecipeTrigram, 'recipe_id'),
+    Ingredient: (IngredientTrigram, 'ingredient_id'),
+}
+
+
+def name_trigrams(name: str) -> Set[str]:
+    name = name.lower()
+    return {name[i : i + 3] for i in range(len(name) - 2)}
+
+
+def index_name_trigrams(objects: Iterable[Model]) -> None:
+    """Replace the stored trigrams of ``objects`` (recipes or ingredients) with those of their current names."""
+    by_model = defaultdict(list)
+    for obj in objects:
+        by_model[type(obj)].append(obj)
+    for model, objs in by_model.items():
+        trigram_model, fk = TRIGRAM_MODELS[model]
+        trigram_model.objects.filter(**{f'{fk}__in': [obj.id for obj in objs]}).delete()
+        trigram_model.objects.bulk_create(
+            [
+                trigram_model(user_id=obj.user_id, trigram=trigram, **{fk: obj.id})
+                for obj in objs
+                for trigram in name_trigrams(obj.name)
+            ],
+            batch_size=1000,
+        )
+
+
+def trigram_candidates(model, user_id, trigrams: Set[str], min_matched: int) -> QuerySet:
+    trigram_model, fk = TRIGRAM_MODELS[model]
+    return (
+        trigram_model.objects.filter(user_id=user_id, trigram__in=trigrams)
+        .values(fk)
+        .annotate(matched=Count('trigram'))
+        .filter(matched__gte=min_matched)
+    )
+
+
+def filter_name_contains(queryset: QuerySet, user_id, fragment: str) -> QuerySet:
+    """
+    Case-insensitive substring filter on ``name``. Candidates are narrowed through the
+    trigram index first, so the LIKE only runs on rows that contain every trigram of
+    ``fragment``. Fragments shorter than three characters fall back to a plain LIKE.
+    """
+    queryset = queryset.filter(name__icontains=fragment)
+    trigrams = name_trigrams(fragment)
+    if not trigrams:
+        return queryset
+    _, fk = TRIGRAM_MODELS[queryset.model]
+    candidates = trigram_candidates(queryset.model, user_id, trigrams, len(trigrams)).values(fk)
+    return queryset.filter(id__in=candidates)
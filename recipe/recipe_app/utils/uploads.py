@@ -0,0 +1,23 @@
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """
+    First upload handler of a request that stops parsing as soon as a file grows past
+    ``max_size``: the rest of the body is neither read nor stored. ``exceeded`` tells
+    the view why the file is missing.
+    """
+
+    def __init__(self, max_size: int, request=None):
+        super().__init__(request)
+        self.max_size = max_size
+        self.exceeded = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.exceeded = True
+            raise StopUpload(connection_reset=True)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
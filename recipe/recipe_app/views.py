@@ -1,53 +1,187 @@
-from typing import Any
-
-from django.db import transaction
+import io
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Literal, Optional
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
 from django.contrib.auth.models import User
-from django.shortcuts import get_object_or_404
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.urls import Resolver404, resolve
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from pydantic import BaseModel
 
-from .models import Ingredient, Recipe, IngredientRecipe
-from recipe_app.schemas.requests import IngredientInput, RecipeInput, UserRegistrationInput
+from .models import Ingredient, Job, Recipe
+from recipe_app.schemas.requests import (
+    AutocompleteParams,
+    BatchInput,
+    CostAnalyticsParams,
+    ExportParams,
+    IngredientBulkInput,
+    IngredientInput,
+    JobListParams,
+    PageParams,
+    PriceSimulationInput,
+    RecipeFieldsParams,
+    RecipeInput,
+    RecipePageParams,
+    ShoppingListInput,
+    UserRegistrationInput,
+)
 from recipe_app.schemas.responses import (
     APIResponse,
+    BatchOperationResult,
+    BatchResponse,
+    BulkItemError,
+    CostAnalyticsResponse,
+    IngredientBulkResponse,
+    IngredientBulkResult,
     IngredientResponse,
     IngredientListResponse,
+    IngredientAutocompleteResponse,
     IngredientCreateResponse,
+    JobDetailResponse,
+    JobListResponse,
+    PriceSimulationResponse,
     RecipeListResponse,
     RecipeCreateResponse,
     RecipeDetailResponse,
     RecipeUpdateResponse,
     RecipePartialUpdateResponse,
     RecipeImageUploadResponse,
+    RecipeImportResponse,
+    ShoppingListResponse,
+    ShoppingListResult,
     UserRegistrationResponse,
 )
-from .pydantic_base_view import PydanticAPIView, FileUploadPydanticAPIView
+from .pydantic_base_view import AsyncPydanticAPIView, PydanticAPIView, PydanticResponse, FileUploadPydanticAPIView
 from .utils.pydantic_parameters import PydanticModelParameters
-from .utils.response_builders import build_recipe_response
+from .utils.analytics import cost_analytics
+from .utils.autocomplete import ingredient_indexes
+from .utils.batch import BatchReferenceError, created_id, make_subrequest, substitute_path, substitute_refs
+from .utils.blobs import acquire_blob, release_blob
+from .utils.common import format_validation_error, name_key
+from .utils.conditional import conditional_response, make_etag
+from .utils.export import CONTENT_TYPES, export_chunks, export_filename
+from .utils.image_validation import EXTENSIONS as IMAGE_EXTENSIONS, InvalidImage, inspect_image
+from .utils.images import schedule_image_variants
+from .utils.ingredient_bulk import bulk_delete_ingredients, bulk_upsert_ingredients
+from .utils.media import media_response, media_url_epoch, owner_filter, signed_media_user
+from .utils.pagination import ORDERINGS, apaginate_keyset, apaginate_ranked, paginate_keyset, paginate_ranked
+from .utils.price_simulation import simulate_price_changes
+from .utils.recipe_import import PARSERS, RecipeImporter, detect_format
+from .utils.recipe_ingredients import add_recipe_ingredients, missing_ingredient_ids, sync_recipe_ingredients
+from .utils.recipe_totals import refresh_recipe_total, shift_recipe_totals
+from .utils.response_builders import (
+    abuild_recipe_responses,
+    build_job_response,
+    build_recipe_response,
+    build_recipe_responses,
+    recipe_columns,
+    sparse_include,
+)
+from .utils.response_cache import cached_response, invalidate_user_cache, invalidates_response_cache
+from .utils.search import get_search_backend
+from .utils.shopping_list import aggregate_shopping_list
+from .utils.streaming import streaming_json_response, streaming_response
+from .utils.trigrams import filter_name_contains
 from pydantic import ValidationError
 
+NAME_FILTER_PARAMETER = OpenApiParameter(name="name", type=str, description="Case-insensitive substring filter.")
+
+
+def search_function(queryset, user_id, query):
+    # hits are taken from the filtered queryset, so a page is only short when the results run out
+    def search(after, direction, limit):
+        return get_search_backend().search(queryset.model, user_id, query, after, direction, limit, within=queryset)
+
+    return search
+
+
+def paginate(queryset, params, user_id):
+    if params.q:
+        search = search_function(queryset, user_id, params.q)
+        return paginate_ranked(queryset, search, params.cursor, params.limit)
+    return paginate_keyset(queryset, params.ordering, params.cursor, params.limit)
+
+
+async def apaginate(queryset, params, user_id):
+    if params.q:
+        search = search_function(queryset, user_id, params.q)
+        return await apaginate_ranked(queryset, search, params.cursor, params.limit)
+    return await apaginate_keyset(queryset, params.ordering, params.cursor, params.limit)
+
+
+INGREDIENT_LIST_SCHEMA = extend_schema(
+    parameters=[NAME_FILTER_PARAMETER] + PydanticModelParameters(PageParams).get_parameters(),
+    responses={200: IngredientListResponse},
+    summary="List Ingredients",
+    description=(
+        "Fetch a page of ingredients for the authenticated user with an optional filter by name. "
+        "With `stream=true` every matching ingredient is streamed in one response."
+    ),
+)
+RECIPE_LIST_SCHEMA = extend_schema(
+    parameters=[NAME_FILTER_PARAMETER] + PydanticModelParameters(RecipePageParams).get_parameters(),
+    responses={200: RecipeListResponse},
+    summary="List Recipes",
+    description=(
+        "Fetch a page of recipes for the authenticated user with optional filters by name and price. "
+        "With `stream=true` every matching recipe is streamed in one response."
+    ),
+)
+RECIPE_DETAIL_SCHEMA = extend_schema(
+    parameters=PydanticModelParameters(RecipeFieldsParams).get_parameters(),
+    responses={200: RecipeDetailResponse},
+    summary="Retrieve Recipe",
+    description="Fetch the details of a specific recipe for the authenticated user.",
+)
+
 
 class IngredientListCreateView(PydanticAPIView):
     permission_classes = [IsAuthenticated]
     pydantic_model = IngredientInput
 
-    @extend_schema(
-        responses={200: IngredientListResponse},
-        summary="List Ingredients",
-        description="Fetch ingredients for the authenticated user with an optional filter by name.",
-    )
+    @INGREDIENT_LIST_SCHEMA
+    @cached_response('ingredient-list')
     def get(self, request, *args, **kwargs):
+        params = self.parse_query_params(PageParams)
+        queryset = self.filter_queryset(request)
+        if params.stream:
+            return self.stream_response(request, queryset, params)
+        return self.page_response(paginate(queryset, params, request.user.id))
+
+    def filter_queryset(self, request):
         name = request.query_params.get("name")
         queryset = Ingredient.objects.filter(user=request.user)
         if name:
-            queryset = queryset.filter(name__icontains=name)
-        output = [IngredientResponse(id=i.id, name=i.name, cost=i.cost, unit=i.unit) for i in queryset]
-        response_data = IngredientListResponse(result="ok", data=output)
-        return Response(response_data.model_dump(mode="json"))
+            queryset = filter_name_contains(queryset, request.user.id, name)
+        return queryset
+
+    def stream_response(self, request, queryset, params):
+        return streaming_json_response(
+            request,
+            queryset.order_by(*ORDERINGS[params.ordering]),
+            lambda batch: [self.build_response(i).model_dump_json().encode() for i in batch],
+            IngredientListResponse,
+        )
+
+    def page_response(self, page):
+        output = [self.build_response(i) for i in page.items]
+        response_data = IngredientListResponse(result="ok", data=output, next=page.next, prev=page.prev)
+        return PydanticResponse(response_data)
+
+    @staticmethod
+    def build_response(ingredient):
+        return IngredientResponse(id=ingredient.id, name=ingredient.name, cost=ingredient.cost, unit=ingredient.unit)
 
     @extend_schema(
         request=IngredientInput,
@@ -55,13 +189,107 @@ class IngredientListCreateView(PydanticAPIView):
         summary="Create Ingredient",
         description="Creates a new ingredient for the authenticated user.",
     )
+    @invalidates_response_cache
     @transaction.atomic
     def post(self, request, *args, **kwargs):
         data = request.pydantic.model_dump(mode="json")
         ingredient = Ingredient.objects.create(user=request.user, **data)
         output = IngredientResponse(id=ingredient.id, name=ingredient.name, cost=ingredient.cost, unit=ingredient.unit)
         response_data = IngredientCreateResponse(result="ok", data=output)
-        return Response(response_data.model_dump(mode="json"), status=status.HTTP_201_CREATED)
+        return PydanticResponse(response_data, status=status.HTTP_201_CREATED)
+
+
+class IngredientAutocompleteView(PydanticAPIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=PydanticModelParameters(AutocompleteParams).get_parameters(),
+        responses={200: IngredientAutocompleteResponse},
+        summary="Autocomplete Ingredients",
+        description="Top matches for a typed prefix among the authenticated user's ingredients, served from memory.",
+    )
+    def get(self, request, *args, **kwargs):
+        params = self.parse_query_params(AutocompleteParams)
+        rows = ingredient_indexes.get(request.user.id).complete(params.q, params.limit)
+        output = [IngredientResponse(id=pk, name=name, cost=cost, unit=unit) for pk, name, cost, unit in rows]
+        response_data = IngredientAutocompleteResponse(result="ok", data=output)
+        return PydanticResponse(response_data)
+
+
+class IngredientBulkView(PydanticAPIView):
+    permission_classes = [IsAuthenticated]
+    pydantic_model = IngredientBulkInput
+
+    @extend_schema(
+        request=IngredientBulkInput,
+        responses={200: IngredientBulkResponse},
+        summary="Bulk Upsert and Delete Ingredients",
+        description=(
+            "Creates ingredients, or updates the cost of existing ones with the same name and unit, and deletes "
+            "ingredients by id, in one transaction. Invalid items are reported in `errors` and do not stop the rest."
+        ),
+    )
+    @invalidates_response_cache
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        errors = []
+        valid = {}
+        for index, raw in enumerate(request.pydantic.upsert):
+            try:
+                item = IngredientInput.model_validate(raw)
+            except ValidationError as e:
+                errors.append(BulkItemError(index=index, message=format_validation_error(e)))
+                continue
+            # the same ingredient for the unique key, so case-only differences on MySQL
+            key = (name_key(item.name), item.unit)
+            if key in valid:
+                message = f"Same name and unit as item {valid[key][0]}."
+                errors.append(BulkItemError(index=index, message=message))
+                continue
+            valid[key] = (index, item)
+
+        to_delete = request.pydantic.delete
+        deleted = bulk_delete_ingredients(request.user, to_delete)
+        missing = set(to_delete) - set(deleted)
+        errors += [
+            BulkItemError(id=pk, message=f'Invalid pk "{pk}" - object does not exist.')
+            for pk in to_delete
+            if pk in missing
+        ]
+
+        stored, created = bulk_upsert_ingredients(request.user, [item for _, item in valid.values()])
+        upserted = [IngredientListCreateView.build_response(stored[key]) for key in valid]
+        result = IngredientBulkResult(upserted=upserted, created=sorted(created), deleted=deleted, errors=errors)
+        message = f"{len(errors)} items failed." if errors else None
+        return PydanticResponse(IngredientBulkResponse(result="ok", message=message, data=result))
+
+
+class IngredientPriceSimulationView(PydanticAPIView):
+    permission_classes = [IsAuthenticated]
+    pydantic_model = PriceSimulationInput
+
+    @extend_schema(
+        request=PriceSimulationInput,
+        responses={200: PriceSimulationResponse},
+        summary="Simulate Ingredient Price Changes",
+        description=(
+            "Lists every recipe using one of the changed ingredients with its current and new total. Nothing is "
+            "stored unless `apply` is true, in which case all costs and totals are updated in one transaction."
+        ),
+    )
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        new_costs = {change.ingredient_id: change.new_cost for change in request.pydantic.changes}
+        ingredients = Ingredient.objects.filter(user=request.user, id__in=list(new_costs)).order_by("id")
+        if request.pydantic.apply:
+            ingredients = ingredients.select_for_update()
+        ingredients = list(ingredients.only("id", "name", "unit", "cost"))
+        if len(ingredients) != len(new_costs):
+            raise Http404("No Ingredient matches the given query.")
+        result = simulate_price_changes(ingredients, new_costs, apply=request.pydantic.apply)
+        if result.applied:
+            invalidate_user_cache(request.user.id)
+        return PydanticResponse(PriceSimulationResponse(result="ok", data=result))
 
 
 class IngredientDetailView(APIView):
@@ -75,8 +303,11 @@ class IngredientDetailView(APIView):
             404: OpenApiResponse(description="Not found or does not belong to user"),
         },
     )
+    @invalidates_response_cache
+    @transaction.atomic
     def delete(self, request, pk, *args, **kwargs):
         ingredient = get_object_or_404(Ingredient, pk=pk, user=request.user)
+        shift_recipe_totals(ingredient, -ingredient.cost, count_delta=-1)
         ingredient.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -90,6 +321,8 @@ class IngredientDetailView(APIView):
             404: OpenApiResponse(description="Not found or does not belong to user"),
         },
     )
+    @invalidates_response_cache
+    @transaction.atomic
     def put(self, request, pk, *args, **kwargs):
         ingredient = get_object_or_404(Ingredient, pk=pk, user=request.user)
 
@@ -98,35 +331,78 @@ class IngredientDetailView(APIView):
         except ValidationError as e:
             return Response({'error': e.errors()}, status=status.HTTP_400_BAD_REQUEST)
 
+        old_cost = ingredient.cost
         ingredient.name = validated.name
         ingredient.cost = validated.cost
         ingredient.unit = validated.unit
         ingredient.save()
+        # Always runs, even for a zero cost delta: it also bumps updated_at of the recipes
+        # that show this ingredient, which invalidates their ETags after a rename.
+        shift_recipe_totals(ingredient, validated.cost - old_cost)
 
         response = IngredientResponse(
             id=ingredient.id, name=ingredient.name, cost=ingredient.cost, unit=ingredient.unit
         )
-        return Response(response.model_dump(mode="json"), status=status.HTTP_200_OK)
+        return PydanticResponse(response, status=status.HTTP_200_OK)
 
 
 class RecipeListCreateView(PydanticAPIView):
     permission_classes = [IsAuthenticated]
     pydantic_model = RecipeInput
 
-    @extend_schema(
-        parameters=PydanticModelParameters(RecipeInput).get_parameters(),
-        responses={200: RecipeListResponse},
-        summary="List Recipes",
-        description="Fetch recipes for the authenticated user with an optional filter by name.",
-    )
+    @RECIPE_LIST_SCHEMA
+    @conditional_response
+    @cached_response('recipe-list')
     def get(self, request, *args, **kwargs):
+        params = self.parse_query_params(RecipePageParams)
+        fields = params.selected_fields()
+        queryset = self.list_queryset(request, params, fields)
+        if params.stream:
+            return self.stream_response(request, queryset, params, fields)
+        page = paginate(queryset, params, request.user.id)
+        return self.page_response(page, build_recipe_responses(page.items, request, fields), fields)
+
+    def list_queryset(self, request, params, fields):
+        queryset = self.filter_queryset(request, params)
+        if fields is not None:
+            # keyset pagination reads the ordering columns, keep them loaded
+            queryset = queryset.only(*recipe_columns(fields), *params.sort_columns())
+        return queryset
+
+    def filter_queryset(self, request, params):
         name = request.query_params.get("name")
-        queryset = Recipe.objects.filter(user=request.user).prefetch_related("ingredient_recipes__ingredient")
+        queryset = Recipe.objects.filter(user=request.user)
         if name:
-            queryset = queryset.filter(name__icontains=name)
-        output = [build_recipe_response(recipe, request) for recipe in queryset]
-        response_data = RecipeListResponse(result="ok", data=output)
-        return Response(response_data.model_dump(mode="json"))
+            queryset = filter_name_contains(queryset, request.user.id, name)
+        if params.min_price is not None:
+            queryset = queryset.filter(total_price__gte=params.min_price)
+        if params.max_price is not None:
+            queryset = queryset.filter(total_price__lte=params.max_price)
+        return queryset
+
+    def stream_response(self, request, queryset, params, fields):
+        return streaming_json_response(
+            request,
+            queryset.order_by(*ORDERINGS[params.ordering]),
+            lambda batch: [
+                r.model_dump_json(include=fields).encode() for r in build_recipe_responses(batch, request, fields)
+            ],
+            RecipeListResponse,
+        )
+
+    def page_response(self, page, output, fields):
+        response_data = RecipeListResponse(result="ok", data=output, next=page.next, prev=page.prev)
+        return PydanticResponse(response_data, include=sparse_include(fields, many=True))
+
+    def get_conditional_state(self, request, **kwargs):
+        params = self.parse_query_params(RecipePageParams)
+        state = self.filter_queryset(request, params).aggregate(count=Count('id'), last_modified=Max('updated_at'))
+        return self.conditional_state(request, state)
+
+    def conditional_state(self, request, state):
+        # the signing period changes the media URLs in the body
+        etag = make_etag('recipe-list', request.user.id, request.GET.urlencode(), media_url_epoch(), *state.values())
+        return etag, state['last_modified']
 
     @extend_schema(
         request=RecipeInput,
@@ -134,30 +410,25 @@ class RecipeListCreateView(PydanticAPIView):
         summary="Create Recipe",
         description="Creates a new recipe for the authenticated user along with its ingredients.",
     )
+    @invalidates_response_cache
     @transaction.atomic
     def post(self, request, *args, **kwargs):
         data = request.pydantic.model_dump(mode="json")
+        ingredients = request.pydantic.ingredients
+        missing = missing_ingredient_ids(request.user, ingredients)
+        if missing:
+            error_response = APIResponse(result="error", message=f'Invalid pk "{missing[0]}" - object does not exist.')
+            return PydanticResponse(error_response, status=status.HTTP_400_BAD_REQUEST)
         recipe = Recipe.objects.create(
             name=data["name"],
             description=data["description"],
             user=request.user,
         )
-        for ingr_data in data.get("ingredients", []):
-            ingredient = Ingredient.objects.filter(id=ingr_data["ingredient_id"], user=request.user).first()
-            if not ingredient:
-                error_response = APIResponse(
-                    result="error",
-                    message=f'Invalid pk "{ingr_data["ingredient_id"]}" - object does not exist.',
-                )
-                return Response(error_response.model_dump(mode="json"), status=status.HTTP_400_BAD_REQUEST)
-            IngredientRecipe.objects.create(
-                recipe=recipe,
-                ingredient=ingredient,
-                ingredient_amount=ingr_data["ingredient_amount"],
-            )
+        add_recipe_ingredients(recipe, ingredients)
+        refresh_recipe_total(recipe)
         output = build_recipe_response(recipe, request)
         response_data = RecipeCreateResponse(result="ok", data=output)
-        return Response(response_data.model_dump(mode="json"), status=status.HTTP_201_CREATED)
+        return PydanticResponse(response_data, status=status.HTTP_201_CREATED)
 
 
 class RecipeDetailView(PydanticAPIView):
@@ -167,16 +438,38 @@ class RecipeDetailView(PydanticAPIView):
     def get_object(self, pk):
         return get_object_or_404(Recipe, pk=pk, user=self.request.user)
 
-    @extend_schema(
-        responses={200: RecipeDetailResponse},
-        summary="Retrieve Recipe",
-        description="Fetch the details of a specific recipe for the authenticated user.",
-    )
+    def check_ingredients(self, ingredients):
+        if missing_ingredient_ids(self.request.user, ingredients):
+            raise Http404("No Ingredient matches the given query.")
+
+    def get_conditional_state(self, request, pk, **kwargs):
+        return self.conditional_state(pk, self.updated_at(request, pk).first())
+
+    def updated_at(self, request, pk):
+        return Recipe.objects.filter(pk=pk, user=request.user).values_list('updated_at', flat=True)
+
+    def conditional_state(self, pk, last_modified):
+        if last_modified is None:
+            return None
+        return make_etag('recipe-detail', pk, last_modified.isoformat(), media_url_epoch()), last_modified
+
+    @RECIPE_DETAIL_SCHEMA
+    @conditional_response
+    @cached_response('recipe-detail')
     def get(self, request, pk, *args, **kwargs):
-        recipe = self.get_object(pk)
-        output = build_recipe_response(recipe, request)
+        fields = self.parse_query_params(RecipeFieldsParams).selected_fields()
+        if fields is None:
+            recipe = self.get_object(pk)
+        else:
+            recipe = get_object_or_404(self.detail_queryset(fields), pk=pk, user=request.user)
+        return self.detail_response(build_recipe_response(recipe, request, fields), fields)
+
+    def detail_queryset(self, fields):
+        return Recipe.objects.all() if fields is None else Recipe.objects.only(*recipe_columns(fields))
+
+    def detail_response(self, output, fields):
         response_data = RecipeDetailResponse(result="ok", data=output)
-        return Response(response_data.model_dump(mode="json"))
+        return PydanticResponse(response_data, include=sparse_include(fields, many=False))
 
     @extend_schema(
         request=RecipeInput,
@@ -184,24 +477,20 @@ class RecipeDetailView(PydanticAPIView):
         summary="Update Recipe",
         description="Updates the details of a specific recipe for the authenticated user.",
     )
+    @invalidates_response_cache
     @transaction.atomic
     def put(self, request, pk, *args, **kwargs):
         recipe = self.get_object(pk)
         data = request.pydantic.model_dump(mode="json")
         recipe.name = data["name"]
         recipe.description = data["description"]
+        self.check_ingredients(request.pydantic.ingredients)
         recipe.save()
-        recipe.ingredient_recipes.all().delete()
-        for ingr_data in data.get("ingredients", []):
-            ingredient = get_object_or_404(Ingredient, id=ingr_data["ingredient_id"], user=request.user)
-            IngredientRecipe.objects.create(
-                recipe=recipe,
-                ingredient=ingredient,
-                ingredient_amount=ingr_data["ingredient_amount"],
-            )
+        if sync_recipe_ingredients(recipe, request.pydantic.ingredients):
+            refresh_recipe_total(recipe)
         output = build_recipe_response(recipe, request)
         response_data = RecipeUpdateResponse(result="ok", data=output)
-        return Response(response_data.model_dump(mode="json"))
+        return PydanticResponse(response_data)
 
     @extend_schema(
         request=RecipeInput,
@@ -209,6 +498,7 @@ class RecipeDetailView(PydanticAPIView):
         summary="Partial Update Recipe",
         description="Updates selected fields of a specific recipe for the authenticated user.",
     )
+    @invalidates_response_cache
     @transaction.atomic
     def patch(self, request, pk, *args, **kwargs):
         recipe = self.get_object(pk)
@@ -217,25 +507,21 @@ class RecipeDetailView(PydanticAPIView):
             recipe.name = partial_data["name"]
         if "description" in partial_data:
             recipe.description = partial_data["description"]
-        recipe.save()
         if "ingredients" in partial_data:
-            recipe.ingredient_recipes.all().delete()
-            for ingr_data in partial_data.get("ingredients", []):
-                ingredient = get_object_or_404(Ingredient, id=ingr_data["ingredient_id"], user=request.user)
-                IngredientRecipe.objects.create(
-                    recipe=recipe,
-                    ingredient=ingredient,
-                    ingredient_amount=ingr_data["ingredient_amount"],
-                )
+            self.check_ingredients(request.pydantic.ingredients)
+        recipe.save()
+        if "ingredients" in partial_data and sync_recipe_ingredients(recipe, request.pydantic.ingredients):
+            refresh_recipe_total(recipe)
         output = build_recipe_response(recipe, request)
         response_data = RecipePartialUpdateResponse(result="ok", data=output)
-        return Response(response_data.model_dump(mode="json"))
+        return PydanticResponse(response_data)
 
     @extend_schema(
         responses={204: None},
         summary="Delete Recipe",
         description="Deletes a specific recipe for the authenticated user.",
     )
+    @invalidates_response_cache
     @transaction.atomic
     def delete(self, request, pk, *args, **kwargs):
         recipe = self.get_object(pk)
@@ -243,9 +529,62 @@ class RecipeDetailView(PydanticAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class AsyncIngredientListCreateView(AsyncPydanticAPIView, IngredientListCreateView):
+    """IngredientListCreateView with a non-blocking list read for ASGI deployments, see settings.ASYNC_VIEWS."""
+
+    @INGREDIENT_LIST_SCHEMA
+    @cached_response('ingredient-list')
+    async def get(self, request, *args, **kwargs):
+        params = self.parse_query_params(PageParams)
+        queryset = self.filter_queryset(request)
+        if params.stream:
+            return self.stream_response(request, queryset, params)
+        return self.page_response(await apaginate(queryset, params, request.user.id))
+
+
+class AsyncRecipeListCreateView(AsyncPydanticAPIView, RecipeListCreateView):
+    """RecipeListCreateView with a non-blocking list read for ASGI deployments, see settings.ASYNC_VIEWS."""
+
+    @RECIPE_LIST_SCHEMA
+    @conditional_response
+    @cached_response('recipe-list')
+    async def get(self, request, *args, **kwargs):
+        params = self.parse_query_params(RecipePageParams)
+        fields = params.selected_fields()
+        queryset = self.list_queryset(request, params, fields)
+        if params.stream:
+            return self.stream_response(request, queryset, params, fields)
+        page = await apaginate(queryset, params, request.user.id)
+        return self.page_response(page, await abuild_recipe_responses(page.items, request, fields), fields)
+
+    async def aget_conditional_state(self, request, **kwargs):
+        params = self.parse_query_params(RecipePageParams)
+        queryset = self.filter_queryset(request, params)
+        return self.conditional_state(
+            request, await queryset.aaggregate(count=Count('id'), last_modified=Max('updated_at'))
+        )
+
+
+class AsyncRecipeDetailView(AsyncPydanticAPIView, RecipeDetailView):
+    """RecipeDetailView with a non-blocking read for ASGI deployments, see settings.ASYNC_VIEWS."""
+
+    async def aget_conditional_state(self, request, pk, **kwargs):
+        return self.conditional_state(pk, await self.updated_at(request, pk).afirst())
+
+    @RECIPE_DETAIL_SCHEMA
+    @conditional_response
+    @cached_response('recipe-detail')
+    async def get(self, request, pk, *args, **kwargs):
+        fields = self.parse_query_params(RecipeFieldsParams).selected_fields()
+        recipe = await aget_object_or_404(self.detail_queryset(fields), pk=pk, user=request.user)
+        output = await abuild_recipe_responses([recipe], request, fields)
+        return self.detail_response(output[0], fields)
+
+
 class RecipeImageUploadView(FileUploadPydanticAPIView):
     permission_classes = [IsAuthenticated]
     file_fields = ["image"]
+    max_upload_size = settings.IMAGE_MAX_UPLOAD_SIZE
 
     class FileUploadModel(BaseModel):
         image: Any = None
@@ -262,25 +601,279 @@ class RecipeImageUploadView(FileUploadPydanticAPIView):
         summary="Upload Recipe Image",
         description="Uploads an image for a specific recipe and returns updated recipe data.",
     )
+    @invalidates_response_cache
+    @transaction.atomic
     def post(self, request, pk, *args, **kwargs):
-        recipe = get_object_or_404(Recipe, pk=pk, user=request.user)
+        recipe = get_object_or_404(Recipe.objects.select_for_update(), pk=pk, user=request.user)
         image = request.FILES.get("image")
+        if self.upload_too_large:
+            limit = settings.IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)
+            error_resp = APIResponse(result="error", message=f"Image size exceeds the allowed limit ({limit} MB).")
+            return PydanticResponse(error_resp, status=status.HTTP_400_BAD_REQUEST)
         if not image:
             error_resp = APIResponse(result="error", message="Image not uploaded.")
-            return Response(error_resp.model_dump(mode="json"), status=status.HTTP_400_BAD_REQUEST)
-        allowed_types = ["image/jpeg", "image/png", "image/gif"]
-        if image.content_type not in allowed_types:
-            error_resp = APIResponse(result="error", message="Unsupported image format. Allowed: JPEG, PNG, GIF.")
-            return Response(error_resp.model_dump(mode="json"), status=status.HTTP_400_BAD_REQUEST)
-        max_size = 5 * 1024 * 1024
-        if image.size > max_size:
-            error_resp = APIResponse(result="error", message="Image size exceeds the allowed limit (5 MB).")
-            return Response(error_resp.model_dump(mode="json"), status=status.HTTP_400_BAD_REQUEST)
+            return PydanticResponse(error_resp, status=status.HTTP_400_BAD_REQUEST)
+        # the client's content type and file name are not trusted, the format comes from the file
+        try:
+            info = inspect_image(image, settings.IMAGE_MAX_PIXELS)
+        except InvalidImage as e:
+            return PydanticResponse(APIResponse(result="error", message=str(e)), status=status.HTTP_400_BAD_REQUEST)
+        image.name = f"image{IMAGE_EXTENSIONS[info.format]}"
+        old_image = recipe.image.name
+        # stored once per content, an image used before only gets one more reference
         recipe.image = image
+        recipe.image_variants = {}
         recipe.save()
+        acquire_blob(recipe.image.name)
+        if old_image:
+            release_blob(old_image)
+        job = schedule_image_variants(recipe)
         output = build_recipe_response(recipe, request)
-        response_data = RecipeImageUploadResponse(result="ok", message="Image successfully uploaded", data=output)
-        return Response(response_data.model_dump(mode="json"), status=status.HTTP_200_OK)
+        response_data = RecipeImageUploadResponse(
+            result="ok", message="Image successfully uploaded", data=output, job_id=job.id
+        )
+        return PydanticResponse(response_data, status=status.HTTP_200_OK)
+
+
+class RecipeImportView(FileUploadPydanticAPIView):
+    permission_classes = [IsAuthenticated]
+    file_fields = ["file"]
+
+    class ImportUploadModel(BaseModel):
+        file: Any = None
+        format: Optional[Literal["jsonl", "csv"]] = None
+        model_config = {"extra": "allow"}
+
+    pydantic_model = ImportUploadModel
+
+    @extend_schema(
+        request=ImportUploadModel,
+        responses={
+            200: RecipeImportResponse,
+            400: {"type": "object", "properties": {"error": {"type": "string"}}},
+        },
+        summary="Import Recipes",
+        description=(
+            "Imports recipes from an uploaded UTF-8 JSONL or CSV file, read and written in chunks. Ingredients are "
+            "referenced by id or by name and unit. Invalid rows are reported with their line number and skipped."
+        ),
+    )
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if not upload:
+            error_resp = APIResponse(result="error", message="File not uploaded.")
+            return PydanticResponse(error_resp, status=status.HTTP_400_BAD_REQUEST)
+        fmt = detect_format(upload.name, request.pydantic.format)
+        if fmt is None:
+            error_resp = APIResponse(result="error", message="Unknown file format. Allowed: JSONL, CSV.")
+            return PydanticResponse(error_resp, status=status.HTTP_400_BAD_REQUEST)
+        lines = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        try:
+            report = RecipeImporter(request.user).run(PARSERS[fmt](lines))
+        except UnicodeDecodeError:
+            error_resp = APIResponse(result="error", message="File is not valid UTF-8.")
+            return PydanticResponse(error_resp, status=status.HTTP_400_BAD_REQUEST)
+        message = f"{report.failed} rows failed." if report.failed else None
+        return PydanticResponse(RecipeImportResponse(result="ok", message=message, data=report))
+
+
+class ExportView(PydanticAPIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=PydanticModelParameters(ExportParams).get_parameters(),
+        responses={200: OpenApiResponse(description="The exported rows as a file download.")},
+        summary="Export Recipes or Ingredients",
+        description=(
+            "Streams all recipes (with prices and ingredients) or all ingredients of the authenticated user as JSON "
+            "lines or CSV, optionally gzip-compressed. Recipe exports can be imported again."
+        ),
+    )
+    def get(self, request, *args, **kwargs):
+        params = self.parse_query_params(ExportParams)
+        content = export_chunks(request.user, params.kind, params.file_format, params.gzip)
+        content_type = "application/gzip" if params.gzip else CONTENT_TYPES[params.file_format]
+        response = streaming_response(request, content, content_type)
+        filename = export_filename(params.kind, params.file_format, params.gzip)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class MediaView(PydanticAPIView):
+    # loaded by <img> tags, which send no Authorization header: the signed URL is the credential
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        responses={
+            200: OpenApiResponse(description="The file."),
+            206: OpenApiResponse(description="The requested byte range of the file."),
+            304: OpenApiResponse(description="The cached copy is current."),
+            403: OpenApiResponse(description="The URL is not signed, or its signature is wrong or expired."),
+        },
+        summary="Media File",
+        description=(
+            "Serves a recipe image or image variant at the signed URL given in `image` and `image_variants`, without "
+            "authentication until the URL expires. Handed to nginx when MEDIA_ACCEL_REDIRECT is set. Supports single "
+            "byte ranges. Content-hashed files are cached as immutable."
+        ),
+    )
+    def get(self, request, name, *args, **kwargs):
+        user_id = signed_media_user(name, request.GET.get('user', ''), request.GET.get('signature', ''))
+        if user_id is None:
+            raise PermissionDenied("The media URL is invalid or has expired.")
+        if not Recipe.objects.filter(owner_filter(name), user_id=user_id).exists():
+            raise Http404("No media file matches the given query.")
+        try:
+            return media_response(request, name)
+        except (FileNotFoundError, SuspiciousFileOperation):
+            raise Http404("No media file matches the given query.")
+
+
+class ShoppingListView(PydanticAPIView):
+    permission_classes = [IsAuthenticated]
+    pydantic_model = ShoppingListInput
+
+    @extend_schema(
+        request=ShoppingListInput,
+        responses={200: ShoppingListResponse},
+        summary="Shopping List",
+        description=(
+            "Sums the ingredient amounts of the given recipes, each scaled by its servings multiplier, per ingredient "
+            "and prices them. A recipe listed twice counts with the sum of its multipliers."
+        ),
+    )
+    def post(self, request, *args, **kwargs):
+        multipliers = defaultdict(Decimal)
+        for item in request.pydantic.recipes:
+            multipliers[item.recipe_id] += item.servings_multiplier
+        owned = Recipe.objects.filter(user=request.user, id__in=list(multipliers)).count()
+        if owned != len(multipliers):
+            raise Http404("No Recipe matches the given query.")
+        items, total_cost = aggregate_shopping_list(request.user, multipliers)
+        return PydanticResponse(
+            ShoppingListResponse(result="ok", data=ShoppingListResult(items=items, total_cost=total_cost))
+        )
+
+
+class CostAnalyticsView(PydanticAPIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=PydanticModelParameters(CostAnalyticsParams).get_parameters(),
+        responses={200: CostAnalyticsResponse},
+        summary="Recipe Cost Analytics",
+        description=(
+            "Average, median and percentile recipe cost, cost per unit and the ingredients with the highest cost "
+            "across all recipes of the authenticated user."
+        ),
+    )
+    @cached_response('cost-analytics')
+    def get(self, request, *args, **kwargs):
+        params = self.parse_query_params(CostAnalyticsParams)
+        return PydanticResponse(CostAnalyticsResponse(result="ok", data=cost_analytics(request.user, params.top)))
+
+
+class JobListView(PydanticAPIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=PydanticModelParameters(JobListParams).get_parameters(),
+        responses={200: JobListResponse},
+        summary="List Jobs",
+        description="The most recent background jobs of the authenticated user, newest first.",
+    )
+    def get(self, request, *args, **kwargs):
+        params = self.parse_query_params(JobListParams)
+        jobs = Job.objects.filter(user=request.user)
+        if params.status:
+            jobs = jobs.filter(status=params.status)
+        jobs = jobs.order_by('-id')[: settings.JOB_LIST_LIMIT]
+        return PydanticResponse(JobListResponse(result="ok", data=[build_job_response(job) for job in jobs]))
+
+
+class JobDetailView(PydanticAPIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        responses={200: JobDetailResponse, 404: OpenApiResponse(description="Not found or does not belong to user")},
+        summary="Job Status",
+        description="Status of a background job of the authenticated user, with its result once it succeeded.",
+    )
+    def get(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(Job, pk=pk, user=request.user)
+        return PydanticResponse(JobDetailResponse(result="ok", data=build_job_response(job)))
+
+
+class BatchView(PydanticAPIView):
+    permission_classes = [IsAuthenticated]
+    pydantic_model = BatchInput
+
+    # URL names a batch operation may target; always the sync views, they run inside the batch transaction
+    operation_views = {
+        "ingredient-list-create": IngredientListCreateView.as_view(),
+        "ingredient-bulk": IngredientBulkView.as_view(),
+        "ingredient-detail": IngredientDetailView.as_view(),
+        "recipe-list-create": RecipeListCreateView.as_view(),
+        "recipe-detail": RecipeDetailView.as_view(),
+    }
+
+    @extend_schema(
+        request=BatchInput,
+        responses={200: BatchResponse, 400: BatchResponse},
+        summary="Batch Operations",
+        description=(
+            "Runs an ordered list of ingredient and recipe writes in one transaction. An operation with `ref` makes "
+            "the id it creates available to later operations as `$ref` in their path or body. If an operation fails, "
+            "nothing is applied and the results up to the failing one are returned with status 400."
+        ),
+    )
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        refs = {}
+        results = []
+        for index, op in enumerate(request.pydantic.operations):
+            try:
+                path = substitute_path(op.path, refs)
+                body = substitute_refs(op.body, refs)
+                match = resolve(path)
+                view = self.operation_views.get(match.url_name)
+                if view is None:
+                    raise Resolver404()
+            except BatchReferenceError as e:
+                results.append(BatchOperationResult(status=status.HTTP_400_BAD_REQUEST, body={"message": str(e)}))
+                return self.failed(index, results)
+            except Resolver404:
+                # the message of Resolver404 lists the URL patterns tried, never sent to clients
+                message = f'Unsupported path "{op.path}".'
+                results.append(BatchOperationResult(status=status.HTTP_400_BAD_REQUEST, body={"message": message}))
+                return self.failed(index, results)
+
+            try:
+                # in its own savepoint, so a constraint violation leaves the batch transaction usable
+                with transaction.atomic():
+                    response = view(make_subrequest(request, op.method, path, body), **match.kwargs)
+            except IntegrityError:
+                message = "The operation conflicts with existing data, e.g. a name that is already taken."
+                results.append(BatchOperationResult(status=status.HTTP_400_BAD_REQUEST, body={"message": message}))
+                return self.failed(index, results)
+            results.append(BatchOperationResult(status=response.status_code, body=response.data))
+            if response.status_code >= 400:
+                return self.failed(index, results)
+            if op.ref:
+                ref_id = created_id(response.data)
+                if ref_id is None:
+                    message = f'Operation {index} returns no single object, its id cannot be used as ref "{op.ref}".'
+                    results[-1] = BatchOperationResult(status=status.HTTP_400_BAD_REQUEST, body={"message": message})
+                    return self.failed(index, results)
+                refs[op.ref] = ref_id
+        return PydanticResponse(BatchResponse(result="ok", data=results))
+
+    @staticmethod
+    def failed(index, results):
+        transaction.set_rollback(True)
+        message = f"Operation {index} failed, no changes were applied."
+        return PydanticResponse(BatchResponse(result="error", message=message, data=results), status=400)
 
 
 class UserRegistrationView(PydanticAPIView):
@@ -300,13 +893,13 @@ class UserRegistrationView(PydanticAPIView):
         data = request.pydantic.model_dump(mode="json")
         if User.objects.filter(username=data['username']).exists():
             error_resp = APIResponse(result="error", message=f"Username '{data['username']}' is already taken.")
-            return Response(error_resp.model_dump(mode="json"), status=status.HTTP_400_BAD_REQUEST)
+            return PydanticResponse(error_resp, status=status.HTTP_400_BAD_REQUEST)
         if User.objects.filter(email=data['email']).exists():
             error_resp = APIResponse(result="error", message=f"Email '{data['email']}' is already in use.")
-            return Response(error_resp.model_dump(mode="json"), status=status.HTTP_400_BAD_REQUEST)
+            return PydanticResponse(error_resp, status=status.HTTP_400_BAD_REQUEST)
         User.objects.create_user(username=data['username'], email=data['email'], password=data['password'])
         response_data = UserRegistrationResponse(result="ok", message="User successfully registered.")
-        return Response(response_data.model_dump(mode="json"), status=status.HTTP_201_CREATED)
+        return PydanticResponse(response_data, status=status.HTTP_201_CREATED)
 
 
 class CurrentUserView(APIView):